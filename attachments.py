@@ -0,0 +1,311 @@
+"""Attachment preparation for /mail/send: local files and URLs to base64 on disk.
+
+Sources are read in chunks (local files through mmap, URLs through the
+shared connection pool) and base64-encoded incrementally into a cache
+under DATA_DIR/attachments named by the content's SHA-256. The same
+content is encoded once however many requests use it, and request bodies
+stream the encoded file instead of holding it in memory.
+
+The cache is pruned least recently used first, but never removes a file
+that a send may still read: files pinned by a send in progress in this
+process, files referenced by pending rows in the send queue, and files
+used by any worker within PRUNE_GRACE_SECONDS (every prepare and every
+request body that streams a file refreshes its mtime).
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import math
+import mimetypes
+import mmap
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+from cache import TTLCache
+from config import config
+from exports import DownloadTooLarge, iter_download
+from inputs import check_public_url, resolve_input_path
+from metrics import metrics
+from send_queue import get_send_queue
+
+logger = logging.getLogger(__name__)
+
+# SendGrid rejects messages over 30MB in total
+MAX_MESSAGE_BYTES = 30 * 1024 * 1024
+
+# Raw bytes per encoding step; a multiple of 3 so chunks encode without padding
+ENCODE_CHUNK = 3 * 256 * 1024
+
+# Files used more recently than this are kept, since other workers may be sending them
+PRUNE_GRACE_SECONDS = 3600
+
+# Local files whose content hashes are remembered
+FILE_HASH_CACHE_SIZE = 4096
+
+# Content hashes of local files keyed by (path, size, mtime), to skip rehashing unchanged files.
+# A changed file gets a new key, so entries never go stale; the LRU bound drops old ones.
+_file_hashes = TTLCache(FILE_HASH_CACHE_SIZE, math.inf)
+metrics.register_cache("attachment_hashes", _file_hashes)
+
+# Encoded files held by sends in progress in this process, with a count per file
+_pins: Dict[str, int] = {}
+
+
+def encoded_size(raw_size: int) -> int:
+    """Return the base64 length of raw_size bytes."""
+    return 4 * ((raw_size + 2) // 3)
+
+
+def _size_error(name: str) -> ValueError:
+    return ValueError(
+        f"Attachment {name} would take the message over SendGrid's {MAX_MESSAGE_BYTES // 1024 // 1024}MB limit"
+    )
+
+
+class _Base64Writer:
+    """Incrementally base64-encode and hash a byte stream into a file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._pending = b""
+        self.sha256 = hashlib.sha256()
+        self.raw_size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.sha256.update(chunk)
+        self.raw_size += len(chunk)
+        data = self._pending + chunk if self._pending else chunk
+        usable = len(data) - len(data) % 3
+        self._file.write(base64.b64encode(data[:usable]))
+        self._pending = data[usable:]
+
+    def close(self) -> None:
+        self._file.write(base64.b64encode(self._pending))
+        self._file.close()
+
+
+def _cache_path(digest: str) -> str:
+    return config.data_path("attachments", f"{digest}.b64")
+
+
+def _store(temp_path: str, digest: str) -> str:
+    """Move a freshly encoded file into the cache, or drop it if the content is already cached."""
+    path = _cache_path(digest)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        # Mark the entry as recently used for pruning
+        os.utime(path)
+    else:
+        os.replace(temp_path, path)
+    return path
+
+
+def _iter_mmap(path: str) -> Iterable[bytes]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(mapped), ENCODE_CHUNK):
+                    yield bytes(view[offset:offset + ENCODE_CHUNK])
+            finally:
+                view.release()
+
+
+def _file_digest(path: str) -> str:
+    sha256 = hashlib.sha256()
+    for chunk in _iter_mmap(path):
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+async def _encode_file(path: str, max_bytes: int) -> Tuple[str, int]:
+    """Encode a local file into the cache. Returns (encoded path, raw size).
+
+    Files that would encode to more than max_bytes are rejected before they
+    are read. Hashing and encoding run in a worker thread so large files do
+    not block the event loop; the hash cache is only touched from the loop.
+    """
+    stat = os.stat(path)
+    if encoded_size(stat.st_size) > max_bytes:
+        raise _size_error(os.path.basename(path))
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    entry = _file_hashes.get(key)
+    if entry is not None:
+        digest = entry.value
+    else:
+        digest = await asyncio.to_thread(_file_digest, path)
+        _file_hashes.set(key, digest)
+    return await asyncio.to_thread(_encode_cached, path, digest)
+
+
+def _encode_cached(path: str, digest: str) -> Tuple[str, int]:
+    cached = _cache_path(digest)
+    if os.path.exists(cached):
+        # Mark the entry as recently used for pruning
+        os.utime(cached)
+        return cached, os.path.getsize(path)
+
+    temp_path = f"{cached}.{os.getpid()}.part"
+    writer = _Base64Writer(temp_path)
+    try:
+        for chunk in _iter_mmap(path):
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return _store(temp_path, digest), writer.raw_size
+
+
+async def _encode_url(url: str, address: Optional[str], max_bytes: int) -> Tuple[str, int]:
+    """Download and encode a URL into the cache. Returns (encoded path, raw size).
+
+    The download connects to address, the IP the URL was checked against,
+    and stops as soon as it would encode to more than max_bytes.
+    """
+    temp_path = config.data_path("attachments", f"download-{os.getpid()}-{time.monotonic_ns()}.part")
+    writer = _Base64Writer(temp_path)
+    try:
+        try:
+            async for chunk in iter_download(url, max_bytes=max_bytes // 4 * 3, address=address):
+                writer.write(chunk)
+        except DownloadTooLarge:
+            raise _size_error(url)
+    except Exception:
+        writer.close()
+        os.remove(temp_path)
+        raise
+    writer.close()
+    return _store(temp_path, writer.sha256.hexdigest()), writer.raw_size
+
+
+def _is_url(source: str) -> bool:
+    return urlsplit(source).scheme in ("http", "https")
+
+
+async def prepare_attachment(
+    source: str,
+    filename: Optional[str] = None,
+    content_type: Optional[str] = None,
+    disposition: str = "attachment",
+    content_id: Optional[str] = None,
+    max_bytes: int = MAX_MESSAGE_BYTES
+) -> Dict[str, Any]:
+    """Encode a file in the input directory or a public URL and return its /mail/send attachment entry.
+
+    The entry references the encoded file through "content_path" in place
+    of "content"; streaming.StreamingBody splices it into the request.
+    Raises ValueError, without reading or downloading the rest, once the
+    encoded content would exceed max_bytes.
+    """
+    if _is_url(source):
+        address = await check_public_url(source)
+        encoded_path, raw_size = await _encode_url(source, address, max_bytes)
+        name = filename or os.path.basename(unquote(urlsplit(source).path)) or "attachment"
+    else:
+        path = resolve_input_path(source)
+        encoded_path, raw_size = await _encode_file(path, max_bytes)
+        name = filename or os.path.basename(path)
+
+    attachment = {
+        "content_path": encoded_path,
+        "filename": name,
+        "type": content_type or mimetypes.guess_type(name)[0] or "application/octet-stream",
+        "disposition": disposition
+    }
+    if content_id:
+        attachment["content_id"] = content_id
+    logger.debug(f"Prepared attachment {name} ({raw_size} bytes)")
+    return attachment
+
+
+async def prepare_attachments(sources: List[Any]) -> List[Dict[str, Any]]:
+    """Prepare attachments from paths/URLs (or dicts with "source" and optional
+    "filename", "type", "disposition", "content_id") and check the size limit.
+
+    The encoded files are pinned against pruning until release_attachments
+    is called with the result, once the send has been made or queued.
+    Raises ValueError before anything is uploaded if the encoded attachments
+    would exceed SendGrid's 30MB message limit.
+    """
+    attachments: List[Dict[str, Any]] = []
+    try:
+        await _prepare_all(sources, attachments)
+    except Exception:
+        release_attachments(attachments)
+        raise
+    prune_cache()
+    return attachments
+
+
+async def _prepare_all(sources: List[Any], attachments: List[Dict[str, Any]]) -> None:
+    total = 0
+    for source in sources:
+        # Each attachment may only use what the earlier ones left of the message limit
+        remaining = MAX_MESSAGE_BYTES - total
+        if isinstance(source, dict):
+            if not source.get("source"):
+                raise ValueError(f"Attachment is missing a source: {source}")
+            attachments.append(await prepare_attachment(
+                source["source"],
+                filename=source.get("filename"),
+                content_type=source.get("type"),
+                disposition=source.get("disposition", "attachment"),
+                content_id=source.get("content_id"),
+                max_bytes=remaining
+            ))
+        else:
+            attachments.append(await prepare_attachment(str(source), max_bytes=remaining))
+        path = attachments[-1]["content_path"]
+        _pins[path] = _pins.get(path, 0) + 1
+        total += os.path.getsize(path)
+        if total > MAX_MESSAGE_BYTES:
+            raise _size_error(attachments[-1]["filename"])
+
+
+def release_attachments(attachments: Optional[List[Dict[str, Any]]]) -> None:
+    """Unpin attachments returned by prepare_attachments once they are no longer needed."""
+    for attachment in attachments or []:
+        path = attachment["content_path"]
+        if _pins.get(path, 0) > 1:
+            _pins[path] -= 1
+        else:
+            _pins.pop(path, None)
+
+
+def prune_cache(max_bytes: Optional[int] = None) -> int:
+    """Delete least recently used encoded attachments beyond the cache size limit.
+
+    Files still in use (see the module docstring) are never removed, even
+    if that leaves the cache over its limit. Returns the number of files removed.
+    """
+    max_bytes = config.attachment_cache_bytes if max_bytes is None else max_bytes
+    directory = os.path.dirname(_cache_path("x"))
+    in_use = set(_pins)
+    if config.send_queue_enabled:
+        in_use.update(get_send_queue().attachment_paths())
+    cutoff = time.time() - PRUNE_GRACE_SECONDS
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".b64"):
+            stat = os.stat(os.path.join(directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, name in sorted(entries):
+        if total <= max_bytes or mtime > cutoff:
+            break
+        path = os.path.join(directory, name)
+        if path in in_use:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Pruned by another worker
+        total -= size
+        removed += 1
+    return removed
@@ -7,21 +7,28 @@ This module provides Bearer token authentication support:
 This enables both:
 - Simple setup with a single configured API key
 - Multi-tenant usage where different clients can use different SendGrid accounts
+
+With AUTH_VERIFY_MODE=scopes, keys are also checked against SendGrid's
+GET /scopes once and the result is cached, so revoked keys are rejected
+up front and the granted scopes are attached to the access token.
 """
 
 from typing import Optional
-from fastmcp.server.auth import TokenVerifier
+from fastmcp.server.auth import AccessToken, TokenVerifier
+from client import key_fingerprint
 from config import config
+from scopes import verify_key
 
 class SendGridTokenVerifier(TokenVerifier):
     """Bearer token authentication handler for SendGrid using API key."""
 
     def __init__(self):
         """Initialize with default API key from config."""
+        super().__init__()
         self.default_token = config.sendgrid_api_key
 
-    async def verify_token(self, token: str) -> bool:
-        """Verify that the provided token is a valid SendGrid API key format."""
+    def _valid_format(self, token: str) -> bool:
+        """Check that the token looks like a SendGrid API key."""
         # SendGrid API keys start with 'SG.' and are 69 characters long
         if not token:
             return False
@@ -36,6 +43,20 @@ class SendGridTokenVerifier(TokenVerifier):
 
         return False
 
+    async def verify_token(self, token: str) -> Optional[AccessToken]:
+        """Verify the token's format and, in scopes mode, the key itself with SendGrid."""
+        if not self._valid_format(token):
+            return None
+
+        scopes = []
+        if config.auth_verify_mode == "scopes":
+            granted = await verify_key(token)
+            if granted is None:
+                return None
+            scopes = sorted(granted)
+
+        return AccessToken(token=token, client_id=key_fingerprint(token), scopes=scopes)
+
     def get_default_token(self) -> Optional[str]:
         """Return the default token if available."""
         return self.default_token
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmarks for SendGrid MCP Server, run against a local mock SendGrid API."""
@@ -0,0 +1,86 @@
+"""Compare memory use of inline base64 attachments with streamed ones.
+
+Sends the same --size-mb file --sends times: once the old way (whole file
+base64-encoded into the JSON payload) and once through the attachment
+pipeline (encoded once to disk, streamed into every request). Peak Python
+memory is measured with tracemalloc.
+
+    python -m benchmarks.bench_attachments --size-mb 20 --sends 5
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import SendGridClient, close_http_clients
+from config import config
+
+
+async def send_inline(client: SendGridClient, path: str, sends: int) -> None:
+    for i in range(sends):
+        with open(path, "rb") as f:
+            content = base64.b64encode(f.read()).decode()
+        payload = client.build_mail(
+            to_emails=[f"user{i}@example.com"],
+            subject="Report",
+            content="<p>Attached</p>",
+            attachments=[{"content": content, "filename": "report.pdf", "type": "application/pdf"}]
+        )
+        await client.send_payload(payload)
+
+
+async def send_streamed(client: SendGridClient, path: str, sends: int) -> None:
+    from attachments import prepare_attachments
+
+    for i in range(sends):
+        payload = client.build_mail(
+            to_emails=[f"user{i}@example.com"],
+            subject="Report",
+            content="<p>Attached</p>",
+            attachments=await prepare_attachments([path])
+        )
+        await client.send_payload(payload)
+
+
+async def measure(label: str, fn, client: SendGridClient, path: str, sends: int, mock: MockSendGrid) -> None:
+    received = mock.bytes_received
+    tracemalloc.start()
+    start = time.perf_counter()
+    await fn(client, path, sends)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    uploaded = (mock.bytes_received - received) / 1024 / 1024
+    print(f"{label}: peak {peak / 1024 / 1024:6.1f}MB, {elapsed:5.2f}s, uploaded {uploaded:.1f}MB")
+
+
+async def main(size_mb: int, sends: int) -> None:
+    config.default_from_email = "bench@example.com"
+    config.rate_limit = 0
+    config.data_dir = tempfile.mkdtemp(prefix="sendgrid-mcp-bench-")
+    config.input_dir = config.data_dir
+    path = os.path.join(config.data_dir, "report.pdf")
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    async with MockSendGrid() as mock:
+        config.api_base_url = mock.base_url
+        client = SendGridClient(api_key="SG." + "x" * 66)
+        print(f"{size_mb}MB attachment, {sends} sends")
+        await measure("inline  ", send_inline, client, path, sends, mock)
+        await measure("streamed", send_streamed, client, path, sends, mock)
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--sends", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.sends))
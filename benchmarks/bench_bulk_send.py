@@ -0,0 +1,72 @@
+"""Measure send_bulk_template_email throughput against the mock SendGrid API.
+
+    python -m benchmarks.bench_bulk_send --recipients 50000 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import close_http_clients
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+def write_recipients(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "email": f"user{i}@example.com",
+                "name": f"User {i}",
+                "dynamic_template_data": {"first_name": f"User {i}", "order": {"id": i}}
+            }) + "\n")
+
+
+async def main(recipients: int, latency: float, concurrency: int) -> None:
+    config.sendgrid_api_key = "SG." + "b" * 66
+    config.default_from_email = "bench@example.com"
+    config.bulk_concurrency = concurrency
+    config.rate_limit = 0
+
+    from main import mcp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.input_dir = tmp
+        path = os.path.join(tmp, "recipients.jsonl")
+        write_recipients(path, recipients)
+
+        async with MockSendGrid(latency=latency) as mock:
+            config.api_base_url = mock.base_url
+            async with Client(mcp, log_handler=ignore_logs) as client:
+                start = time.perf_counter()
+                result = await client.call_tool("send_bulk_template_email", {
+                    "template_id": "d-bench",
+                    "recipients_file": path
+                })
+                elapsed = time.perf_counter() - start
+            await close_http_clients()
+
+    data = result.structured_content
+    print(
+        f"{data['sent_recipients']} recipients in {len(data['chunks'])} requests "
+        f"({len(data['failures'])} failed) in {elapsed:.2f}s: {data['sent_recipients'] / elapsed:.0f} recipients/s"
+    )
+    print(f"upstream requests: {mock.requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=50000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.recipients, args.latency, args.concurrency))
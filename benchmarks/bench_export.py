@@ -0,0 +1,80 @@
+"""Measure export_contacts on a synthetic gzipped CSV export served by the mock.
+
+    python -m benchmarks.bench_export --contacts 1000000
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import os
+import resource
+import tempfile
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import close_http_clients
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_export(path: str, count: int) -> None:
+    with gzip.open(path, "wt", newline="", compresslevel=1) as f:
+        writer = csv.writer(f)
+        writer.writerow(["EMAIL", "FIRST_NAME", "LAST_NAME", "CONTACT_ID", "LIST_IDS", "CREATED_AT"])
+        for i in range(count):
+            writer.writerow([
+                f"user{i}@example.com", f"First{i}", f"Last, {i}", f"c-{i:08d}",
+                "list-a,list-b", "2024-01-01T00:00:00Z"
+            ])
+
+
+async def main(contacts: int) -> None:
+    config.sendgrid_api_key = "SG." + "e" * 66
+    config.rate_limit = 0
+    config.job_poll_interval = 0.01
+
+    from main import mcp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.data_dir = tmp
+        export_file = os.path.join(tmp, "export.csv.gz")
+        write_export(export_file, contacts)
+        rss_before = peak_rss_mb()
+
+        async with MockSendGrid(export_file=export_file) as mock:
+            config.api_base_url = mock.base_url
+            async with Client(mcp, log_handler=ignore_logs) as client:
+                start = time.perf_counter()
+                result = await client.call_tool("export_contacts", {})
+                elapsed = time.perf_counter() - start
+                export = result.structured_content
+
+                start = time.perf_counter()
+                page = await client.call_tool("read_contact_export", {
+                    "export_id": export["export_id"], "cursor": 0, "limit": 100
+                })
+                page_time = time.perf_counter() - start
+            await close_http_clients()
+
+        print(f"compressed export: {os.path.getsize(export_file) / 1e6:.1f} MB, "
+              f"ndjson: {os.path.getsize(export['path']) / 1e6:.1f} MB")
+    print(f"{export['contacts']} contacts exported in {elapsed:.2f}s ({export['contacts'] / elapsed:.0f}/s)")
+    print(f"first page of {len(page.structured_content['contacts'])} read in {page_time * 1000:.1f} ms")
+    print(f"peak RSS: {rss_before:.0f} MB before export, {peak_rss_mb():.0f} MB after")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=1000000)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts))
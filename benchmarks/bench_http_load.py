@@ -0,0 +1,117 @@
+"""Load-test the HTTP transport: tool-call latency at increasing concurrency.
+
+Starts the server as a subprocess (MCP_TRANSPORT=http, --workers processes)
+against the local SendGrid mock, then runs send_email from concurrent MCP
+client sessions and reports throughput and p50/p99 latency per level. With
+--rate-limit, the upstream request rate shows the quota holding across
+worker processes.
+
+    python -m benchmarks.bench_http_load --workers 4 --levels 1,8,32,64 --calls 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+
+API_KEY = "SG." + "x" * 66
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+async def run_level(url: str, concurrency: int, calls: int) -> list:
+    async def session(worker: int) -> list:
+        latencies = []
+        async with Client(url, auth=API_KEY, log_handler=ignore_logs) as client:
+            for i in range(calls):
+                start = time.perf_counter()
+                await client.call_tool("send_email", {
+                    "to_emails": f"load{worker}-{i}@example.com",
+                    "subject": "Load test",
+                    "content": "<p>Hello</p>"
+                })
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    results = await asyncio.gather(*(session(w) for w in range(concurrency)))
+    return [latency for latencies in results for latency in latencies]
+
+
+async def main(workers: int, levels: list, calls: int, latency: float, rate_limit: int) -> None:
+    port = free_port()
+    async with MockSendGrid(latency=latency) as mock:
+        env = dict(
+            os.environ,
+            MCP_TRANSPORT="http",
+            MCP_PORT=str(port),
+            MCP_WORKERS=str(workers),
+            SENDGRID_API_KEY=API_KEY,
+            SENDGRID_API_BASE_URL=mock.base_url,
+            DEFAULT_FROM_EMAIL="bench@example.com",
+            RATE_LIMIT=str(rate_limit),
+            DATA_DIR=tempfile.mkdtemp(prefix="sendgrid-mcp-bench-")
+        )
+        server = subprocess.Popen(
+            [sys.executable, "main.py"], cwd=ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            await wait_for_port(port)
+            url = f"http://127.0.0.1:{port}/mcp"
+            print(f"{workers} worker(s), mock latency {latency * 1000:.0f}ms, rate limit {rate_limit or 'off'}")
+            for concurrency in levels:
+                upstream_before = mock.requests
+                start = time.perf_counter()
+                latencies = sorted(await run_level(url, concurrency, calls))
+                elapsed = time.perf_counter() - start
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                print(
+                    f"concurrency {concurrency:4d}: {len(latencies) / elapsed:7.1f} calls/s, "
+                    f"p50 {statistics.median(latencies) * 1000:7.1f}ms, p99 {p99 * 1000:7.1f}ms, "
+                    f"upstream {(mock.requests - upstream_before) / elapsed:6.1f} req/s"
+                )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--levels", default="1,8,32,64")
+    parser.add_argument("--calls", type=int, default=20, help="calls per client session")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+    asyncio.run(main(args.workers, levels, args.calls, args.latency, args.rate_limit))
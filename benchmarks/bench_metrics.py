@@ -0,0 +1,54 @@
+"""Measure the per-call cost of metrics recording and tracing hooks.
+
+Times each primitive the request path uses (counter increment, histogram
+observation, endpoint label lookup, no-op span) and the full set recorded
+around one upstream request, then renders the Prometheus text output.
+
+    python -m benchmarks.bench_metrics --iterations 1000000
+"""
+
+import argparse
+import time
+
+from metrics import endpoint_label, metrics, rate_limit_wait, retries, span, upstream_duration
+
+
+def per_call(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label}: {elapsed:.3f}us per call")
+    return elapsed
+
+
+def instrumented_request() -> None:
+    # What _request records around one attempt, without the network call
+    label = endpoint_label("templates/d-0123456789abcdef")
+    rate_limit_wait.observe(0.0, "templates")
+    start = time.perf_counter()
+    with span("sendgrid.request", method="GET", endpoint=label):
+        pass
+    upstream_duration.observe(time.perf_counter() - start, "GET", label, "200")
+
+
+def main(iterations: int, budget_us: float) -> None:
+    per_call("empty loop", lambda: None, iterations)
+    per_call("counter inc", lambda: retries.inc("mail/send", "429"), iterations)
+    per_call("histogram observe", lambda: upstream_duration.observe(0.042, "POST", "mail/send", "202"), iterations)
+    per_call("endpoint label", lambda: endpoint_label("templates/d-0123456789abcdef"), iterations)
+    per_call("no-op span", lambda: span("sendgrid.request", method="GET"), iterations)
+    total = per_call("instrumented request", instrumented_request, iterations)
+
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"render: {(time.perf_counter() - start) * 1000:.2f}ms for {len(text.splitlines())} lines")
+    print(f"overhead budget {budget_us}us: {'ok' if total <= budget_us else 'EXCEEDED'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000000)
+    parser.add_argument("--budget-us", type=float, default=5.0)
+    args = parser.parse_args()
+    main(args.iterations, args.budget_us)
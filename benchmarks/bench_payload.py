@@ -0,0 +1,121 @@
+"""Compare /mail/send body building: sendgrid helper objects vs payloads.py.
+
+Checks that both produce byte-identical JSON for a set of cases, then times
+building single-personalization and bulk bodies for 1, 100 and 1000
+recipients and reports the peak memory allocated per build.
+
+    python -m benchmarks.bench_payload --iterations 200
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from sendgrid.helpers.mail import Content, From, Mail, Personalization, Subject, To
+
+from payloads import bulk_payload, mail_payload
+
+SENDER = ("bench@example.com", "Bench")
+
+
+def sdk_mail(to_emails, subject, content=None, content_type="text/html", template_id=None, data=None,
+             from_email=SENDER[0], from_name=SENDER[1]):
+    # The helper-object construction SendGridClient.build_mail used before payloads.py
+    mail = Mail(from_email=From(from_email, from_name), to_emails=[To(e) for e in to_emails], subject=Subject(subject))
+    if template_id:
+        mail.template_id = template_id
+        if data:
+            mail.dynamic_template_data = data
+    else:
+        mail.add_content(Content(content_type, content))
+    return mail.get()
+
+
+def sdk_bulk(recipients, template_id, subject=None, from_email=SENDER[0], from_name=SENDER[1]):
+    mail = Mail(from_email=From(from_email, from_name), subject=subject)
+    mail.template_id = template_id
+    for index, recipient in enumerate(recipients):
+        personalization = Personalization()
+        personalization.add_to(To(recipient["email"], recipient.get("name")))
+        if recipient.get("dynamic_template_data"):
+            personalization.dynamic_template_data = recipient["dynamic_template_data"]
+        mail.add_personalization(personalization, index)
+    return mail.get()
+
+
+def fast_mail(to_emails, subject, content=None, content_type="text/html", template_id=None, data=None,
+              from_email=SENDER[0], from_name=SENDER[1]):
+    return mail_payload(from_email, from_name, to_emails, subject, content=content, content_type=content_type,
+                        template_id=template_id, dynamic_template_data=data)
+
+
+def fast_bulk(recipients, template_id, subject=None, from_email=SENDER[0], from_name=SENDER[1]):
+    return bulk_payload(from_email, from_name, recipients, template_id, subject)
+
+
+def recipients(n):
+    return [{"email": f"user{i}@example.com", "name": f"User {i}" if i % 2 else None,
+             "dynamic_template_data": {"first_name": f"User {i}", "order": {"id": i}}} for i in range(n)]
+
+
+def check_identical() -> int:
+    cases = [
+        (sdk_mail, fast_mail, (["a@example.com"], "Hi"), {"content": "<p>Hi</p>"}),
+        (sdk_mail, fast_mail, (["Ann Lee <ann@example.com>", "b@example.com", "B@Example.com"], "Hi"),
+         {"content": "Hi", "content_type": "text/plain"}),
+        (sdk_mail, fast_mail, (['"Lee, Ann" <ann@example.com>'], ""), {"content": ""}),
+        (sdk_mail, fast_mail, (["a@example.com"], "Hi"), {"template_id": "d-1", "data": {"x": [1, 2]}}),
+        (sdk_mail, fast_mail, (["a@example.com"], "Hi"), {"template_id": "d-1", "data": {}}),
+        (sdk_mail, fast_mail, ([], "Hi"), {"template_id": "d-1", "data": {"x": 1}}),
+        (sdk_mail, fast_mail, ([], "Hi"), {"content": "x"}),
+        (sdk_mail, fast_mail, (["a@example.com"], "Hi"), {"content": "x", "from_email": "Ops <ops@example.com>",
+                                                            "from_name": None}),
+        (sdk_bulk, fast_bulk, (recipients(25), "d-1"), {}),
+        (sdk_bulk, fast_bulk, (recipients(3), "d-1"), {"subject": "Hello"}),
+        (sdk_bulk, fast_bulk, ([{"email": "Ann <ann@example.com>"}], "d-1"), {}),
+    ]
+    for sdk, fast, args, kwargs in cases:
+        expected = json.dumps(sdk(*args, **kwargs))
+        actual = json.dumps(fast(*args, **kwargs))
+        if expected != actual:
+            raise AssertionError(f"Bodies differ for {args!r} {kwargs!r}:\n{expected}\n{actual}")
+    return len(cases)
+
+
+def measure(fn, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(iterations: int) -> None:
+    print(f"{check_identical()} cases byte-identical")
+    for n in (1, 100, 1000):
+        emails = [f"user{i}@example.com" for i in range(n)]
+        bulk = recipients(n)
+        for label, sdk, fast in (
+            ("send_email", lambda: sdk_mail(emails, "Hi", content="<p>Hi</p>"),
+             lambda: fast_mail(emails, "Hi", content="<p>Hi</p>")),
+            ("bulk", lambda: sdk_bulk(bulk, "d-1"), lambda: fast_bulk(bulk, "d-1")),
+        ):
+            count = max(1, iterations // max(1, n // 10))
+            sdk_time, sdk_peak = measure(sdk, count)
+            fast_time, fast_peak = measure(fast, count)
+            print(f"{label:<10} {n:>5} recipients: sdk {sdk_time * 1e6:>10.1f}us {sdk_peak / 1024:>8.1f}KB  "
+                  f"direct {fast_time * 1e6:>9.1f}us {fast_peak / 1024:>8.1f}KB  "
+                  f"({sdk_time / fast_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.iterations)
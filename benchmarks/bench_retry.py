@@ -0,0 +1,60 @@
+"""Exercise retries and rate-limit feedback against a fault-injecting mock.
+
+Every request fetches a different template, so identical-GET coalescing
+and the template cache never merge requests and each one reaches the mock.
+
+    python -m benchmarks.bench_retry --requests 300 --error-rate 0.05 --throttle-rate 0.05 --quota 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import SendGridClient, close_http_clients, retry_budget
+from config import config
+from rate_limiter import rate_limiter
+
+API_KEY = "SG." + "r" * 66
+
+
+async def main(requests: int, concurrency: int, error_rate: float, throttle_rate: float, quota: int) -> None:
+    config.rate_limit = 1000
+    config.retry_backoff_base = 0.05
+    config.retry_backoff_max = 2.0
+
+    mock = MockSendGrid(error_rate=error_rate, throttle_rate=throttle_rate, quota=quota)
+    async with mock:
+        config.api_base_url = mock.base_url
+        client = SendGridClient(api_key=API_KEY)
+        semaphore = asyncio.Semaphore(concurrency)
+        failures = 0
+
+        async def one(index: int) -> None:
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await client.make_api_request("GET", f"templates/d-bench-{index}")
+                except Exception:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - start
+        await close_http_clients()
+
+    print(f"{requests} requests in {elapsed:.2f}s, {failures} failed after retries")
+    print(f"upstream responses by status: {dict(sorted(mock.status_counts.items()))}")
+    print(f"retries: {retry_budget(client.key_id).stats()}")
+    print(f"limiter: {rate_limiter.stats(client.key_id)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.05)
+    parser.add_argument("--quota", type=int, default=50, help="mock requests per second before 429s")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.error_rate, args.throttle_rate, args.quota))
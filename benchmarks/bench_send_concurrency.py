@@ -0,0 +1,59 @@
+"""Show that parallel send_email tool calls do not block each other.
+
+Each mock /mail/send call takes --latency seconds, so N concurrent calls
+should complete in roughly the time of one.
+
+    python -m benchmarks.bench_send_concurrency --calls 20 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import close_http_clients
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+async def main(calls: int, latency: float) -> None:
+    config.sendgrid_api_key = "SG." + "x" * 66
+    config.default_from_email = "bench@example.com"
+    config.rate_limit = 0
+
+    from main import mcp
+
+    async with MockSendGrid(latency=latency) as mock:
+        config.api_base_url = mock.base_url
+        async with Client(mcp, log_handler=ignore_logs) as client:
+            async def send(i: int) -> None:
+                await client.call_tool("send_email", {
+                    "to_emails": f"user{i}@example.com",
+                    "subject": "Benchmark",
+                    "content": "<p>Hello</p>"
+                })
+
+            start = time.perf_counter()
+            await send(0)
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await asyncio.gather(*(send(i) for i in range(calls)))
+            parallel = time.perf_counter() - start
+        await close_http_clients()
+
+    print(f"1 send: {single:.3f}s")
+    print(f"{calls} parallel sends: {parallel:.3f}s ({parallel / single:.2f}x a single send)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency))
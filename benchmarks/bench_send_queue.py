@@ -0,0 +1,81 @@
+"""Compare send_email tool latency inline versus through the send queue.
+
+Inline calls wait for the mock /mail/send round trip; queued calls return
+once the send is stored locally, and the dispatcher drains the queue in
+the background. The burst total shows how long the agent is blocked.
+
+    python -m benchmarks.bench_send_queue --calls 50 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import close_http_clients
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+async def timed_sends(client: Client, calls: int, prefix: str) -> list:
+    """Issue a burst of back-to-back send_email calls, as an agent would."""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        await client.call_tool("send_email", {
+            "to_emails": f"{prefix}{i}@example.com",
+            "subject": "Benchmark",
+            "content": "<p>Hello</p>"
+        })
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}: total {sum(latencies):.2f}s, median {statistics.median(latencies) * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms")
+
+
+async def main(calls: int, latency: float) -> None:
+    config.sendgrid_api_key = "SG." + "x" * 66
+    config.default_from_email = "bench@example.com"
+    config.rate_limit = 0
+    config.data_dir = tempfile.mkdtemp(prefix="sendgrid-mcp-bench-")
+
+    from main import mcp
+    from send_queue import get_send_queue
+
+    async with MockSendGrid(latency=latency) as mock:
+        config.api_base_url = mock.base_url
+        async with Client(mcp, log_handler=ignore_logs) as client:
+            config.send_queue_enabled = False
+            report(f"inline ({calls} calls)", await timed_sends(client, calls, "inline"))
+
+            config.send_queue_enabled = True
+            queue = get_send_queue()
+            key_id = queue.register_key(config.sendgrid_api_key)
+            queue.start()
+            start = time.perf_counter()
+            report(f"queued ({calls} calls)", await timed_sends(client, calls, "queued"))
+            while queue.stats(key_id)["depth"]:
+                await asyncio.sleep(0.05)
+            drained = time.perf_counter() - start
+            await queue.stop()
+            print(f"queue drained in {drained:.2f}s: {queue.stats(key_id)['by_status']}")
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency))
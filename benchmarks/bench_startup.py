@@ -0,0 +1,175 @@
+"""Measure cold start: time from spawning the STDIO server to its first tools/list.
+
+Each run starts a fresh `python main.py`, as an agent launcher does for
+every session, and times process start, the MCP initialize handshake and
+the first tools/list. The first run has an empty DATA_DIR, so it imports
+every tool module and writes the tool schema cache; later runs register
+tools from the cache. A run with TOOL_SCHEMA_CACHE=false shows the eager
+cost for comparison. An import-time breakdown of the server (python -X
+importtime) by top-level package follows, and modules that should only
+load on first use are checked not to be imported at startup.
+
+    python -m benchmarks.bench_startup --runs 10 --max-first-list-ms 2000 --max-own-import-ms 60
+
+Exits non-zero if the median time to first tools/list or the server's own
+import time exceeds its threshold, or a deferred module loads at startup.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only needed once a tool is called or a webhook is received
+DEFERRED = (
+    "sendgrid", "handlebars", "attachments", "bulk", "contact_index", "exports", "scheduler", "stats", "webhooks",
+    "tools.email_tools", "tools.contact_tools", "tools.diagnostics_tools", "tools.queue_tools",
+    "tools.schedule_tools", "tools.suppression_tools", "tools.delivery_tools", "tools.stats_tools"
+)
+
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def server_env(data_dir: str, **overrides: str) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "SENDGRID_API_KEY": "SG." + "s" * 66,
+        "MCP_TRANSPORT": "stdio",
+        "DATA_DIR": data_dir,
+        **overrides
+    }
+
+
+async def request(process: asyncio.subprocess.Process, message: dict) -> dict:
+    process.stdin.write(json.dumps(message).encode() + b"\n")
+    await process.stdin.drain()
+    if "id" not in message:
+        return {}
+    while True:
+        response = json.loads(await process.stdout.readline())
+        if response.get("id") == message["id"]:
+            return response
+
+
+async def first_tools_list(env: Dict[str, str]) -> Tuple[float, float, int]:
+    """Spawn the server and return (seconds to initialized, seconds to tools/list, tool count)."""
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", cwd=ROOT, env=env,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        await request(process, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "bench_startup", "version": "1"}
+            }
+        })
+        initialized = time.perf_counter() - start
+        await request(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        response = await request(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        listed = time.perf_counter() - start
+    finally:
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), 5)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    return initialized, listed, len(response["result"]["tools"])
+
+
+def own_modules() -> Set[str]:
+    """Top-level module names that belong to this server."""
+    return {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")} | {"tools"}
+
+
+def import_breakdown(env: Dict[str, str]) -> Tuple[Dict[str, float], Set[str]]:
+    """Self import time in ms by top-level package for `import main`, and the modules imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    own = own_modules()
+    totals: Dict[str, float] = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        modules.add(name)
+        package = name.split(".")[0]
+        group = "(this server)" if package in own else package
+        totals[group] = totals.get(group, 0.0) + int(match.group(1)) / 1000
+    return totals, modules
+
+
+def summarize(label: str, runs: List[Tuple[float, float, int]]) -> float:
+    listed = statistics.median(run[1] for run in runs) * 1000
+    initialized = statistics.median(run[0] for run in runs) * 1000
+    print(f"{label:<34} initialize {initialized:>7.0f}ms  first tools/list {listed:>7.0f}ms  "
+          f"({runs[0][2]} tools, {len(runs)} run(s))")
+    return listed
+
+
+async def main(args: argparse.Namespace) -> int:
+    data_dir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = server_env(data_dir)
+
+    summarize("first start (no schema cache)", [await first_tools_list(env)])
+    # Interleaved, so both configurations see the same machine load
+    eager_env = server_env(data_dir, TOOL_SCHEMA_CACHE="false")
+    cached_runs, eager_runs = [], []
+    for _ in range(args.runs):
+        cached_runs.append(await first_tools_list(env))
+        if args.eager:
+            eager_runs.append(await first_tools_list(eager_env))
+    cached = summarize("cached schemas, median", cached_runs)
+    if args.eager:
+        summarize("TOOL_SCHEMA_CACHE=false, median", eager_runs)
+
+    totals, modules = import_breakdown(env)
+    print(f"\nimport time by package (total {sum(totals.values()):.0f}ms):")
+    for package, ms in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        if package == "(this server)":
+            continue
+        print(f"  {package:<24} {ms:>7.1f}ms")
+    own = totals.get("(this server)", 0.0)
+    print(f"  {'(this server)':<24} {own:>7.1f}ms")
+    deferred = sorted(name for name in modules if name.split(".")[0] in DEFERRED or name in DEFERRED)
+
+    ok = True
+    if args.max_first_list_ms and cached > args.max_first_list_ms:
+        print(f"REGRESSION: first tools/list {cached:.0f}ms > {args.max_first_list_ms:.0f}ms")
+        ok = False
+    if args.max_own_import_ms and own > args.max_own_import_ms:
+        print(f"REGRESSION: server module import time {own:.1f}ms > {args.max_own_import_ms:.0f}ms")
+        ok = False
+    if deferred:
+        print(f"REGRESSION: imported at startup: {', '.join(deferred)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Server starts per configuration")
+    parser.add_argument("--no-eager", dest="eager", action="store_false", help="Skip the TOOL_SCHEMA_CACHE=false runs")
+    parser.add_argument("--top", type=int, default=10, help="Packages shown in the import breakdown")
+    parser.add_argument("--max-first-list-ms", type=float, default=2000,
+                        help="Fail if the median time to first tools/list exceeds this (0 disables)")
+    parser.add_argument("--max-own-import-ms", type=float, default=60,
+                        help="Fail if importing the server's own modules takes longer (0 disables)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,66 @@
+"""Measure upstream calls and latency of stats dashboard queries with the day cache.
+
+Runs a 90-day global dashboard (daily, weekly and monthly views) and a
+per-category dashboard through the MCP tools against the mock, first with a
+cold cache and then warm. With --today-ttl 0 every warm query refetches
+today, the worst case after warm-up.
+
+    python -m benchmarks.bench_stats --queries 50 --latency 0.1 --categories 25
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+async def run(client: Client, mock: MockSendGrid, label: str, tool: str, arguments: dict, queries: int) -> None:
+    before = mock.requests
+    start = time.perf_counter()
+    for _ in range(queries):
+        await client.call_tool(tool, arguments)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {(mock.requests - before) / queries:>6.2f} upstream calls/query  "
+          f"{elapsed / queries * 1000:>8.2f}ms/query")
+
+
+async def main(args: argparse.Namespace) -> None:
+    config.sendgrid_api_key = "SG." + "s" * 66
+    config.data_dir = tempfile.mkdtemp(prefix="bench-stats-")
+    config.stats_today_ttl = args.today_ttl
+
+    from server import mcp
+
+    dashboard = {"days": 90}
+    categories = {"days": 90, "categories": [f"template-{n}" for n in range(args.categories)]}
+
+    async with MockSendGrid(latency=args.latency) as mock:
+        config.api_base_url = mock.base_url
+        async with Client(mcp, log_handler=ignore_logs) as client:
+            await run(client, mock, "global 90d, cold", "get_email_stats", dashboard, 1)
+            await run(client, mock, "global 90d daily, warm", "get_email_stats", dashboard, args.queries)
+            await run(client, mock, "global 90d weekly, warm", "get_email_stats",
+                      {**dashboard, "aggregated_by": "week"}, args.queries)
+            await run(client, mock, "global 90d monthly, warm", "get_email_stats",
+                      {**dashboard, "aggregated_by": "month"}, args.queries)
+            await run(client, mock, f"{args.categories} categories 90d, cold", "get_category_stats", categories, 1)
+            await run(client, mock, f"{args.categories} categories 90d, warm", "get_category_stats",
+                      categories, args.queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50, help="Warm queries per view")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock response latency in seconds")
+    parser.add_argument("--categories", type=int, default=25, help="Categories in the per-category dashboard")
+    parser.add_argument("--today-ttl", type=float, default=0.0, help="STATS_TODAY_TTL for the run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""Measure per-call client setup cost and end-to-end tool-call overhead.
+
+Compares building a new SendGridClient for every call with the per-key
+client registry, for one tenant and for many, then times a cheap tool
+(get_rate_limit_stats) through the in-memory MCP client.
+
+    python -m benchmarks.bench_tool_overhead --iterations 100000 --tenants 500
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastmcp import Client
+
+from client import SendGridClient, client_registry
+from config import config
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+def per_call(label: str, fn, iterations: int) -> None:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed / iterations * 1e6:.2f}us per call")
+
+
+async def main(iterations: int, tenants: int, tool_calls: int) -> None:
+    config.sendgrid_api_key = "SG." + "x" * 66
+    keys = [f"SG.tenant{i:05d}." + "y" * 50 for i in range(tenants)]
+
+    per_call("new client, 1 tenant", lambda i: SendGridClient(api_key=config.sendgrid_api_key), iterations)
+    per_call("registry, 1 tenant", lambda i: client_registry.get(config.sendgrid_api_key), iterations)
+    per_call(f"new client, {tenants} tenants", lambda i: SendGridClient(api_key=keys[i % tenants]), iterations)
+    per_call(f"registry, {tenants} tenants", lambda i: client_registry.get(keys[i % tenants]), iterations)
+    print(f"registry: {client_registry.stats()}")
+
+    from main import mcp
+
+    async with Client(mcp, log_handler=ignore_logs) as client:
+        await client.call_tool("get_rate_limit_stats", {})
+        start = time.perf_counter()
+        for _ in range(tool_calls):
+            await client.call_tool("get_rate_limit_stats", {})
+        elapsed = time.perf_counter() - start
+    print(f"tool call round trip: {elapsed / tool_calls * 1000:.3f}ms per call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--tenants", type=int, default=500)
+    parser.add_argument("--tool-calls", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.tenants, args.tool_calls))
@@ -0,0 +1,66 @@
+"""Compare a fresh httpx client per call against the shared connection pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transport --requests 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from client import SendGridClient, close_http_clients
+from config import config
+
+API_KEY = "SG." + "x" * 66
+
+
+async def per_call_clients(base_url: str, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{base_url}/templates/d-bench")
+                response.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+
+async def pooled_clients(requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await SendGridClient(api_key=API_KEY).make_api_request("GET", "templates/d-bench")
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+
+async def main(requests: int, concurrency: int) -> None:
+    config.rate_limit = 0
+    for name in ("per-call", "pooled"):
+        async with MockSendGrid() as mock:
+            config.api_base_url = mock.base_url
+            start = time.perf_counter()
+            if name == "per-call":
+                await per_call_clients(mock.base_url, requests, concurrency)
+            else:
+                await pooled_clients(requests, concurrency)
+                await close_http_clients()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>9}: {requests} requests in {elapsed:.3f}s "
+                f"({requests / elapsed:.0f} req/s), {mock.connections} TCP connections"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
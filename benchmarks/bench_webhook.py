@@ -0,0 +1,128 @@
+"""Replay signed Event Webhook batches and measure ingest and query speed.
+
+Generates events for --messages messages (processed, delivered, open and
+sometimes click per message), signs each batch with a throwaway EC key the
+way SendGrid does, and posts the batches concurrently through the receiver
+with chunked request bodies. A fraction of batches is re-posted to exercise
+sg_event_id de-duplication. Then times message and recipient lookups.
+
+    python -m benchmarks.bench_webhook --messages 25000 --batch 1000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from config import config
+
+
+def make_events(messages: int) -> List[Dict[str, Any]]:
+    rng = random.Random(21)
+    events = []
+    now = int(time.time())
+    for m in range(messages):
+        email = f"user{m % (messages // 4 + 1)}@example.com"
+        sg_message_id = f"msg{m:08d}abcdefghij.filterdrecv-5bd4b6f5b-abcde-1-0"
+        names = ["processed", "delivered", "open"] + (["click"] if rng.random() < 0.3 else [])
+        for n, name in enumerate(names):
+            events.append({
+                "email": email,
+                "timestamp": now - 3600 + m % 3600 + n,
+                "smtp-id": f"<msg{m}@example.com>",
+                "event": name,
+                "category": ["benchmark"],
+                "sg_event_id": f"ev{m:08d}{n}",
+                "sg_message_id": sg_message_id,
+                "response": "250 OK" if name == "delivered" else None,
+                "useragent": "Mozilla/5.0" if name in ("open", "click") else None,
+                "url": "https://example.com/" if name == "click" else None
+            })
+    return events
+
+
+def signed_request(key: ec.EllipticCurvePrivateKey, body: bytes) -> Dict[str, str]:
+    timestamp = str(int(time.time()))
+    signature = key.sign(timestamp.encode() + body, ec.ECDSA(hashes.SHA256()))
+    return {
+        "X-Twilio-Email-Event-Webhook-Signature": base64.b64encode(signature).decode(),
+        "X-Twilio-Email-Event-Webhook-Timestamp": timestamp,
+        "Content-Type": "application/json"
+    }
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def main(args: argparse.Namespace) -> None:
+    key = ec.generate_private_key(ec.SECP256R1())
+    der = key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    config.webhook_public_key = base64.b64encode(der).decode()
+    config.data_dir = tempfile.mkdtemp(prefix="bench-webhook-")
+
+    from webhooks import get_event_store, handle_event_webhook
+
+    events = make_events(args.messages)
+    batches = [json.dumps(events[i:i + args.batch]).encode() for i in range(0, len(events), args.batch)]
+    replays = batches[:int(len(batches) * args.replay)]
+    posts = [(body, signed_request(key, body)) for body in batches + replays]
+    total_bytes = sum(len(body) for body, _ in posts)
+    print(f"{len(events)} events in {len(batches)} batches (+{len(replays)} replayed), {total_bytes / 1e6:.1f}MB")
+
+    app = Starlette(routes=[Route("/events", handle_event_webhook, methods=["POST"])])
+    transport = httpx.ASGITransport(app=app)
+    queue: "asyncio.Queue" = asyncio.Queue()
+    for post in posts:
+        queue.put_nowait(post)
+
+    async def worker(client: httpx.AsyncClient) -> int:
+        received = 0
+        while not queue.empty():
+            body, headers = queue.get_nowait()
+            response = await client.post("/events", content=chunked(body, args.chunk_size), headers=headers)
+            response.raise_for_status()
+            received += response.json()["received"]
+        return received
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        received = sum(await asyncio.gather(*(worker(client) for _ in range(args.concurrency))))
+        elapsed = time.perf_counter() - start
+
+    store = get_event_store()
+    stats = store.stats()
+    print(f"ingest: {received / elapsed:,.0f} events/s ({total_bytes / elapsed / 1e6:.1f}MB/s), "
+          f"{stats['events']} stored, {stats['duplicates']} duplicates ignored, {stats['commits']} commits")
+
+    rng = random.Random(7)
+    lookups = 2000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        store.message_events(f"msg{rng.randrange(args.messages):08d}abcdefghij")
+    print(f"message lookup: {(time.perf_counter() - start) / lookups * 1e6:.0f}us")
+    start = time.perf_counter()
+    for _ in range(lookups):
+        store.recipient_events(f"user{rng.randrange(args.messages // 4 + 1)}@example.com", 50)
+    print(f"recipient lookup: {(time.perf_counter() - start) / lookups * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=25000, help="Messages to generate events for")
+    parser.add_argument("--batch", type=int, default=1000, help="Events per webhook POST")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent POSTs")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="Request body chunk size in bytes")
+    parser.add_argument("--replay", type=float, default=0.1, help="Fraction of batches posted twice")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,345 @@
+"""Minimal in-process mock of the SendGrid v3 API for benchmarks.
+
+The server speaks plain HTTP/1.1 with keep-alive over asyncio streams, so it
+has no dependencies beyond the standard library and can count the TCP
+connections clients open against it.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from urllib.parse import parse_qs
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Scopes granted to every key unless overridden
+DEFAULT_SCOPES = (
+    "mail.send", "mail.batch.create", "templates.read", "marketing.read", "marketing.write",
+    "user.scheduled_sends.create", "user.scheduled_sends.delete", "suppression.read",
+    "stats.read", "categories.stats.read"
+)
+
+
+class FileBody:
+    """Response body streamed from a file on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+
+class MockSendGrid:
+    """Local stub serving the SendGrid v3 endpoints used by the server.
+
+    Faults can be injected with error_rate (random 503s) and throttle_rate
+    (random 429s). When quota is set, the server enforces quota requests per
+    quota_window seconds and sends X-RateLimit-* headers like SendGrid.
+    Contact import jobs report "pending" for job_duration seconds. Contact
+    exports serve export_file (any format, e.g. a gzipped CSV), streamed
+    from disk. GET /scopes returns scopes, or 401 for revoked_keys.
+    GET /suppression/{list} pages through suppressed, a dict of list name
+    to email addresses. GET /marketing/field_definitions lists the
+    custom_fields names with IDs e1_T, e2_T, ... GET /stats and
+    /categories/stats return day buckets whose metrics are derived from the
+    date (and category).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        quota: int = 0,
+        quota_window: float = 1.0,
+        job_duration: float = 0.0,
+        export_file: Optional[str] = None,
+        scopes: Optional[List[str]] = None,
+        revoked_keys: Optional[List[str]] = None,
+        suppressed: Optional[Dict[str, List[str]]] = None,
+        custom_fields: Optional[List[str]] = None
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.quota = quota
+        self.quota_window = quota_window
+        self.job_duration = job_duration
+        self.jobs: Dict[str, Tuple[float, int]] = {}
+        self.export_file = export_file
+        self.scopes = scopes if scopes is not None else list(DEFAULT_SCOPES)
+        self.revoked_keys = set(revoked_keys or [])
+        self.suppressed = suppressed or {}
+        self.custom_fields = custom_fields or []
+        self.connections = 0
+        self.requests = 0
+        self.bytes_received = 0
+        self.status_counts: Dict[int, int] = {}
+        self._window_start = time.time()
+        self._window_used = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamWriter, "asyncio.Task[None]"] = {}
+        self.base_url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening and return the v3 base URL."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}/v3"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._server:
+            self._server.close()
+            # Close keep-alive connections and let their handlers finish
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockSendGrid":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                path, _, query = target.partition("?")
+                # /mail/send bodies are counted but not kept, so large attachments don't skew memory use
+                keep_body = not (method == "POST" and path == "/v3/mail/send")
+                body = await self._read_body(reader, headers, keep_body)
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                status, extra_headers, payload = (
+                    self.inject_faults() or self.route(method, path, query, body, headers)
+                )
+                extra_headers.update(self.rate_limit_headers())
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+                if isinstance(payload, FileBody):
+                    await self._write_file(writer, status, extra_headers, payload.path)
+                else:
+                    self._write_response(writer, status, extra_headers, payload)
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str], keep: bool = True) -> bytes:
+        chunks = []
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunk = await reader.readexactly(size)
+                self.bytes_received += size
+                if keep:
+                    chunks.append(chunk)
+                await reader.readline()
+            return b"".join(chunks)
+        remaining = int(headers.get("content-length", "0"))
+        while remaining:
+            chunk = await reader.read(min(remaining, 256 * 1024))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(chunk)
+            self.bytes_received += len(chunk)
+            if keep:
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], payload: bytes) -> None:
+        lines = [f"HTTP/1.1 {status} Mock", f"Content-Length: {len(payload)}", "Connection: keep-alive"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+
+    async def _write_file(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], path: str) -> None:
+        lines = [f"HTTP/1.1 {status} Mock", f"Content-Length: {os.path.getsize(path)}", "Connection: keep-alive"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                writer.write(chunk)
+                await writer.drain()
+
+    def inject_faults(self) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """Return a 429 or 503 response when quota or fault injection says so."""
+        if self.quota:
+            now = time.time()
+            if now - self._window_start >= self.quota_window:
+                self._window_start = now
+                self._window_used = 0
+            self._window_used += 1
+            if self._window_used > self.quota:
+                return self._json(429, {"errors": [{"message": "too many requests"}]})
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            status, headers, payload = self._json(429, {"errors": [{"message": "too many requests"}]})
+            headers["Retry-After"] = "0.05"
+            return status, headers, payload
+        if self.error_rate and random.random() < self.error_rate:
+            return self._json(503, {"errors": [{"message": "service unavailable"}]})
+        return None
+
+    def rate_limit_headers(self) -> Dict[str, str]:
+        """Build X-RateLimit-* headers for the current quota window."""
+        if not self.quota:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(self.quota),
+            "X-RateLimit-Remaining": str(max(0, self.quota - self._window_used)),
+            "X-RateLimit-Reset": f"{self._window_start + self.quota_window:.3f}"
+        }
+
+    def route(
+        self, method: str, path: str, query: str, body: bytes, headers: Dict[str, str]
+    ) -> Tuple[int, Dict[str, str], Union[bytes, FileBody]]:
+        """Return (status, headers, body) for a request."""
+        if method == "GET" and path == "/v3/scopes":
+            if headers.get("authorization", "").removeprefix("Bearer ") in self.revoked_keys:
+                return self._json(401, {"errors": [{"message": "authorization required"}]})
+            return self._json(200, {"scopes": self.scopes})
+        if method == "POST" and path == "/v3/mail/send":
+            return 202, {"X-Message-Id": uuid.uuid4().hex}, b""
+        if method == "POST" and path == "/v3/mail/batch":
+            return self._json(201, {"batch_id": uuid.uuid4().hex})
+        if method == "POST" and path == "/v3/user/scheduled_sends":
+            return self._json(201, json.loads(body))
+        if method in ("PATCH", "DELETE") and path.startswith("/v3/user/scheduled_sends/"):
+            return 204, {}, b""
+        if method == "GET" and path.startswith("/v3/templates/"):
+            template_id = path.rsplit("/", 1)[-1]
+            etag = f'"{template_id}-v1"'
+            if headers.get("if-none-match") == etag:
+                return 304, {"ETag": etag}, b""
+            status, response_headers, payload = self._json(200, self.template(template_id))
+            response_headers["ETag"] = etag
+            return status, response_headers, payload
+        if method == "PUT" and path == "/v3/marketing/contacts":
+            job_id = str(uuid.uuid4())
+            self.jobs[job_id] = (time.time(), len(json.loads(body).get("contacts", [])))
+            return self._json(202, {"job_id": job_id})
+        if method == "GET" and path == "/v3/marketing/field_definitions":
+            return self._json(200, {
+                "custom_fields": [{"id": f"e{index}_T", "name": name, "field_type": "Text"}
+                                  for index, name in enumerate(self.custom_fields, start=1)],
+                "reserved_fields": []
+            })
+        if method == "GET" and path.startswith("/v3/marketing/contacts/imports/"):
+            return self._import_status(path.rsplit("/", 1)[-1])
+        if method == "POST" and path == "/v3/marketing/contacts/exports":
+            return self._json(202, {"id": uuid.uuid4().hex})
+        if method == "GET" and path.startswith("/v3/marketing/contacts/exports/"):
+            export_id = path.rsplit("/", 1)[-1]
+            origin = self.base_url.rsplit("/v3", 1)[0]
+            return self._json(200, {"id": export_id, "status": "ready", "urls": [f"{origin}/files/{export_id}"]})
+        if method == "GET" and path.startswith("/files/") and self.export_file:
+            return 200, {"Content-Type": "application/octet-stream"}, FileBody(self.export_file)
+        if method == "GET" and path.startswith("/v3/suppression/"):
+            return self._suppressions(path.rsplit("/", 1)[-1], query)
+        if method == "GET" and path in ("/v3/stats", "/v3/categories/stats"):
+            return self._stats(parse_qs(query), path == "/v3/categories/stats")
+        if method == "GET" and path == "/v3/marketing/contacts":
+            return self._json(200, {"result": [], "contact_count": 0})
+        return self._json(404, {"errors": [{"message": f"Unknown route {method} {path}"}]})
+
+    def _suppressions(self, list_name: str, query: str) -> Tuple[int, Dict[str, str], bytes]:
+        params = dict(part.split("=", 1) for part in query.split("&") if "=" in part)
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 500))
+        # Every entry reports the same created time; start_time filters on it like SendGrid
+        created = 1700000000
+        emails = self.suppressed.get(list_name, []) if created >= int(params.get("start_time", 0)) else []
+        return self._json(200, [
+            {"email": email, "created": created, "reason": "mock"} for email in emails[offset:offset + limit]
+        ])
+
+    def _stats(self, params: Dict[str, List[str]], by_category: bool) -> Tuple[int, Dict[str, str], bytes]:
+        start = date.fromisoformat(params["start_date"][0])
+        end = date.fromisoformat(params.get("end_date", [date.today().isoformat()])[0])
+        names = params.get("categories", []) if by_category else [None]
+        buckets = []
+        for n in range((end - start).days + 1):
+            day = (start + timedelta(days=n)).isoformat()
+            stats = []
+            for name in names:
+                seed = sum(map(ord, f"{day}{name}"))
+                requests = 1000 + seed % 500
+                delivered = requests - seed % 40
+                unique_opens = delivered * (20 + seed % 15) // 100
+                entry: Dict[str, Any] = {"metrics": {
+                    "requests": requests, "processed": requests, "delivered": delivered,
+                    "bounces": seed % 30, "blocks": seed % 10, "deferred": seed % 50,
+                    "opens": unique_opens * 2, "unique_opens": unique_opens,
+                    "clicks": unique_opens // 3, "unique_clicks": unique_opens // 4,
+                    "spam_reports": seed % 3, "unsubscribes": seed % 7
+                }}
+                if name is not None:
+                    entry.update({"name": name, "type": "category"})
+                stats.append(entry)
+            buckets.append({"date": day, "stats": stats})
+        return self._json(200, buckets)
+
+    def _import_status(self, job_id: str) -> Tuple[int, Dict[str, str], bytes]:
+        if job_id not in self.jobs:
+            return self._json(404, {"errors": [{"message": "job not found"}]})
+        started, count = self.jobs[job_id]
+        if time.time() - started < self.job_duration:
+            return self._json(200, {"id": job_id, "status": "pending", "job_type": "upsert"})
+        return self._json(200, {
+            "id": job_id,
+            "status": "completed",
+            "job_type": "upsert",
+            "results": {"requested_count": count, "created_count": count, "updated_count": 0, "errored_count": 0}
+        })
+
+    @staticmethod
+    def template(template_id: str) -> Dict[str, Any]:
+        """Build a dynamic template resource."""
+        return {
+            "id": template_id,
+            "name": "Benchmark template",
+            "generation": "dynamic",
+            "versions": [{
+                "id": f"{template_id}-v1",
+                "template_id": template_id,
+                "active": 1,
+                "name": "v1",
+                "subject": "Hello {{first_name}}",
+                "html_content": "<p>Hi {{first_name}}, your order {{order.id}} shipped.</p>",
+                "plain_content": "Hi {{first_name}}, your order {{order.id}} shipped."
+            }]
+        }
+
+    @staticmethod
+    def _json(status: int, payload: Any) -> Tuple[int, Dict[str, str], bytes]:
+        return status, {"Content-Type": "application/json"}, json.dumps(payload).encode()
@@ -0,0 +1,231 @@
+"""Benchmark suite: drive the email and contact tools against the SendGrid mock.
+
+Each scenario calls one tool through in-memory MCP client sessions at fixed
+concurrency levels (one session per concurrent caller) and records
+throughput, p50/p99 latency, errors, upstream requests and peak RSS. Results
+are written as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.suite --levels 1,8,32 --calls 200 --output before.json
+    python -m benchmarks.suite --levels 1,8,32 --calls 200 --compare before.json
+
+With --compare, the run exits non-zero if any scenario's throughput drops or
+p99 latency grows by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastmcp import Client
+
+from benchmarks.mock_sendgrid import MockSendGrid
+from config import config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tool arguments for call i of caller w
+SCENARIOS: Dict[str, Callable[[int, int], Dict[str, Any]]] = {
+    "send_email": lambda w, i: {
+        "to_emails": f"suite{w}-{i}@example.com",
+        "subject": "Benchmark",
+        "content": "<p>Benchmark</p>"
+    },
+    "send_template_email": lambda w, i: {
+        "to_emails": f"suite{w}-{i}@example.com",
+        "template_id": "d-suite",
+        "dynamic_template_data": {"first_name": "Ada", "order": {"id": i}}
+    },
+    "send_bulk_template_email": lambda w, i: {
+        "template_id": "d-suite",
+        "recipients": [{"email": f"bulk{w}-{i}-{r}@example.com", "data": {"n": r}} for r in range(100)]
+    },
+    "get_template_info": lambda w, i: {"template_id": "d-suite"},
+    "add_contact": lambda w, i: {"email": f"contact{w}-{i}@example.com", "first_name": "Ada"},
+    "get_contact_lists": lambda w, i: {}
+}
+
+
+async def ignore_logs(message) -> None:
+    pass
+
+
+def current_rss() -> int:
+    """Resident set size in bytes, from /proc where available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is the process peak, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler:
+    """Track peak RSS while a level runs by sampling in the background."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _sample(self) -> None:
+        while True:
+            self.peak = max(self.peak, current_rss())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "RSSSampler":
+        self.peak = current_rss()
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+        self.peak = max(self.peak, current_rss())
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_level(mcp, mock: MockSendGrid, scenario: str, concurrency: int, calls: int) -> Dict[str, Any]:
+    """Run calls tool calls split across concurrency sessions."""
+    make_args = SCENARIOS[scenario]
+    per_session = max(1, calls // concurrency)
+    errors = 0
+
+    async def session(worker: int) -> List[float]:
+        nonlocal errors
+        latencies = []
+        async with Client(mcp, log_handler=ignore_logs) as client:
+            for i in range(per_session):
+                start = time.perf_counter()
+                result = await client.call_tool(scenario, make_args(worker, i), raise_on_error=False)
+                latencies.append(time.perf_counter() - start)
+                if result.is_error:
+                    errors += 1
+        return latencies
+
+    upstream_before = mock.requests
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(session(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for session_latencies in results for latency in session_latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "calls": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "upstream_requests": mock.requests - upstream_before,
+        "peak_rss_mb": round(rss.peak / 1e6, 1)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """Print changes against a baseline run. Returns False on a regression."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\ncompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        throughput = result["throughput_per_s"] / before["throughput_per_s"] - 1
+        p99 = result["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        regressed = throughput < -tolerance or p99 > tolerance
+        ok = ok and not regressed
+        print(f"  {result['scenario']:<26} c={result['concurrency']:<4} "
+              f"throughput {throughput:+7.1%}  p99 {p99:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    config.sendgrid_api_key = "SG." + "s" * 66
+    config.default_from_email = "bench@example.com"
+    config.rate_limit = args.rate_limit
+    config.send_queue_enabled = False
+
+    from server import mcp
+
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    levels = [int(level) for level in args.levels.split(",")]
+    results = []
+
+    async with MockSendGrid(latency=args.latency, throttle_rate=args.throttle_rate, quota=args.quota) as mock:
+        config.api_base_url = mock.base_url
+        for scenario in scenarios:
+            # First calls pay for client setup and template/scope caching
+            async with Client(mcp, log_handler=ignore_logs) as client:
+                await client.call_tool(scenario, SCENARIOS[scenario](0, 0), raise_on_error=False)
+            for concurrency in levels:
+                result = await run_level(mcp, mock, scenario, concurrency, args.calls)
+                results.append(result)
+                print(f"{scenario:<26} c={concurrency:<4} {result['throughput_per_s']:>9.1f} calls/s  "
+                      f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                      f"errors {result['errors']:<4} rss {result['peak_rss_mb']}MB")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "levels": levels,
+            "calls": args.calls,
+            "latency": args.latency,
+            "throttle_rate": args.throttle_rate,
+            "quota": args.quota,
+            "rate_limit": args.rate_limit
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--levels", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=200, help="Tool calls per scenario and level")
+    parser.add_argument("--latency", type=float, default=0.01, help="Mock response latency in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--quota", type=int, default=0, help="Mock requests per second, with X-RateLimit headers")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Client-side RATE_LIMIT (0 disables)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
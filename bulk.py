@@ -0,0 +1,143 @@
+"""Streaming readers and chunking helpers for bulk recipient and contact data."""
+
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from inputs import resolve_input_path
+
+# Contact fields PUT /marketing/contacts accepts at the top level; others are custom fields
+CONTACT_FIELDS = frozenset((
+    "email", "first_name", "last_name", "alternate_emails", "address_line_1", "address_line_2", "city",
+    "state_province_region", "postal_code", "country", "phone_number_id", "external_id", "anonymous_id"
+))
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream records from a CSV file or a JSON Lines file (.jsonl/.ndjson) in the input directory.
+
+    Files are read line by line, so memory use does not grow with file size.
+    """
+    return _read_records(resolve_input_path(path))
+
+
+def _read_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if key and value not in (None, "")}
+        else:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number} of {path}: {str(e)}")
+                if not isinstance(record, dict):
+                    raise ValueError(f"Line {line_number} of {path} is not a JSON object")
+                yield record
+
+
+def iter_source(records: Optional[Iterable[Dict[str, Any]]], path: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Stream records from an inline list or a file path (exactly one is required)."""
+    if records and path:
+        raise ValueError("Provide either an inline list or a file path, not both")
+    if path:
+        return iter_records(path)
+    if records:
+        return iter(records)
+    raise ValueError("Either an inline list or a file path is required")
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def to_recipient(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a bulk-send record into {email, name, dynamic_template_data}.
+
+    JSON records may carry per-recipient data under "dynamic_template_data"
+    or "data"; for flat records (e.g. CSV rows) every column other than
+    email and name becomes template data.
+    """
+    email = str(record.get("email") or "").strip()
+    if not email:
+        raise ValueError(f"Recipient record is missing an email (fields: {', '.join(map(str, record))})")
+
+    data = record.get("dynamic_template_data", record.get("data"))
+    if data is None:
+        data = {key: value for key, value in record.items() if key not in ("email", "name")}
+    elif not isinstance(data, dict):
+        raise ValueError(f"Template data for {email} must be an object")
+
+    return {"email": email, "name": record.get("name") or None, "dynamic_template_data": data}
+
+
+def to_contact(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a contact record for PUT /marketing/contacts, dropping empty fields.
+
+    Fields other than SendGrid's reserved contact fields (e.g. extra CSV
+    columns) are moved under "custom_fields", keyed by name.
+    """
+    contact: Dict[str, Any] = {}
+    custom_fields: Dict[str, Any] = {}
+    for key, value in record.items():
+        if value in (None, ""):
+            continue
+        if key == "custom_fields" and isinstance(value, dict):
+            custom_fields.update({name: field for name, field in value.items() if field not in (None, "")})
+        elif key in CONTACT_FIELDS:
+            contact[key] = value
+        else:
+            custom_fields[key] = value
+    if not str(contact.get("email") or "").strip():
+        raise ValueError(f"Contact record is missing an email (fields: {', '.join(map(str, record))})")
+    contact["email"] = str(contact["email"]).strip()
+    if custom_fields:
+        contact["custom_fields"] = custom_fields
+    return contact
+
+
+def with_field_ids(contact: Dict[str, Any], field_ids: Dict[str, str]) -> Dict[str, Any]:
+    """Return a contact with its custom field keys mapped through field_ids (names to field IDs).
+
+    Keys missing from field_ids are passed through, so records may also
+    use field IDs directly.
+    """
+    custom_fields = contact.get("custom_fields")
+    if not custom_fields:
+        return contact
+    return {**contact, "custom_fields": {field_ids.get(name, name): value for name, value in custom_fields.items()}}
+
+
+def pack_batches(
+    items: Iterable[Dict[str, Any]],
+    max_count: int,
+    max_bytes: int
+) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """Group items into batches bounded by item count and serialized JSON size.
+
+    Yields (batch, size_in_bytes) pairs; only one batch is held at a time.
+    """
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for item in items:
+        # Each item costs its JSON encoding plus a ", " separator in the request body
+        item_bytes = len(json.dumps(item).encode("utf-8")) + 2
+        if item_bytes > max_bytes:
+            raise ValueError(f"Record for {item.get('email')} is larger than the {max_bytes}-byte request limit")
+        if batch and (len(batch) >= max_count or batch_bytes + item_bytes > max_bytes):
+            yield batch, batch_bytes
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += item_bytes
+    if batch:
+        yield batch, batch_bytes
@@ -0,0 +1,157 @@
+"""In-process caching primitives for SendGrid API responses."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class CacheEntry:
+    """A cached value with its expiry time and optional ETag."""
+
+    __slots__ = ("value", "expires_at", "etag")
+
+    def __init__(self, value: Any, expires_at: float, etag: Optional[str] = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries go stale after a TTL.
+
+    Stale entries are kept until evicted so callers can revalidate them
+    with their ETag instead of refetching.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+        # Cache statistics
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for a key, fresh or stale, counting a hit only if fresh."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.fresh:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for a key without touching LRU order or statistics."""
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, value: Any, etag: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = CacheEntry(value, expires_at, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def touch(self, key: Hashable) -> None:
+        """Mark a stale entry fresh again after a successful revalidation."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop entries matching predicate (all if None). Returns the number removed."""
+        if predicate is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions
+        }
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The shared call runs in its own task, so a cancelled waiter does not
+    cancel the work for the others; the call is only cancelled once every
+    waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+        # Single-flight statistics
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key, or join the call already in flight for it."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._calls[key] = call
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return leader and coalesced call counters."""
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.coalesced
+        }
@@ -1,15 +1,200 @@
 """SendGrid API client wrapper."""
 
 import asyncio
+import hashlib
+import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Union
 import httpx
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, From, To, Subject, Content
+from fastmcp.server.dependencies import get_access_token
+from cache import SingleFlight, TTLCache
 from config import config
+from metrics import endpoint_label, metrics, rate_limit_wait, retries, span, upstream_duration
+from payloads import bulk_payload, mail_payload
+from rate_limiter import endpoint_class, rate_limiter
+from streaming import StreamingBody, has_streamed_attachments
 
 logger = logging.getLogger(__name__)
 
+# Process-wide HTTP clients, one connection pool per SendGrid API base URL
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+
+# One pool shared by downloads from other hosts (export files), so they can't add pools
+_download_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """Check whether HTTP/2 was requested and the h2 package is installed."""
+    if not config.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def get_http_client(base_url: str) -> httpx.AsyncClient:
+    """Return the shared keep-alive HTTP client for a base URL."""
+    client = _http_clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=config.http_max_connections,
+                max_keepalive_connections=config.http_max_keepalive,
+                keepalive_expiry=config.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(config.http_timeout, connect=config.http_connect_timeout)
+        )
+        _http_clients[base_url] = client
+    return client
+
+
+def get_download_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client for file downloads from hosts other than the API."""
+    global _download_client
+    if _download_client is None or _download_client.is_closed:
+        _download_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.http_max_connections,
+                max_keepalive_connections=config.http_max_keepalive,
+                keepalive_expiry=config.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(config.http_timeout, connect=config.http_connect_timeout)
+        )
+    return _download_client
+
+
+async def close_http_clients() -> None:
+    """Close all shared HTTP clients and their pooled connections."""
+    global _download_client
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    if _download_client is not None:
+        clients.append(_download_client)
+        _download_client = None
+    for client in clients:
+        await client.aclose()
+
+
+# Retry policy: 429 is always safe to retry because SendGrid rejected the request
+# before processing it; 5xx and network errors are only retried for idempotent
+# methods unless the caller opts in.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class RetryBudget:
+    """Cap retries to a fraction of recent requests so retries can't amplify an outage."""
+
+    def __init__(self, ratio: float, min_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = min_tokens * 10
+        self._tokens = min_tokens
+
+        # Retry statistics
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        """Earn a fraction of a retry for every original request."""
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if any are left."""
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return retry budget statistics."""
+        return {
+            "retries": self.retries,
+            "budget_exhausted": self.exhausted,
+            "budget_remaining": round(self._tokens, 2)
+        }
+
+
+# Retry budgets keyed by API key fingerprint
+_retry_budgets: Dict[str, RetryBudget] = {}
+
+
+def retry_budget(key_id: str) -> RetryBudget:
+    """Return the shared retry budget for an API key."""
+    budget = _retry_budgets.get(key_id)
+    if budget is None:
+        budget = RetryBudget(config.retry_budget_ratio)
+        _retry_budgets[key_id] = budget
+    return budget
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(config.retry_backoff_max, config.retry_backoff_base * 2 ** attempt))
+
+
+def _server_retry_delay(response: httpx.Response) -> Optional[float]:
+    """Read the wait SendGrid asks for from Retry-After or X-RateLimit-Reset."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = response.headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+# SendGrid accepts at most 1000 personalizations per /mail/send request
+MAX_PERSONALIZATIONS = 1000
+
+# SendGrid accepts send_at up to 72 hours ahead
+MAX_SCHEDULE_AHEAD = 72 * 3600
+
+
+def _schedule(payload: Dict[str, Any], send_at: Optional[int], batch_id: Optional[str]) -> None:
+    """Add send_at and batch_id to a /mail/send body, checking the scheduling window."""
+    if send_at is not None:
+        if send_at > time.time() + MAX_SCHEDULE_AHEAD:
+            raise ValueError("send_at can be at most 72 hours in the future")
+        payload["send_at"] = int(send_at)
+    if batch_id:
+        payload["batch_id"] = batch_id
+
+# Template metadata cache keyed by (API key fingerprint, template ID)
+template_cache = TTLCache(config.template_cache_size, config.template_cache_ttl)
+_template_fetches = SingleFlight()
+metrics.register_cache("templates", template_cache)
+
+# Identical in-flight GETs share one upstream call
+request_flights = SingleFlight()
+metrics.collected(
+    "sendgrid_mcp_coalesced_requests_total", "GET requests that joined an identical call in flight",
+    "counter", (), lambda: [((), request_flights.coalesced)]
+)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Return a short, non-reversible identifier for an API key."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
 
 class SendGridClient:
     """Async wrapper for SendGrid API client."""
@@ -20,16 +205,15 @@ class SendGridClient:
         if not self._api_key:
             raise ValueError("SendGrid API key is required")
             
-        self.client = SendGridAPIClient(api_key=self._api_key)
-        self.base_url = "https://api.sendgrid.com/v3"
-        
-        # Rate limiting
-        self._rate_limit = config.rate_limit
-        self._last_request_time = 0.0
+        self.key_id = key_fingerprint(self._api_key)
+        self.base_url = config.api_base_url
+        self.last_used = time.monotonic()
 
     @classmethod
     def from_context(cls, ctx=None) -> 'SendGridClient':
-        """Create a client instance using API key from context or default.
+        """Return the client for the API key from context or default.
+
+        Clients are reused across tool calls through the per-key registry.
 
         Args:
             ctx: FastMCP context that may contain authenticated Bearer token
@@ -40,23 +224,71 @@ class SendGridClient:
         # Try to get API key from FastMCP context first (Bearer token)
         if ctx and hasattr(ctx, 'token') and ctx.token:
             # Use the Bearer token provided by the MCP client
-            return cls(api_key=ctx.token)
+            return client_registry.get(ctx.token)
+
+        # Over HTTP, the verified Bearer token is attached to the request
+        access_token = get_access_token()
+        if access_token and access_token.token:
+            return client_registry.get(access_token.token)
 
         # Fall back to default API key from environment configuration
-        return cls(api_key=config.sendgrid_api_key)
-        
-    async def _rate_limit_request(self) -> None:
-        """Apply rate limiting delay between API requests."""
-        if self._rate_limit > 0:
-            current_time = asyncio.get_event_loop().time()
-            time_since_last = current_time - self._last_request_time
-            min_interval = 1.0 / self._rate_limit
-            
-            if time_since_last < min_interval:
-                await asyncio.sleep(min_interval - time_since_last)
-            
-            self._last_request_time = asyncio.get_event_loop().time()
-    
+        return client_registry.get(config.sendgrid_api_key)
+        
+    def build_mail(
+        self,
+        to_emails: Union[str, List[str]],
+        subject: str,
+        content: str,
+        content_type: str = "text/html",
+        from_email: Optional[str] = None,
+        from_name: Optional[str] = None,
+        template_id: Optional[str] = None,
+        dynamic_template_data: Optional[Dict[str, Any]] = None,
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        send_at: Optional[int] = None,
+        batch_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the v3 /mail/send request body, optionally scheduled with send_at/batch_id."""
+        # Use defaults if not provided
+        sender_email = from_email or config.default_from_email
+        sender_name = from_name or config.default_from_name
+        
+        # Only use default template if it's a template-based email
+        if dynamic_template_data:
+            template_id = template_id or config.default_template_id
+        
+        if not sender_email:
+            raise ValueError("From email is required")
+        
+        if dynamic_template_data and not template_id:
+            raise ValueError("Template ID is required when using dynamic template data")
+        
+        # Template validation is handled by AI using MCP tools
+
+        # Handle multiple recipients
+        if isinstance(to_emails, str):
+            to_emails = [to_emails]
+        
+        # Same body as sendgrid.helpers.mail's Mail.get(), without the helper objects
+        payload = mail_payload(
+            sender_email,
+            sender_name,
+            to_emails,
+            subject,
+            content=content,
+            content_type=content_type,
+            template_id=template_id,
+            dynamic_template_data=dynamic_template_data
+        )
+        
+        # Attachments are /mail/send attachment dicts, with inline "content"
+        # or a "content_path" from attachments.prepare_attachments
+        if attachments:
+            payload["attachments"] = list(attachments)
+        _schedule(payload, send_at, batch_id)
+        
+        return payload
+
     async def send_email(
         self,
         to_emails: Union[str, List[str]],
@@ -67,108 +299,370 @@ class SendGridClient:
         from_name: Optional[str] = None,
         template_id: Optional[str] = None,
         dynamic_template_data: Optional[Dict[str, Any]] = None,
-        attachments: Optional[List[Dict[str, Any]]] = None
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        send_at: Optional[int] = None,
+        batch_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Send email via SendGrid API with optional template support."""
-        await self._rate_limit_request()
+        """Send email via SendGrid API with optional template support and scheduling."""
+        if isinstance(to_emails, str):
+            to_emails = [to_emails]
         
         try:
-            # Use defaults if not provided
-            sender_email = from_email or config.default_from_email
-            sender_name = from_name or config.default_from_name
-            
-            # Only use default template if it's a template-based email
-            if dynamic_template_data:
-                template_id = template_id or config.default_template_id
-            
-            if not sender_email:
-                raise ValueError("From email is required")
-            
-            if dynamic_template_data and not template_id:
-                raise ValueError("Template ID is required when using dynamic template data")
-            
-            # Template validation is handled by AI using MCP tools
-
-            # Create the mail object
-            from_addr = From(sender_email, sender_name)
-            
-            # Handle multiple recipients
-            if isinstance(to_emails, str):
-                to_emails = [to_emails]
-            
-            to_list = [To(email) for email in to_emails]
-            
-            mail = Mail(
-                from_email=from_addr,
-                to_emails=to_list,
-                subject=Subject(subject)
-            )
-            
-            # Add content
-            if template_id:
-                mail.template_id = template_id
-                if dynamic_template_data:
-                    mail.dynamic_template_data = dynamic_template_data
-            else:
-                mail.add_content(Content(content_type, content))
-            
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    mail.add_attachment(attachment)
-            
-            # Send the email
-            response = self.client.send(mail)
-            
-            return {
-                "status_code": response.status_code,
-                "message": "Email sent successfully",
-                "message_id": response.headers.get("X-Message-Id"),
-                "to_emails": to_emails
-            }
+            with span("sendgrid.send_email", recipients=len(to_emails), scheduled=send_at is not None):
+                payload = self.build_mail(
+                    to_emails=to_emails,
+                    subject=subject,
+                    content=content,
+                    content_type=content_type,
+                    from_email=from_email,
+                    from_name=from_name,
+                    template_id=template_id,
+                    dynamic_template_data=dynamic_template_data,
+                    attachments=attachments,
+                    send_at=send_at,
+                    batch_id=batch_id
+                )
+                
+                result = await self.send_payload(payload)
+            result["to_emails"] = to_emails
+            return result
             
         except Exception as e:
             logger.error(f"Failed to send email: {str(e)}")
             raise
     
-    async def make_api_request(
+    def build_bulk_mail(
+        self,
+        recipients: List[Dict[str, Any]],
+        template_id: str,
+        subject: Optional[str] = None,
+        from_email: Optional[str] = None,
+        from_name: Optional[str] = None,
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        send_at: Optional[int] = None,
+        batch_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build a /mail/send body with one personalization per recipient.
+
+        Each recipient is a dict with "email" and optional "name" and
+        "dynamic_template_data", so recipients never see each other.
+        """
+        sender_email = from_email or config.default_from_email
+        sender_name = from_name or config.default_from_name
+        
+        if not sender_email:
+            raise ValueError("From email is required")
+        if len(recipients) > MAX_PERSONALIZATIONS:
+            raise ValueError(f"At most {MAX_PERSONALIZATIONS} recipients are allowed per request")
+        
+        payload = bulk_payload(sender_email, sender_name, recipients, template_id, subject)
+        if attachments:
+            payload["attachments"] = list(attachments)
+        _schedule(payload, send_at, batch_id)
+        return payload
+
+    async def send_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Post a prepared /mail/send body through the shared async transport.
+
+        Attachments that reference encoded files on disk are streamed into
+        the request body rather than loaded into memory.
+        """
+        if has_streamed_attachments(payload):
+            response = await self._request(
+                "POST",
+                "mail/send",
+                content=StreamingBody(payload),
+                retry_unsafe=config.retry_mail_send
+            )
+        else:
+            response = await self._request(
+                "POST",
+                "mail/send",
+                data=payload,
+                retry_unsafe=config.retry_mail_send
+            )
+        
+        return {
+            "status_code": response.status_code,
+            "message": "Email sent successfully",
+            "message_id": response.headers.get("X-Message-Id")
+        }
+
+    async def create_batch(self) -> str:
+        """Allocate a batch ID for grouping scheduled sends."""
+        response = await self.make_api_request("POST", "/mail/batch")
+        return response["batch_id"]
+
+    async def set_batch_status(self, batch_id: str, status: str, existing: bool = False) -> Dict[str, Any]:
+        """Pause or cancel a scheduled batch ("pause" or "cancel").
+
+        A batch that is already paused or canceled is updated in place.
+        """
+        if status not in ("pause", "cancel"):
+            raise ValueError("Batch status must be 'pause' or 'cancel'")
+        if existing:
+            return await self.make_api_request(
+                "PATCH", f"/user/scheduled_sends/{batch_id}", data={"status": status}
+            )
+        return await self.make_api_request(
+            "POST", "/user/scheduled_sends", data={"batch_id": batch_id, "status": status}
+        )
+
+    async def resume_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Resume a paused batch by deleting its scheduled-send status."""
+        return await self.make_api_request("DELETE", f"/user/scheduled_sends/{batch_id}")
+
+    async def _request(
         self,
         method: str,
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
-        params: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Make HTTP request to SendGrid API endpoint."""
-        await self._rate_limit_request()
+        params: Optional[Dict[str, Any]] = None,
+        retry_unsafe: bool = False,
+        extra_headers: Optional[Dict[str, str]] = None,
+        content: Optional[StreamingBody] = None
+    ) -> httpx.Response:
+        """Send a rate-limited request through the shared connection pool.
+
+        The body is data as JSON, or a streamed content body if given.
+
+        Retries 429s, 5xx responses and network errors with jittered
+        exponential backoff, honoring Retry-After and X-RateLimit-Reset.
+        Non-idempotent methods are only retried on 429 or connection
+        failures unless retry_unsafe is set.
+        """
+        method = method.upper()
+        retryable = retry_unsafe or method in IDEMPOTENT_METHODS
+        budget = retry_budget(self.key_id)
+        budget.record_request()
         
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers = {
             "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json"
         }
+        if extra_headers:
+            headers.update(extra_headers)
+        if content is not None:
+            headers["Content-Length"] = str(content.length)
         
-        async with httpx.AsyncClient() as client:
+        client = get_http_client(self.base_url)
+        label = endpoint_label(endpoint)
+        attempt = 0
+        while True:
+            waited = await rate_limiter.acquire(self.key_id, endpoint)
+            rate_limit_wait.observe(waited, endpoint_class(endpoint))
+            if waited:
+                logger.debug(f"Rate limited {method} {endpoint} for {waited:.3f}s")
+            
+            start = time.perf_counter()
             try:
                 response = await client.request(
                     method=method,
                     url=url,
                     headers=headers,
-                    json=data,
-                    params=params,
-                    timeout=30.0
+                    json=data if content is None else None,
+                    content=content,
+                    params=params
                 )
-                response.raise_for_status()
-                
-                if response.content:
-                    return response.json()
+            except httpx.TransportError as e:
+                upstream_duration.observe(time.perf_counter() - start, method, label, "error")
+                # Connection failures never reached SendGrid, so any method may retry
+                can_retry = retryable or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if can_retry and attempt < config.max_retries and budget.try_spend():
+                    delay = _backoff_delay(attempt)
+                    attempt += 1
+                    retries.inc(label, "network")
+                    logger.warning(f"{method} {endpoint} failed ({str(e)}), retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Request failed: {str(e)}")
+                raise
+            
+            status = response.status_code
+            upstream_duration.observe(time.perf_counter() - start, method, label, str(status))
+            await rate_limiter.observe(self.key_id, endpoint, response.headers)
+            
+            if (
+                status in RETRYABLE_STATUS_CODES
+                and (retryable or status == 429)
+                and attempt < config.max_retries
+            ):
+                delay = _server_retry_delay(response)
+                if delay is None:
+                    delay = _backoff_delay(attempt)
                 else:
-                    return {"status": "success", "status_code": response.status_code}
-                    
+                    delay += random.uniform(0, config.retry_backoff_base)
+                if delay <= config.retry_backoff_max and budget.try_spend():
+                    attempt += 1
+                    retries.inc(label, str(status))
+                    logger.warning(f"{method} {endpoint} returned {status}, retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+            
+            if status == 304:
+                # Conditional request: the caller's cached copy is still valid
+                return response
+            
+            try:
+                response.raise_for_status()
             except httpx.HTTPStatusError as e:
                 logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
                 raise
-            except Exception as e:
-                logger.error(f"Request failed: {str(e)}")
-                raise
+            return response
+
+    async def make_api_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Make HTTP request to SendGrid API endpoint.
+
+        Concurrent identical GET requests for the same API key are coalesced
+        into a single upstream call whose response is shared by all callers.
+        """
+        with span("sendgrid.request", method=method.upper(), endpoint=endpoint_label(endpoint)):
+            if method.upper() == "GET" and data is None:
+                flight_key = (
+                    self.key_id,
+                    "GET",
+                    endpoint.strip("/"),
+                    json.dumps(params, sort_keys=True, default=str) if params else ""
+                )
+                response = await request_flights.do(
+                    flight_key,
+                    lambda: self._request(method, endpoint, params=params)
+                )
+            else:
+                response = await self._request(method, endpoint, data=data, params=params)
+        
+        if response.content:
+            return response.json()
+        else:
+            return {"status": "success", "status_code": response.status_code}
+
+    async def wait_for_job(
+        self,
+        endpoint: str,
+        is_done: Callable[[Dict[str, Any]], bool],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Poll an asynchronous job's status endpoint with backoff until is_done is true."""
+        timeout = timeout or config.job_timeout
+        interval = config.job_poll_interval
+        deadline = time.monotonic() + timeout
+        while True:
+            status = await self.make_api_request("GET", endpoint)
+            if is_done(status):
+                return status
+            if time.monotonic() + interval > deadline:
+                raise TimeoutError(f"Job {endpoint} did not finish within {timeout:.0f}s")
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, config.job_poll_max_interval)
+
+    async def get_template(self, template_id: str) -> Dict[str, Any]:
+        """Fetch template metadata, served from the template cache when fresh."""
+        key = (self.key_id, template_id)
+        entry = template_cache.get(key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        return await _template_fetches.do(key, lambda: self._fetch_template(template_id))
+
+    async def _fetch_template(self, template_id: str) -> Dict[str, Any]:
+        """Load a template, revalidating a stale cached copy by ETag when possible."""
+        key = (self.key_id, template_id)
+        entry = template_cache.peek(key)
+        extra_headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        
+        response = await self._request("GET", f"templates/{template_id}", extra_headers=extra_headers)
+        if response.status_code == 304 and entry is not None:
+            template_cache.touch(key)
+            return entry.value
+        
+        template = response.json()
+        template_cache.set(key, template, etag=response.headers.get("ETag"))
+        return template
+
+
+def invalidate_templates(key_id: str, template_id: Optional[str] = None) -> int:
+    """Drop cached templates for an API key. Returns the number of entries removed."""
+    return template_cache.invalidate(
+        lambda key: key[0] == key_id and (template_id is None or key[1] == template_id)
+    )
+
+
+class ClientRegistry:
+    """Bounded registry of SendGridClient instances keyed by API key fingerprint.
+
+    Clients unused for CLIENT_IDLE_TTL seconds, or pushed out when the
+    registry is full, are evicted together with their key's rate limiter
+    buckets, retry budget and cached templates.
+    """
+
+    def __init__(self, max_size: int, idle_ttl: float):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients: "OrderedDict[str, SendGridClient]" = OrderedDict()
+
+        # Registry statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, api_key: Optional[str]) -> SendGridClient:
+        """Return the client for an API key, creating it on first use."""
+        if not api_key:
+            raise ValueError("SendGrid API key is required")
+        key_id = key_fingerprint(api_key)
+        now = time.monotonic()
+
+        client = self._clients.get(key_id)
+        if client is not None:
+            self._clients.move_to_end(key_id)
+            client.last_used = now
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        self._evict_idle(now)
+        client = SendGridClient(api_key=api_key)
+        self._clients[key_id] = client
+        while len(self._clients) > self.max_size:
+            self._evict(next(iter(self._clients)))
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        # Entries are in least-recently-used order, so idle ones are at the front
+        while self._clients:
+            key_id, client = next(iter(self._clients.items()))
+            if now - client.last_used < self.idle_ttl:
+                return
+            self._evict(key_id)
+
+    def _evict(self, key_id: str) -> None:
+        del self._clients[key_id]
+        rate_limiter.forget(key_id)
+        _retry_budgets.pop(key_id, None)
+        invalidate_templates(key_id)
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return registry size and hit/miss counters."""
+        return {
+            "clients": len(self._clients),
+            "max_size": self.max_size,
+            "idle_ttl_seconds": self.idle_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
 
 
+# Global client registry
+client_registry = ClientRegistry(config.client_cache_size, config.client_idle_ttl)
+metrics.register_cache("clients", client_registry)
@@ -1,13 +1,19 @@
 """Configuration management for SendGrid MCP Server."""
 
 import os
-from typing import Optional
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+def _optional_int(name: str) -> Optional[int]:
+    """Read an optional integer environment variable."""
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
 class SendGridConfig:
     """Simplified configuration for SendGrid MCP Server."""
 
@@ -22,12 +28,130 @@ class SendGridConfig:
         # Optional template settings
         self.default_template_id: Optional[str] = os.getenv("DEFAULT_TEMPLATE_ID")
 
-        # Rate limiting (requests per second)
+        # SendGrid API endpoint (override to point at a proxy or local stub)
+        self.api_base_url: str = os.getenv("SENDGRID_API_BASE_URL", "https://api.sendgrid.com/v3").rstrip("/")
+
+        # Rate limiting (requests per second, shared by all clients using the same API key)
         self.rate_limit: int = int(os.getenv("RATE_LIMIT", "10"))
+        self.rate_limit_burst: Optional[int] = _optional_int("RATE_LIMIT_BURST")
+        # "memory" (per process) or "sqlite" (shared by worker processes)
+        self.rate_limit_store: str = os.getenv(
+            "RATE_LIMIT_STORE", "sqlite" if int(os.getenv("MCP_WORKERS", "1")) > 1 else "memory"
+        ).lower()
+        self.endpoint_rate_limits: Dict[str, Optional[int]] = {
+            "mail": _optional_int("RATE_LIMIT_MAIL"),
+            "marketing": _optional_int("RATE_LIMIT_MARKETING"),
+            "templates": _optional_int("RATE_LIMIT_TEMPLATES")
+        }
+
+        # Bearer token verification: "format" checks the key shape only, "scopes"
+        # also verifies the key and its scopes with SendGrid (cached per key)
+        self.auth_verify_mode: str = os.getenv("AUTH_VERIFY_MODE", "format").lower()
+        self.scope_cache_ttl: float = float(os.getenv("SCOPE_CACHE_TTL", "3600"))
+        self.scope_cache_negative_ttl: float = float(os.getenv("SCOPE_CACHE_NEGATIVE_TTL", "60"))
+        self.scope_cache_size: int = int(os.getenv("SCOPE_CACHE_SIZE", "1024"))
+
+        # MCP transport: "stdio", or "http" (streamable HTTP) / "sse" to serve many clients
+        self.mcp_transport: str = os.getenv("MCP_TRANSPORT", "stdio").lower()
+        self.mcp_host: str = os.getenv("MCP_HOST", "127.0.0.1")
+        self.mcp_port: int = int(os.getenv("MCP_PORT", "8000"))
+        self.mcp_path: Optional[str] = os.getenv("MCP_PATH")
+        self.mcp_workers: int = int(os.getenv("MCP_WORKERS", "1"))
+
+        # Per-API-key client registry (multi-tenant deployments)
+        self.client_cache_size: int = int(os.getenv("CLIENT_CACHE_SIZE", "1000"))
+        self.client_idle_ttl: float = float(os.getenv("CLIENT_IDLE_TTL", "3600"))
+
+        # Template metadata cache
+        self.template_cache_ttl: float = float(os.getenv("TEMPLATE_CACHE_TTL", "300"))
+        self.template_cache_size: int = int(os.getenv("TEMPLATE_CACHE_SIZE", "256"))
+        # Compiled template versions for local rendering, keyed by version ID
+        self.compiled_template_cache_size: int = int(os.getenv("COMPILED_TEMPLATE_CACHE_SIZE", "256"))
+
+        # Bulk sends: recipients per request (max 1000) and concurrent requests
+        self.bulk_chunk_size: int = min(int(os.getenv("BULK_CHUNK_SIZE", "1000")), 1000)
+        self.bulk_concurrency: int = int(os.getenv("BULK_CONCURRENCY", "4"))
+
+        # Bulk contact upserts: batch limits per PUT /marketing/contacts request
+        self.contact_batch_size: int = int(os.getenv("CONTACT_BATCH_SIZE", "30000"))
+        self.contact_batch_bytes: int = int(os.getenv("CONTACT_BATCH_BYTES", str(6 * 1024 * 1024 - 64 * 1024)))
+
+        # Polling of asynchronous SendGrid jobs (contact imports)
+        self.job_poll_interval: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+        self.job_poll_max_interval: float = float(os.getenv("JOB_POLL_MAX_INTERVAL", "30"))
+        self.job_timeout: float = float(os.getenv("JOB_TIMEOUT", "900"))
+
+        # Retries for 429, 5xx and network errors
+        self.max_retries: int = int(os.getenv("MAX_RETRIES", "3"))
+        self.retry_backoff_base: float = float(os.getenv("RETRY_BACKOFF_BASE", "0.5"))
+        self.retry_backoff_max: float = float(os.getenv("RETRY_BACKOFF_MAX", "30"))
+        self.retry_budget_ratio: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+        # Retrying /mail/send after a 5xx or timeout can deliver the same email twice
+        self.retry_mail_send: bool = os.getenv("RETRY_MAIL_SEND", "false").lower() in ("true", "1", "yes")
+
+        # Shared HTTP connection pool
+        self.http2: bool = os.getenv("HTTP2", "false").lower() in ("true", "1", "yes")
+        self.http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        self.http_max_keepalive: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+        self.http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "30"))
+        self.http_connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+        # Encoded attachment cache under DATA_DIR/attachments
+        self.attachment_cache_bytes: int = int(os.getenv("ATTACHMENT_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+        # Tool arguments may only read files under INPUT_DIR (default DATA_DIR/uploads)
+        # and fetch URLs on public addresses
+        self.input_dir: Optional[str] = os.getenv("INPUT_DIR")
+        self.allow_private_urls: bool = os.getenv("ALLOW_PRIVATE_URLS", "false").lower() in ("true", "1", "yes")
+
+        # Durable send queue: tools enqueue and return, background workers deliver
+        self.send_queue_enabled: bool = os.getenv("SEND_QUEUE", "false").lower() in ("true", "1", "yes")
+        self.send_queue_workers: int = int(os.getenv("SEND_QUEUE_WORKERS", "4"))
+        self.send_queue_batch_size: int = int(os.getenv("SEND_QUEUE_BATCH_SIZE", "10"))
+        self.send_queue_max_attempts: int = int(os.getenv("SEND_QUEUE_MAX_ATTEMPTS", "5"))
+        self.send_queue_lease: float = float(os.getenv("SEND_QUEUE_LEASE", "60"))
+
+        # Recipient pre-filter against the bounce, block, spam report and unsubscribe lists
+        self.suppression_filter: bool = os.getenv("SUPPRESSION_FILTER", "true").lower() in ("true", "1", "yes")
+        self.suppression_max_age: float = float(os.getenv("SUPPRESSION_MAX_AGE", "300"))
+        self.suppression_max_stale: float = float(os.getenv("SUPPRESSION_MAX_STALE", "3600"))
+        self.suppression_sync_wait: float = float(os.getenv("SUPPRESSION_SYNC_WAIT", "10"))
+        self.suppression_full_sync_interval: float = float(os.getenv("SUPPRESSION_FULL_SYNC_INTERVAL", "86400"))
+
+        # Stats cache: days fetched this long after they ended are final; today is refetched after the TTL
+        self.stats_settle_seconds: float = float(os.getenv("STATS_SETTLE_SECONDS", "3600"))
+        self.stats_today_ttl: float = float(os.getenv("STATS_TODAY_TTL", "60"))
+
+        # Event Webhook receiver (HTTP mode): signed posts need WEBHOOK_PUBLIC_KEY from Mail Settings
+        self.webhook_path: str = os.getenv("WEBHOOK_PATH", "/webhooks/sendgrid/events")
+        self.webhook_public_key: Optional[str] = os.getenv("WEBHOOK_PUBLIC_KEY")
+        self.webhook_allow_unsigned: bool = os.getenv("WEBHOOK_ALLOW_UNSIGNED", "false").lower() in ("true", "1", "yes")
+        self.webhook_max_bytes: int = int(os.getenv("WEBHOOK_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.webhook_retention_days: float = float(os.getenv("WEBHOOK_RETENTION_DAYS", "30"))
+
+        # Metrics: Prometheus endpoint path in HTTP mode and OpenTelemetry spans. Custom routes
+        # bypass MCP auth, so the endpoint is only served when METRICS_TOKEN is set and scrapes
+        # must send it as "Authorization: Bearer <token>"
+        self.metrics_path: str = os.getenv("METRICS_PATH", "/metrics")
+        self.metrics_token: Optional[str] = os.getenv("METRICS_TOKEN") or None
+        self.otel_tracing: bool = os.getenv("OTEL_TRACING", "false").lower() in ("true", "1", "yes")
+
+        # Local storage for exports and other on-disk state
+        self.data_dir: str = os.path.expanduser(os.getenv("DATA_DIR", "~/.sendgrid-mcp"))
+
+        # Register tools from schemas cached in DATA_DIR and import tool modules on first use
+        self.tool_schema_cache: bool = os.getenv("TOOL_SCHEMA_CACHE", "true").lower() in ("true", "1", "yes")
 
         # Debug mode
         self.debug: bool = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes")
 
+    def data_path(self, *parts: str) -> str:
+        """Return a path under DATA_DIR, creating its parent directory."""
+        path = os.path.join(self.data_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
 
 # Global configuration instance
 config = SendGridConfig()
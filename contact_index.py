@@ -0,0 +1,319 @@
+"""Local, per-API-key contact index for fast lookups without API calls.
+
+Each API key gets its own SQLite database under DATA_DIR/index with B-tree
+indexes on email, lower-cased names, list membership and custom field
+values, so exact lookups and prefix searches stay sub-millisecond. The
+index is rebuilt from a full contact export, refreshed incrementally
+through the contact search API, and kept current by write-through from
+the contact tools.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from client import SendGridClient
+from config import config
+from exports import run_export
+
+logger = logging.getLogger(__name__)
+
+# Incremental syncs look back this far past the last sync to cover clock skew
+SYNC_OVERLAP_SECONDS = 300
+
+# Sorts after any character that can appear in a prefix, for range scans
+PREFIX_END = "\U0010ffff"
+
+# Record keys that are not custom fields
+RESERVED_KEYS = ("email", "first_name", "last_name", "list_ids", "custom_fields")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    email TEXT PRIMARY KEY,
+    first_name_lc TEXT,
+    last_name_lc TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_first_name ON contacts (first_name_lc);
+CREATE INDEX IF NOT EXISTS contacts_last_name ON contacts (last_name_lc);
+CREATE TABLE IF NOT EXISTS contact_lists (
+    list_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (list_id, email)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contact_lists_email ON contact_lists (email);
+CREATE TABLE IF NOT EXISTS contact_fields (
+    field TEXT NOT NULL,
+    value_lc TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (field, value_lc, email)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contact_fields_email ON contact_fields (email);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _normalize(record: Dict[str, Any]) -> Tuple[str, Dict[str, Any], List[str], Dict[str, str]]:
+    """Split a contact record into (email, stored data, list IDs, custom field values)."""
+    email = str(record.get("email") or "").strip().lower()
+    if not email:
+        raise ValueError(f"Contact record is missing an email: {record}")
+
+    list_ids = record.get("list_ids") or []
+    if isinstance(list_ids, str):
+        list_ids = [list_id.strip() for list_id in list_ids.split(",") if list_id.strip()]
+
+    fields = {key: value for key, value in record.items() if key not in RESERVED_KEYS}
+    if isinstance(record.get("custom_fields"), dict):
+        fields.update(record["custom_fields"])
+    fields = {key: str(value) for key, value in fields.items() if value not in (None, "")}
+
+    data = {key: value for key, value in record.items() if key not in ("list_ids", "custom_fields")}
+    data["email"] = email
+    data.update(fields)
+    return email, data, list(list_ids), fields
+
+
+def _upsert(cursor: sqlite3.Cursor, records: Iterable[Dict[str, Any]], merge_lists: bool) -> int:
+    count = 0
+    now = time.time()
+    for record in records:
+        email, data, list_ids, fields = _normalize(record)
+        row = cursor.execute("SELECT data FROM contacts WHERE email = ?", (email,)).fetchone()
+        if row:
+            # Partial updates (e.g. add_contact) keep fields they don't mention
+            data = {**json.loads(row[0]), **data}
+        cursor.execute(
+            "INSERT OR REPLACE INTO contacts (email, first_name_lc, last_name_lc, data, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                email,
+                str(data.get("first_name") or "").lower() or None,
+                str(data.get("last_name") or "").lower() or None,
+                json.dumps(data),
+                now
+            )
+        )
+        if not merge_lists:
+            cursor.execute("DELETE FROM contact_lists WHERE email = ?", (email,))
+        cursor.executemany(
+            "INSERT OR IGNORE INTO contact_lists (list_id, email) VALUES (?, ?)",
+            [(list_id, email) for list_id in list_ids]
+        )
+        cursor.executemany(
+            "DELETE FROM contact_fields WHERE email = ? AND field = ?",
+            [(email, field) for field in fields]
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO contact_fields (field, value_lc, email) VALUES (?, ?, ?)",
+            [(field, value.lower(), email) for field, value in fields.items()]
+        )
+        count += 1
+    return count
+
+
+class ContactIndex:
+    """SQLite-backed contact index for one API key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = _connect(path)
+
+    def _get_meta(self, key: str) -> Optional[float]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, cursor: sqlite3.Cursor, key: str, value: float) -> None:
+        cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Write contacts through to the index after a successful API update.
+
+        List IDs are added to the contact's memberships, matching the
+        semantics of PUT /marketing/contacts.
+        """
+        with self._db:
+            cursor = self._db.cursor()
+            count = _upsert(cursor, records, merge_lists=True)
+            self._set_meta(cursor, "last_write", time.time())
+        return count
+
+    def apply_sync(self, records: Iterable[Dict[str, Any]], synced_at: float) -> int:
+        """Apply authoritative contact records from the search API."""
+        with self._db:
+            cursor = self._db.cursor()
+            count = _upsert(cursor, records, merge_lists=False)
+            self._set_meta(cursor, "last_sync", synced_at)
+        return count
+
+    def rebuild_from_file(self, ndjson_path: str, synced_at: float) -> int:
+        """Replace the index with the contents of an exported NDJSON file.
+
+        Runs on its own connection so it can be called from a worker thread;
+        readers keep seeing the old index until the rebuild commits.
+        """
+        connection = _connect(self.path)
+        try:
+            with connection, open(ndjson_path, encoding="utf-8") as f:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM contacts")
+                cursor.execute("DELETE FROM contact_lists")
+                cursor.execute("DELETE FROM contact_fields")
+                count = _upsert(cursor, (json.loads(line) for line in f if line.strip()), merge_lists=False)
+                self._set_meta(cursor, "last_sync", synced_at)
+                self._set_meta(cursor, "last_full_sync", synced_at)
+            return count
+        finally:
+            connection.close()
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        """Look up a contact and its list memberships by email."""
+        email = email.strip().lower()
+        row = self._db.execute("SELECT data FROM contacts WHERE email = ?", (email,)).fetchone()
+        if not row:
+            return None
+        contact = json.loads(row[0])
+        contact["list_ids"] = [
+            list_id for (list_id,) in
+            self._db.execute("SELECT list_id FROM contact_lists WHERE email = ? ORDER BY list_id", (email,))
+        ]
+        return contact
+
+    def search(
+        self,
+        prefix: str = "",
+        field: Optional[str] = None,
+        list_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Prefix-search contacts by email/name, or by one custom field, optionally within a list."""
+        low = prefix.strip().lower()
+        high = low + PREFIX_END
+        params: List[Any] = []
+
+        if field:
+            candidates = "SELECT email FROM contact_fields WHERE field = ? AND value_lc >= ? AND value_lc < ?"
+            params.extend([field, low, high])
+        elif low:
+            candidates = (
+                "SELECT email FROM contacts WHERE email >= ? AND email < ? "
+                "UNION SELECT email FROM contacts WHERE first_name_lc >= ? AND first_name_lc < ? "
+                "UNION SELECT email FROM contacts WHERE last_name_lc >= ? AND last_name_lc < ?"
+            )
+            params.extend([low, high] * 3)
+        else:
+            candidates = "SELECT email FROM contacts"
+
+        sql = f"SELECT data FROM contacts WHERE email IN ({candidates})"
+        if list_id:
+            sql += " AND email IN (SELECT email FROM contact_lists WHERE list_id = ?)"
+            params.append(list_id)
+        sql += " ORDER BY email LIMIT ?"
+        params.append(limit)
+        return [json.loads(data) for (data,) in self._db.execute(sql, params)]
+
+    def status(self) -> Dict[str, Any]:
+        """Return index size and sync freshness."""
+        now = time.time()
+        last_sync = self._get_meta("last_sync")
+        last_full_sync = self._get_meta("last_full_sync")
+        last_write = self._get_meta("last_write")
+        return {
+            "contacts": self._db.execute("SELECT COUNT(*) FROM contacts").fetchone()[0],
+            "list_memberships": self._db.execute("SELECT COUNT(*) FROM contact_lists").fetchone()[0],
+            "synced": last_full_sync is not None,
+            "last_full_sync": _iso(last_full_sync),
+            "last_sync": _iso(last_sync),
+            "last_write": _iso(last_write),
+            "sync_lag_seconds": round(now - last_sync, 1) if last_sync else None,
+            "size_bytes": os.path.getsize(self.path)
+        }
+
+    def last_sync(self) -> Optional[float]:
+        """Return when the index was last synced from SendGrid (epoch seconds)."""
+        return self._get_meta("last_sync")
+
+    def close(self) -> None:
+        """Close the index database."""
+        self._db.close()
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+# Open indexes keyed by API key fingerprint
+_indexes: Dict[str, ContactIndex] = {}
+
+
+def get_index(key_id: str) -> ContactIndex:
+    """Return the contact index for an API key, opening it on first use."""
+    index = _indexes.get(key_id)
+    if index is None:
+        index = ContactIndex(config.data_path("index", f"{key_id}.sqlite3"))
+        _indexes[key_id] = index
+    return index
+
+
+def close_indexes() -> None:
+    """Close all open index databases."""
+    for index in _indexes.values():
+        index.close()
+    _indexes.clear()
+
+
+def write_through(key_id: str, records: Iterable[Dict[str, Any]]) -> None:
+    """Best-effort index update after a successful contact write to SendGrid."""
+    try:
+        get_index(key_id).upsert(records)
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Contact index write-through failed: {str(e)}")
+
+
+async def sync_index(client: SendGridClient, full: bool = False) -> Dict[str, Any]:
+    """Refresh the contact index for a client's API key.
+
+    Incremental syncs fetch contacts updated since the last sync through
+    the search API; when that returns more matches than it can page, or no
+    sync has happened yet, the index is rebuilt from a full export.
+    """
+    index = get_index(client.key_id)
+    started = time.time()
+    last_sync = index.last_sync()
+
+    if not full and last_sync:
+        since = datetime.fromtimestamp(last_sync - SYNC_OVERLAP_SECONDS, tz=timezone.utc)
+        response = await client.make_api_request(
+            "POST",
+            "/marketing/contacts/search",
+            data={"query": f"updated_at > TIMESTAMP '{since.strftime('%Y-%m-%dT%H:%M:%SZ')}'"}
+        )
+        results = response.get("result") or []
+        if response.get("contact_count", len(results)) <= len(results):
+            count = index.apply_sync(results, started)
+            return {"mode": "incremental", "contacts_synced": count}
+
+    export = await run_export(client)
+    try:
+        count = await asyncio.to_thread(index.rebuild_from_file, export["path"], started)
+    finally:
+        os.remove(export["path"])
+    return {"mode": "full", "contacts_synced": count}
@@ -0,0 +1,233 @@
+"""Streaming contact exports via the /marketing/contacts/exports job API.
+
+Export files are downloaded in chunks, decompressed and parsed
+incrementally, and written to a local NDJSON file, so memory use stays
+bounded regardless of how many contacts the export contains.
+"""
+
+import codecs
+import csv
+import json
+import os
+import re
+import zlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from client import SendGridClient, get_download_client
+from config import config
+
+EXPORT_DONE_STATUSES = ("ready", "failure")
+CHUNK_SIZE = 64 * 1024
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+def export_path(key_id: str, export_id: str) -> str:
+    """Return the local NDJSON file for an export, scoped to the API key that created it."""
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", export_id):
+        raise ValueError(f"Invalid export ID: {export_id}")
+    return config.data_path("exports", f"{key_id}-{export_id}.ndjson")
+
+
+class DownloadTooLarge(ValueError):
+    """A download is larger than the caller's limit."""
+
+
+def _pinned_request(url: str, address: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """Return (url, headers, extensions) that connect to address but ask for, and verify, url's host."""
+    parts = urlsplit(url)
+    host = f"[{address}]" if ":" in address else address
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = f"{userinfo}@{host}" if userinfo else host
+    if parts.port:
+        netloc += f":{parts.port}"
+    headers = {"Host": parts.netloc.rpartition("@")[2]}
+    extensions = {"sni_hostname": parts.hostname} if parts.scheme == "https" else {}
+    return parts._replace(netloc=netloc).geturl(), headers, extensions
+
+
+async def iter_download(
+    url: str,
+    max_bytes: Optional[int] = None,
+    address: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Stream a file from a URL, by default a (pre-signed) export URL, through the shared download pool.
+
+    With address, the connection goes to that IP (one already checked by
+    inputs.check_public_url) instead of resolving the host again, on a
+    client used for this download only. With max_bytes, raises
+    DownloadTooLarge as soon as the body is known to be larger: from
+    Content-Length before reading, or once that much has been read.
+    """
+    if address is None:
+        async for chunk in _iter_response(get_download_client(), url, max_bytes):
+            yield chunk
+        return
+    pinned_url, headers, extensions = _pinned_request(url, address)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(config.http_timeout, connect=config.http_connect_timeout)) as client:
+        async for chunk in _iter_response(client, pinned_url, max_bytes, headers, extensions):
+            yield chunk
+
+
+async def _iter_response(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: Optional[int],
+    headers: Optional[Dict[str, str]] = None,
+    extensions: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[bytes]:
+    async with client.stream("GET", url, headers=headers, extensions=extensions) as response:
+        response.raise_for_status()
+        length = response.headers.get("Content-Length", "")
+        if max_bytes is not None and length.isdigit() and int(length) > max_bytes:
+            raise DownloadTooLarge(f"Download is {length} bytes, over the {max_bytes}-byte limit")
+        received = 0
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            received += len(chunk)
+            if max_bytes is not None and received > max_bytes:
+                raise DownloadTooLarge(f"Download is over the {max_bytes}-byte limit")
+            yield chunk
+
+
+async def iter_decompressed(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gunzip a byte stream on the fly if it is gzip-compressed, else pass it through."""
+    decompressor = None
+    first = True
+    async for chunk in chunks:
+        if first:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            # Cap output per step so a highly compressible chunk can't balloon memory
+            data = decompressor.decompress(chunk, CHUNK_SIZE * 4)
+            if data:
+                yield data
+            if decompressor.eof:
+                # Concatenated gzip members
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+            else:
+                chunk = decompressor.unconsumed_tail
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines without the trailing newline."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Parse CSV lines into dicts keyed by the lower-cased header row."""
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    quotes = 0
+    async for line in lines:
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # Inside a quoted field that continues on the next line
+            continue
+        row = next(csv.reader(["\n".join(pending)]), [])
+        pending, quotes = [], 0
+        if header is None:
+            header = [name.strip().lower() for name in row]
+            continue
+        if any(row):
+            yield {name: value for name, value in zip(header, row) if value != ""}
+
+
+async def iter_json_records(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Parse JSON Lines into dicts."""
+    async for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+async def download_export(
+    urls: List[str],
+    file_type: str,
+    output_path: str,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> int:
+    """Stream every export file into one NDJSON file. Returns the number of contacts."""
+    count = 0
+    partial_path = output_path + ".part"
+    with open(partial_path, "w", encoding="utf-8") as output:
+        for url in urls:
+            lines = iter_lines(iter_decompressed(iter_download(url)))
+            records = iter_csv_records(lines) if file_type == "csv" else iter_json_records(lines)
+            async for record in records:
+                output.write(json.dumps(record))
+                output.write("\n")
+                count += 1
+                if on_progress and count % 10000 == 0:
+                    await on_progress(count)
+    os.replace(partial_path, output_path)
+    return count
+
+
+async def run_export(
+    client: SendGridClient,
+    list_ids: Optional[List[str]] = None,
+    segment_ids: Optional[List[str]] = None,
+    file_type: str = "csv",
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """Start a contact export, wait for it, and download it to a local NDJSON file."""
+    request_data: Dict[str, Any] = {"file_type": file_type}
+    if list_ids:
+        request_data["list_ids"] = list_ids
+    if segment_ids:
+        request_data["segment_ids"] = segment_ids
+
+    export = await client.make_api_request("POST", "/marketing/contacts/exports", data=request_data)
+    export_id = export["id"]
+
+    status = await client.wait_for_job(
+        f"/marketing/contacts/exports/{export_id}",
+        lambda job: job.get("status") in EXPORT_DONE_STATUSES
+    )
+    if status.get("status") != "ready":
+        raise RuntimeError(f"Export {export_id} failed: {status.get('message', status.get('status'))}")
+
+    path = export_path(client.key_id, export_id)
+    count = await download_export(status.get("urls") or [], file_type, path, on_progress)
+    return {"export_id": export_id, "contacts": count, "path": path}
+
+
+def read_page(path: str, cursor: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Read up to limit records from an NDJSON file starting at a byte-offset cursor.
+
+    Returns the records and the cursor for the next page, or None at the end.
+    Cursors always point at the start of a line; any other offset is rejected.
+    """
+    contacts: List[Dict[str, Any]] = []
+    with open(path, "rb") as f:
+        if not 0 <= cursor <= os.fstat(f.fileno()).st_size:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if cursor > 0:
+            f.seek(cursor - 1)
+            if f.read(1) != b"\n":
+                raise ValueError(f"Invalid cursor: {cursor}")
+        f.seek(cursor)
+        while len(contacts) < limit:
+            line = f.readline()
+            if not line:
+                return contacts, None
+            if line.strip():
+                contacts.append(json.loads(line))
+        next_cursor = f.tell()
+        return contacts, next_cursor if f.read(1) else None
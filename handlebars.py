@@ -0,0 +1,850 @@
+"""Local renderer for SendGrid dynamic templates (a Handlebars subset).
+
+Template sources are compiled once into nested Python closures. Compiled
+template versions are cached by version ID and update time, so rendering
+the subject, HTML and plain text for one set of dynamic_template_data takes
+microseconds and no API call.
+
+Supported syntax: {{path}} (HTML-escaped), {{{path}}} and {{&path}} (raw),
+paths with this, ../, @root and [segment], comments, ~ whitespace control,
+standalone block lines, #if / #unless / else if, #each (with @index, @key,
+@first, @last), #with, mustache-style sections, and SendGrid's helpers
+equals, notEquals, greaterThan, lessThan, and, or, length, insert and
+formatDate. Partials, subexpressions and block parameters raise
+TemplateError.
+
+While rendering, lookups are tracked so callers can report variables that
+are output but missing from the data, and data fields the template never
+reads.
+"""
+
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from config import config
+from metrics import metrics
+
+
+class TemplateError(ValueError):
+    """Raised for template syntax this renderer cannot compile."""
+
+
+class _Missing:
+    """Marker for a lookup that found nothing (JavaScript undefined)."""
+
+    def __repr__(self) -> str:
+        return "undefined"
+
+
+MISSING = _Missing()
+
+# Recipients and variables listed individually in a validation report
+MAX_REPORTED = 100
+
+_TAG = re.compile(r"\{\{(~?)(?:!--.*?--|(\{)?(.*?)(\})?)(~?)\}\}", re.S)
+_ARGUMENT = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[^\s]+')
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_PATH_SEGMENT = re.compile(r"\[([^\]]*)\]|([^./\[]+)")
+_ESCAPE_NEEDED = re.compile(r"[&<>\"'`=]")
+_ESCAPES = str.maketrans({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;", "`": "&#x60;", "=": "&#x3D;"
+})
+_DATE_TOKENS = re.compile(r"\[([^\]]*)\]|YYYY|YY|MMMM|MMM|MM|M|DD|D|dddd|ddd|HH|H|hh|h|mm|m|ss|s|A|a|ZZ|Z")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December")
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Frames are (value, absolute data path, @data variables)
+Frame = Tuple[Any, str, Optional[Dict[str, Any]]]
+Render = Callable[[List[Frame], List[str], Optional["Usage"]], None]
+Getter = Callable[[List[Frame], Optional["Usage"]], Any]
+
+
+class Usage:
+    """Variables read while rendering one set of template data."""
+
+    __slots__ = ("output", "touched", "missing", "warnings")
+
+    def __init__(self):
+        # Paths whose whole value was rendered, and paths only tested or iterated
+        self.output = set()
+        self.touched = set()
+        self.missing = set()
+        self.warnings: List[str] = []
+
+    def lookup(self, path: str, found: bool, required: bool) -> None:
+        if not path:
+            return
+        if not found:
+            if required:
+                self.missing.add(path)
+        elif required:
+            self.output.add(path)
+        else:
+            self.touched.add(path)
+
+    def unused(self, data: Any) -> List[str]:
+        """Data fields (dotted, with [] for list items) the template never read."""
+        unused: Dict[str, None] = {}
+        self._collect_unused(data, "", unused)
+        return list(unused)
+
+    def _collect_unused(self, value: Any, path: str, unused: Dict[str, None]) -> None:
+        if path in self.output:
+            return  # The whole value was rendered
+        if isinstance(value, dict) and value:
+            for key, child in value.items():
+                self._collect_unused(child, f"{path}.{key}" if path else str(key), unused)
+        elif isinstance(value, list) and value:
+            items = f"{path}[]"
+            if any(isinstance(item, dict) for item in value):
+                for item in value:
+                    self._collect_unused(item, items, unused)
+            elif items not in self.output and items not in self.touched:
+                unused[items] = None
+        elif path and path not in self.touched:
+            unused[path] = None
+
+
+def to_text(value: Any) -> str:
+    """Convert a value to text the way JavaScript string conversion does."""
+    if value is MISSING or value is None:
+        return ""
+    if value.__class__ is str:
+        return value
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, list):
+        return ",".join(to_text(item) for item in value)
+    if isinstance(value, dict):
+        return "[object Object]"
+    return str(value)
+
+
+def escape(text: str) -> str:
+    """Escape text like Handlebars' escapeExpression."""
+    if _ESCAPE_NEEDED.search(text) is None:
+        return text
+    return text.translate(_ESCAPES)
+
+
+def truthy(value: Any) -> bool:
+    """Handlebars truthiness: empty strings, empty lists, 0, null and undefined are false."""
+    if value is MISSING or value is None or value is False:
+        return False
+    if isinstance(value, (str, list)):
+        return len(value) > 0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value != 0
+    return True
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _equal(left: Any, right: Any) -> bool:
+    if left == right:
+        return True
+    # SendGrid compares numbers and numeric strings by value
+    left_number, right_number = _number(left), _number(right)
+    return left_number is not None and left_number == right_number
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # JavaScript timestamps are in milliseconds
+        seconds = value / 1000 if abs(value) > 1e11 else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        if _NUMBER.fullmatch(text):
+            return _parse_date(float(text))
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def _offset(text: Any) -> Optional[timezone]:
+    match = re.fullmatch(r"([+-])(\d{2}):?(\d{2})", str(text).strip())
+    if not match:
+        return None
+    minutes = int(match.group(2)) * 60 + int(match.group(3))
+    return timezone(timedelta(minutes=-minutes if match.group(1) == "-" else minutes))
+
+
+def _utc_offset(moment: datetime) -> str:
+    return moment.strftime("%z") or "+0000"
+
+
+_DATE_FIELDS: Dict[str, Callable[[datetime], str]] = {
+    "YYYY": lambda m: f"{m.year:04d}", "YY": lambda m: f"{m.year % 100:02d}",
+    "MMMM": lambda m: _MONTHS[m.month - 1], "MMM": lambda m: _MONTHS[m.month - 1][:3],
+    "MM": lambda m: f"{m.month:02d}", "M": lambda m: str(m.month),
+    "DD": lambda m: f"{m.day:02d}", "D": lambda m: str(m.day),
+    "dddd": lambda m: _WEEKDAYS[m.weekday()], "ddd": lambda m: _WEEKDAYS[m.weekday()][:3],
+    "HH": lambda m: f"{m.hour:02d}", "H": lambda m: str(m.hour),
+    "hh": lambda m: f"{m.hour % 12 or 12:02d}", "h": lambda m: str(m.hour % 12 or 12),
+    "mm": lambda m: f"{m.minute:02d}", "m": lambda m: str(m.minute),
+    "ss": lambda m: f"{m.second:02d}", "s": lambda m: str(m.second),
+    "A": lambda m: "AM" if m.hour < 12 else "PM", "a": lambda m: "am" if m.hour < 12 else "pm",
+    "ZZ": _utc_offset, "Z": lambda m: f"{_utc_offset(m)[:3]}:{_utc_offset(m)[3:]}"
+}
+
+
+def format_date(moment: datetime, fmt: str) -> str:
+    """Format a datetime with the moment.js-style tokens SendGrid's formatDate accepts."""
+    def token(match: "re.Match[str]") -> str:
+        literal = match.group(1)
+        return literal if literal is not None else _DATE_FIELDS[match.group()](moment)
+
+    return _DATE_TOKENS.sub(token, fmt)
+
+
+class _Path:
+    """A compiled variable reference."""
+
+    __slots__ = ("up", "root", "data", "parts", "dotted", "text")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.up = 0
+        self.root = False
+        self.data: Optional[str] = None
+        rest = text
+        if rest.startswith("@root"):
+            self.root = True
+            rest = rest[5:].lstrip("./")
+        elif rest.startswith("@"):
+            self.data = rest[1:]
+            rest = ""
+        while rest.startswith("../"):
+            self.up += 1
+            rest = rest[3:]
+        if rest in ("this", ".", ".."):
+            self.up += rest == ".."
+            rest = ""
+        elif rest.startswith("this.") or rest.startswith("this/") or rest.startswith("./"):
+            rest = rest[5:] if rest.startswith("this") else rest[2:]
+        if "|" in rest or rest.startswith("("):
+            raise TemplateError(f"Unsupported expression: {text}")
+        self.parts = tuple(
+            match.group(1) if match.group(1) is not None else match.group(2)
+            for match in _PATH_SEGMENT.finditer(rest)
+        )
+        self.dotted = ".".join(self.parts)
+
+    def getter(self, required: bool) -> Getter:
+        """Return a function resolving this path against the frame stack."""
+        if self.data is not None:
+            name = self.data
+
+            def get_data(frames: List[Frame], usage: Optional[Usage]) -> Any:
+                for _, _, data in reversed(frames):
+                    if data is not None and name in data:
+                        return data[name]
+                return MISSING
+            return get_data
+
+        up, root, parts, dotted = self.up, self.root, self.parts, self.dotted
+        # Tracked path per frame path, so it is formatted once per scope
+        names: Dict[str, str] = {}
+
+        def get(frames: List[Frame], usage: Optional[Usage]) -> Any:
+            if root:
+                frame = frames[0]
+            elif up < len(frames):
+                frame = frames[-1 - up]
+            else:
+                return MISSING
+            value = frame[0]
+            for part in parts:
+                if value.__class__ is dict:
+                    value = value.get(part, MISSING)
+                elif isinstance(value, list) and part.isdigit():
+                    index = int(part)
+                    value = value[index] if index < len(value) else MISSING
+                elif part == "length" and isinstance(value, (list, str)):
+                    value = len(value)
+                else:
+                    value = MISSING
+                if value is MISSING:
+                    break
+            if usage is not None:
+                prefix = frame[1]
+                path = names.get(prefix)
+                if path is None:
+                    path = names[prefix] = f"{prefix}.{dotted}" if prefix and dotted else prefix or dotted
+                usage.lookup(path, value is not MISSING, required)
+            return value
+        return get
+
+
+def _literal(text: str) -> Tuple[bool, Any]:
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return True, re.sub(r"\\(.)", r"\1", text[1:-1])
+    if _NUMBER.fullmatch(text):
+        return True, float(text) if "." in text else int(text)
+    if text in ("true", "false"):
+        return True, text == "true"
+    if text in ("null", "undefined"):
+        return True, None
+    return False, None
+
+
+def _argument(text: str, required: bool) -> Getter:
+    is_literal, value = _literal(text)
+    if is_literal:
+        return lambda frames, usage: value
+    return _Path(text).getter(required)
+
+
+def _split(content: str) -> Tuple[str, List[str]]:
+    parts = _ARGUMENT.findall(content)
+    if not parts:
+        raise TemplateError("Empty expression {{}}")
+    for part in parts:
+        if part.startswith("("):
+            raise TemplateError(f"Subexpressions are not supported: {{{{{content}}}}}")
+        if part == "as" or part.startswith("|"):
+            raise TemplateError(f"Block parameters are not supported: {{{{{content}}}}}")
+    return parts[0], parts[1:]
+
+
+class _Token:
+    __slots__ = ("kind", "content", "strip_left", "strip_right", "start", "end")
+
+    def __init__(self, kind: str, content: str, strip_left: bool, strip_right: bool, start: int, end: int):
+        self.kind = kind
+        self.content = content
+        self.strip_left = strip_left
+        self.strip_right = strip_right
+        self.start = start
+        self.end = end
+
+
+def _tokenize(source: str) -> List[Any]:
+    """Split a template into text strings and tags, applying whitespace control."""
+    items: List[Any] = []
+    pos = 0
+    for match in _TAG.finditer(source):
+        if match.start() > pos:
+            items.append(source[pos:match.start()])
+        tilde_left, open_raw, content, close_raw, tilde_right = match.groups()
+        if content is None:
+            kind, content = "comment", ""
+        elif bool(open_raw) != bool(close_raw):
+            raise TemplateError(f"Unbalanced braces in {match.group()}")
+        else:
+            content = content.strip()
+            if open_raw:
+                kind = "raw"
+            elif content.startswith("!"):
+                kind = "comment"
+            elif content.startswith("#"):
+                if content[1:2] in (">", "*"):
+                    raise TemplateError(f"Partials and decorators are not supported: {match.group()}")
+                kind, content = "open", content[1:].strip()
+            elif content == "^" or content == "else" or content.startswith("else "):
+                kind, content = "else", content[4:].strip() if content.startswith("else") else ""
+            elif content.startswith("^"):
+                kind, content = "inverse", content[1:].strip()
+            elif content.startswith("/"):
+                kind, content = "close", content[1:].strip()
+            elif content.startswith(">"):
+                raise TemplateError(f"Partials are not supported: {match.group()}")
+            elif content.startswith("&"):
+                kind, content = "raw", content[1:].strip()
+            else:
+                kind = "expression"
+        items.append(_Token(kind, content, bool(tilde_left), bool(tilde_right), match.start(), match.end()))
+        pos = match.end()
+    if pos < len(source):
+        items.append(source[pos:])
+
+    _strip_standalone(items)
+    for index, item in enumerate(items):
+        if isinstance(item, _Token):
+            if item.strip_left and index > 0 and isinstance(items[index - 1], str):
+                items[index - 1] = items[index - 1].rstrip()
+            if item.strip_right and index + 1 < len(items) and isinstance(items[index + 1], str):
+                items[index + 1] = items[index + 1].lstrip()
+    return items
+
+
+def _strip_standalone(items: List[Any]) -> None:
+    """Remove the line of a block tag or comment that stands alone on it, like Handlebars."""
+    # Characters cut from the start and end of each text item, decided on the original text
+    cuts: Dict[int, List[int]] = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, _Token) or item.kind not in ("open", "inverse", "else", "close", "comment"):
+            continue
+        before = items[index - 1] if index > 0 else None
+        after = items[index + 1] if index + 1 < len(items) else None
+        if before is not None and not isinstance(before, str):
+            continue
+        if after is not None and not isinstance(after, str):
+            continue
+        line_start = "" if before is None else before[before.rfind("\n") + 1:]
+        if before is not None and "\n" not in before and index > 1:
+            continue  # Another tag precedes this one on the same line
+        if line_start.strip(" \t"):
+            continue
+        newline = -1 if after is None else after.find("\n")
+        line_end = "" if after is None else (after if newline < 0 else after[:newline])
+        if line_end.strip(" \t\r"):
+            continue
+        if after is not None and newline < 0 and index + 2 < len(items):
+            continue  # Another tag follows on the same line
+        if before is not None:
+            cuts.setdefault(index - 1, [0, 0])[1] = len(line_start)
+        if after is not None:
+            cuts.setdefault(index + 1, [0, 0])[0] = len(after) if newline < 0 else newline + 1
+    for index, (head, tail) in cuts.items():
+        text = items[index]
+        items[index] = text[head:len(text) - tail] if head < len(text) - tail else ""
+
+
+class _Compiler:
+    """Recursive-descent parser that compiles tokens into render closures."""
+
+    BLOCK_HELPERS = ("if", "unless", "each", "with", "equals", "notEquals", "greaterThan", "lessThan", "and", "or")
+
+    def __init__(self, source: str):
+        self.items = _tokenize(source)
+        self.pos = 0
+        # Variable paths the template references, relative to the root data
+        self.variables = set()
+
+    def compile(self) -> Render:
+        render, end = self._sequence([""])
+        if end is not None:
+            raise TemplateError(f"Unexpected {{{{{'/' if end.kind == 'close' else ''}{end.content or end.kind}}}}}")
+        return render
+
+    def _record(self, path: _Path, scopes: List[str]) -> None:
+        if path.data is not None:
+            return
+        if path.root:
+            scope = ""
+        else:
+            scope = scopes[-1 - path.up] if path.up < len(scopes) else ""
+        name = f"{scope}.{path.dotted}" if scope and path.dotted else scope or path.dotted
+        if name:
+            self.variables.add(name)
+
+    def _sequence(self, scopes: List[str]) -> Tuple[Render, Optional[_Token]]:
+        """Compile items until an else or close tag, which is returned unconsumed."""
+        parts: List[Any] = []
+        while self.pos < len(self.items):
+            item = self.items[self.pos]
+            if isinstance(item, str):
+                if item:
+                    parts.append(item)
+                self.pos += 1
+                continue
+            if item.kind in ("else", "close"):
+                return _join(parts), item
+            self.pos += 1
+            if item.kind == "comment":
+                continue
+            if item.kind in ("expression", "raw"):
+                parts.append(self._expression(item.content, item.kind == "raw", scopes))
+            else:
+                parts.append(self._block(item.content, item.kind == "inverse", scopes))
+        return _join(parts), None
+
+    def _expression(self, content: str, raw: bool, scopes: List[str]) -> Render:
+        name, args = _split(content)
+        if not args:
+            path = _Path(name)
+            self._record(path, scopes)
+            get = path.getter(required=True)
+            if raw:
+                return lambda frames, out, usage: out.append(to_text(get(frames, usage)))
+            return lambda frames, out, usage: out.append(escape(to_text(get(frames, usage))))
+
+        if name == "insert":
+            default = ""
+            for arg in args[1:]:
+                is_literal, value = _literal(arg)
+                if is_literal and isinstance(value, str) and value.startswith("default="):
+                    default = value[len("default="):]
+            path = _Path(args[0])
+            self._record(path, scopes)
+            get = path.getter(required=not default)
+
+            def insert(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+                value = get(frames, usage)
+                text = to_text(value) if truthy(value) else default
+                out.append(text if raw else escape(text))
+            return insert
+
+        if name == "formatDate":
+            self._record_args(args[:1], scopes)
+            get = _argument(args[0], required=True)
+            get_format = _argument(args[1], required=True) if len(args) > 1 else (lambda frames, usage: "")
+            get_offset = _argument(args[2], required=False) if len(args) > 2 else None
+
+            def format_date_helper(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+                value = get(frames, usage)
+                moment = _parse_date(value)
+                if moment is None:
+                    if usage is not None and value is not MISSING:
+                        usage.warnings.append(f"formatDate could not parse {args[0]}={value!r}")
+                    return
+                offset = _offset(get_offset(frames, usage)) if get_offset else None
+                text = format_date(moment.astimezone(offset) if offset else moment, to_text(get_format(frames, usage)))
+                out.append(text if raw else escape(text))
+            return format_date_helper
+
+        if name == "length":
+            self._record_args(args[:1], scopes)
+            get = _argument(args[0], required=True)
+
+            def length(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+                value = get(frames, usage)
+                out.append(str(len(value)) if isinstance(value, (list, str, dict)) else "0")
+            return length
+
+        raise TemplateError(f"Unknown helper: {name}")
+
+    def _record_args(self, args: List[str], scopes: List[str]) -> None:
+        for arg in args:
+            if not _literal(arg)[0]:
+                self._record(_Path(arg), scopes)
+
+    def _block(self, content: str, inverted: bool, scopes: List[str], close_name: Optional[str] = None) -> Render:
+        name, args = _split(content)
+        close_name = close_name or name
+        if inverted:
+            # {{^name}} renders when name is falsy, like {{#unless name}}
+            args, helper = [name], "unless"
+        elif name in self.BLOCK_HELPERS:
+            helper = name
+        elif not args:
+            helper = "section"
+            args = [name]
+        else:
+            raise TemplateError(f"Unknown block helper: {name}")
+        if helper in ("if", "unless", "each", "with", "section") and len(args) != 1:
+            raise TemplateError(f"#{helper} takes one argument")
+        if helper in ("equals", "notEquals", "greaterThan", "lessThan") and len(args) != 2:
+            raise TemplateError(f"#{helper} takes two arguments")
+        if not args:
+            raise TemplateError(f"#{helper} needs at least one argument")
+
+        self._record_args(args, scopes)
+        getters = [_argument(arg, required=False) for arg in args]
+        target = None if _literal(args[0])[0] else _Path(args[0])
+        if helper in ("each", "with", "section") and target is not None:
+            scope = scopes[-1 - target.up] if target.up < len(scopes) and not target.root else ""
+            inner = f"{scope}.{target.dotted}" if scope and target.dotted else scope or target.dotted
+            body, end = self._sequence(scopes + [f"{inner}[]" if helper == "each" else inner])
+        else:
+            body, end = self._sequence(scopes)
+
+        build = _BLOCK_RENDERERS[helper]
+        inverse: Optional[Render] = None
+        if end is not None and end.kind == "else":
+            self.pos += 1
+            if end.content:
+                # {{else if ...}} chains a block that shares, and consumes, this block's close tag
+                return build(getters, body, self._block(end.content, False, scopes, close_name), target)
+            inverse, end = self._sequence(scopes)
+        if end is None or end.kind != "close":
+            raise TemplateError(f"Missing {{{{/{close_name}}}}}")
+        if end.content != close_name:
+            raise TemplateError(f"{{{{/{end.content}}}}} does not match {{{{#{close_name}}}}}")
+        self.pos += 1
+        return build(getters, body, inverse, target)
+
+
+def _join(parts: List[Any]) -> Render:
+    """Combine compiled parts, merging adjacent text."""
+    merged: List[Any] = []
+    for part in parts:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        else:
+            merged.append(part)
+    if not merged:
+        return lambda frames, out, usage: None
+    if len(merged) == 1 and isinstance(merged[0], str):
+        text = merged[0]
+        return lambda frames, out, usage: out.append(text)
+    if len(merged) == 1:
+        return merged[0]
+    parts_tuple = tuple(merged)
+
+    def render(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+        for part in parts_tuple:
+            if part.__class__ is str:
+                out.append(part)
+            else:
+                part(frames, out, usage)
+    return render
+
+
+def _frame_path(frames: List[Frame], target: Optional[_Path]) -> str:
+    if target is None:
+        return ""
+    if target.root:
+        prefix = ""
+    else:
+        prefix = frames[-1 - target.up][1] if target.up < len(frames) else ""
+    return f"{prefix}.{target.dotted}" if prefix and target.dotted else prefix or target.dotted
+
+
+def _conditional(test: Callable[[List[Any]], bool]):
+    def build(getters: List[Getter], body: Render, inverse: Optional[Render], target: Optional[_Path]) -> Render:
+        def render(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+            if test([get(frames, usage) for get in getters]):
+                body(frames, out, usage)
+            elif inverse is not None:
+                inverse(frames, out, usage)
+        return render
+    return build
+
+
+def _compare(op: Callable[[float, float], bool]) -> Callable[[List[Any]], bool]:
+    def test(values: List[Any]) -> bool:
+        left, right = _number(values[0]), _number(values[1])
+        return left is not None and right is not None and op(left, right)
+    return test
+
+
+def _each(getters: List[Getter], body: Render, inverse: Optional[Render], target: Optional[_Path]) -> Render:
+    get = getters[0]
+
+    def render(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+        value = get(frames, usage)
+        if isinstance(value, dict):
+            items = list(value.items())
+            path = _frame_path(frames, target)
+        elif isinstance(value, list):
+            items = list(enumerate(value))
+            path = f"{_frame_path(frames, target)}[]"
+        else:
+            items = []
+        if not items:
+            if inverse is not None:
+                inverse(frames, out, usage)
+            return
+        last = len(items) - 1
+        for index, (key, item) in enumerate(items):
+            frames.append((item, path, {"index": index, "key": key, "first": index == 0, "last": index == last}))
+            try:
+                body(frames, out, usage)
+            finally:
+                frames.pop()
+    return render
+
+
+def _with(getters: List[Getter], body: Render, inverse: Optional[Render], target: Optional[_Path]) -> Render:
+    get = getters[0]
+
+    def render(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+        value = get(frames, usage)
+        if not truthy(value):
+            if inverse is not None:
+                inverse(frames, out, usage)
+            return
+        frames.append((value, _frame_path(frames, target), None))
+        try:
+            body(frames, out, usage)
+        finally:
+            frames.pop()
+    return render
+
+
+def _section(getters: List[Getter], body: Render, inverse: Optional[Render], target: Optional[_Path]) -> Render:
+    """Mustache-style {{#name}}: iterate lists, enter objects, test anything else."""
+    iterate = _each(getters, body, inverse, target)
+    enter = _with(getters, body, inverse, target)
+    get = getters[0]
+
+    def render(frames: List[Frame], out: List[str], usage: Optional[Usage]) -> None:
+        value = get(frames, usage)
+        if isinstance(value, list):
+            iterate(frames, out, usage)
+        elif isinstance(value, dict) or truthy(value):
+            enter(frames, out, usage)
+        elif inverse is not None:
+            inverse(frames, out, usage)
+    return render
+
+
+_BLOCK_RENDERERS = {
+    "if": _conditional(lambda values: truthy(values[0])),
+    "unless": _conditional(lambda values: not truthy(values[0])),
+    "equals": _conditional(lambda values: _equal(values[0], values[1])),
+    "notEquals": _conditional(lambda values: not _equal(values[0], values[1])),
+    "greaterThan": _conditional(_compare(lambda left, right: left > right)),
+    "lessThan": _conditional(_compare(lambda left, right: left < right)),
+    "and": _conditional(lambda values: all(truthy(value) for value in values)),
+    "or": _conditional(lambda values: any(truthy(value) for value in values)),
+    "each": _each,
+    "with": _with,
+    "section": _section
+}
+
+
+class Template:
+    """A compiled Handlebars template."""
+
+    def __init__(self, source: str):
+        self.source = source
+        compiler = _Compiler(source)
+        self._render = compiler.compile()
+        self.variables = sorted(compiler.variables)
+
+    def render(self, data: Any, usage: Optional[Usage] = None) -> str:
+        """Render the template for data, recording lookups in usage if given."""
+        out: List[str] = []
+        self._render([(data, "", None)], out, usage)
+        return "".join(out)
+
+
+class CompiledVersion:
+    """Compiled subject, HTML and plain text of one dynamic template version."""
+
+    def __init__(self, version: Dict[str, Any]):
+        self.version_id = version.get("id")
+        self.name = version.get("name")
+        self.subject = Template(version.get("subject") or "")
+        self.html = Template(version.get("html_content") or "")
+        # With generate_plain_content SendGrid derives the text part from the HTML
+        plain = version.get("plain_content")
+        self.plain = Template(plain) if plain and not version.get("generate_plain_content") else None
+        parts = [self.subject, self.html] + ([self.plain] if self.plain else [])
+        self.variables = sorted(set().union(*(part.variables for part in parts)))
+
+    def render(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Render every part for one set of dynamic_template_data and report variable use."""
+        usage = Usage()
+        return {
+            "subject": self.subject.render(data, usage),
+            "html_content": self.html.render(data, usage),
+            "plain_content": self.plain.render(data, usage) if self.plain else None,
+            "missing": sorted(usage.missing),
+            "unused": usage.unused(data),
+            "warnings": usage.warnings
+        }
+
+    def check(self, data: Dict[str, Any]) -> Usage:
+        """Render every part for data, discarding the output, and return the variable use."""
+        usage = Usage()
+        self.subject.render(data, usage)
+        self.html.render(data, usage)
+        if self.plain:
+            self.plain.render(data, usage)
+        return usage
+
+
+def active_version(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a dynamic template's active version."""
+    if template.get("generation") == "legacy":
+        raise ValueError("Only dynamic templates can be rendered locally")
+    versions = template.get("versions") or []
+    for version in versions:
+        if version.get("active") in (1, True):
+            return version
+    raise ValueError(f"Template {template.get('id')} has no active version")
+
+
+class CompiledTemplateCache:
+    """LRU cache of compiled versions keyed by version ID and update time."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[Any, Any], CompiledVersion]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def get(self, template: Dict[str, Any]) -> CompiledVersion:
+        """Return the compiled active version of a template, compiling it on first use."""
+        version = active_version(template)
+        key = (version.get("id"), version.get("updated_at"))
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        compiled = CompiledVersion(version)
+        self._entries[key] = compiled
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return compiled
+
+
+# Global compiled template cache
+compiled_templates = CompiledTemplateCache(config.compiled_template_cache_size)
+metrics.register_cache("compiled_templates", compiled_templates)
+
+
+def validate_personalizations(compiled: CompiledVersion, recipients: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Check each recipient's dynamic_template_data against a template in one pass.
+
+    Returns how many recipients are missing variables or hit render
+    warnings, per-variable counts, and the first problem recipients.
+    """
+    total = 0
+    invalid = 0
+    missing_counts: Dict[str, int] = {}
+    unused_counts: Dict[str, int] = {}
+    problems: List[Dict[str, Any]] = []
+    for recipient in recipients:
+        total += 1
+        data = recipient.get("dynamic_template_data") or {}
+        usage = compiled.check(data)
+        for name in usage.unused(data):
+            unused_counts[name] = unused_counts.get(name, 0) + 1
+        if not usage.missing and not usage.warnings:
+            continue
+        invalid += 1
+        for name in usage.missing:
+            missing_counts[name] = missing_counts.get(name, 0) + 1
+        if len(problems) < MAX_REPORTED:
+            problems.append({
+                "email": recipient.get("email"),
+                "missing": sorted(usage.missing),
+                "warnings": usage.warnings
+            })
+    return {
+        "version_id": compiled.version_id,
+        "recipients": total,
+        "valid": total - invalid,
+        "invalid": invalid,
+        "missing": dict(sorted(missing_counts.items(), key=lambda item: -item[1])[:MAX_REPORTED]),
+        "unused": dict(sorted(unused_counts.items(), key=lambda item: -item[1])[:MAX_REPORTED]),
+        "problems": problems
+    }
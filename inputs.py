@@ -0,0 +1,69 @@
+"""Checks on the server-side files and URLs that tool arguments name.
+
+Tools read local files (attachments, recipient and contact lists) and fetch
+attachment URLs on the caller's behalf. In HTTP mode every bearer key holder
+is a caller, so files are only read from one input directory (INPUT_DIR,
+by default DATA_DIR/uploads) and URLs must resolve to public addresses.
+"""
+
+import asyncio
+import ipaddress
+import os
+import socket
+from typing import Optional
+from urllib.parse import urlsplit
+from config import config
+
+
+def input_dir() -> str:
+    """Return the directory tool arguments may read files from, creating it if needed."""
+    path = os.path.realpath(os.path.expanduser(config.input_dir or os.path.join(config.data_dir, "uploads")))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def resolve_input_path(path: str) -> str:
+    """Resolve a file named in a tool argument to its real path inside the input directory.
+
+    Relative paths are taken from the input directory. Paths that leave it,
+    through ".." or a symlink, are rejected.
+    """
+    base = input_dir()
+    resolved = os.path.realpath(os.path.join(base, os.path.expanduser(path)))
+    if os.path.commonpath([base, resolved]) != base:
+        raise ValueError(f"{path} is outside the input directory (INPUT_DIR)")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"File not found in the input directory: {path}")
+    return resolved
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+async def check_public_url(url: str) -> Optional[str]:
+    """Raise ValueError unless url is http(s) and its host resolves only to public addresses.
+
+    Blocks requests to loopback, private, link-local and other internal
+    targets unless ALLOW_PRIVATE_URLS is set. Returns one of the checked
+    addresses (None when private URLs are allowed). Fetch the URL from that
+    address, since resolving the host again could give a different answer
+    (DNS rebinding).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    if config.allow_private_urls:
+        return None
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise ValueError(f"Cannot resolve {parts.hostname}: {str(e)}")
+    if not infos or not all(_is_public(info[4][0]) for info in infos):
+        raise ValueError(f"URL host {parts.hostname} is not a public address")
+    return infos[0][4][0]
@@ -10,12 +10,12 @@ Key Features:
 - Rate limiting and error handling
 """
 
+import asyncio
 import logging
 import sys
-from fastmcp import FastMCP
+import uvicorn
 from config import config
-from auth import SendGridTokenVerifier
-from tools import init_tools
+from server import background_services, create_app, mcp
 
 # Configure logging
 logging.basicConfig(
@@ -24,58 +24,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize authentication
-auth_handler = SendGridTokenVerifier()
 
-# Create FastMCP server instance
-mcp = FastMCP(
-    name="SendGrid MCP Server",
-    instructions="""
-    SendGrid MCP Server provides email management capabilities through the SendGrid API.
-    
-    Authentication:
-    - Uses SendGrid API key for authentication
-    - Can be provided via environment variable SENDGRID_API_KEY
-    - Or via Authorization header: 'Bearer YOUR-API-KEY'
-    
-    Available Features:
-    1. Email Management:
-       - Send emails with HTML/text content
-       - Use dynamic templates
-       - Track delivery and engagement
+async def serve() -> None:
+    """Run the server over STDIO."""
+    async with background_services():
+        await mcp.run_async()
 
-    2. Contact Management:
-       - Add/update contacts
-       - Manage contact lists
-    
-    Example:
-    To send an email, use the send_email tool:
-    - Provide recipient(s), subject, and content
-    - Optionally set custom sender and content type
-    """,
-    auth=auth_handler,
-    on_duplicate_tools="error",
-    on_duplicate_resources="warn",
-    on_duplicate_prompts="replace",
-    include_fastmcp_meta=True
-)
 
+def serve_http() -> None:
+    """Run the server over HTTP/SSE with MCP_WORKERS processes sharing one port."""
+    if config.mcp_transport == "sse" and config.mcp_workers > 1:
+        raise ValueError("SSE sessions are bound to one process; use MCP_TRANSPORT=http with MCP_WORKERS > 1")
+    # Worker processes need an import string; a single worker reuses this process's server
+    multi_worker = config.mcp_workers > 1
+    uvicorn.run(
+        "server:create_app" if multi_worker else create_app(),
+        factory=multi_worker,
+        host=config.mcp_host,
+        port=config.mcp_port,
+        workers=config.mcp_workers,
+        log_level="debug" if config.debug else "info",
+        timeout_graceful_shutdown=5
+    )
 
-# Initialize tools with the server instance
-init_tools(mcp)
 
 if __name__ == "__main__":
     try:
         logger.info("SendGrid MCP Server starting...")
-        logger.info(f"Rate limit: {config.rate_limit} requests/second")
+        logger.info(f"Rate limit: {config.rate_limit} requests/second ({config.rate_limit_store} store)")
         
         if config.sendgrid_api_key:
             logger.info("Default API key configured from environment")
         else:
             logger.info("No default API key - clients must provide their own")
             
-        # Run the server with default STDIO transport
-        mcp.run()
+        if config.mcp_transport == "stdio":
+            asyncio.run(serve())
+        else:
+            logger.info(
+                f"Serving {config.mcp_transport} on {config.mcp_host}:{config.mcp_port} "
+                f"with {config.mcp_workers} worker(s)"
+            )
+            serve_http()
         
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")
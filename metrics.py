@@ -0,0 +1,287 @@
+"""In-process metrics and optional tracing for SendGrid MCP Server.
+
+Counters and histograms keep their series in plain dicts keyed by label
+values, so recording a sample costs a dict lookup and a bisect. They are
+rendered in the Prometheus text exposition format. Cache and registry
+counters are read from the objects' existing attributes at scrape time
+rather than updated on every call.
+
+Metrics are per process: with several HTTP workers each worker reports
+its own series.
+
+Spans are created through OpenTelemetry when OTEL_TRACING is enabled and
+the opentelemetry-api package is installed; otherwise span() is a no-op.
+Exporters are configured the usual OpenTelemetry way (SDK setup or
+opentelemetry-instrument).
+"""
+
+import bisect
+import contextlib
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from fastmcp.server.middleware import Middleware
+from config import config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a fast cached lookup to a slow upstream call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add amount to the series for the given label values."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram with a fixed set of label names."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one sample for the given label values."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                bucket_labels = _format_labels(bucket_names, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Collected:
+    """Metric whose series are read from a callback at scrape time."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Labels,
+                 collect: Callable[[], Iterable[Tuple[Labels, float]]]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._collect()
+        ]
+
+
+class MetricsRegistry:
+    """Registry of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        # Hit/miss counters of caches and registries, by name
+        self.caches: Dict[str, Any] = {}
+
+    def counter(self, name: str, help: str, labelnames: Labels = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Labels = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collected(self, name: str, help: str, kind: str, labelnames: Labels,
+                  collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> Collected:
+        metric = Collected(name, help, kind, labelnames, collect)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, cache: Any) -> None:
+        """Export an object's hits/misses attributes as cache counters."""
+        self.caches[name] = cache
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+tool_calls = metrics.counter(
+    "sendgrid_mcp_tool_calls_total", "MCP tool calls by tool and outcome", ("tool", "status")
+)
+tool_duration = metrics.histogram(
+    "sendgrid_mcp_tool_duration_seconds", "MCP tool call latency", ("tool",)
+)
+upstream_duration = metrics.histogram(
+    "sendgrid_mcp_upstream_duration_seconds",
+    "SendGrid API request latency per attempt by endpoint and status code",
+    ("method", "endpoint", "status")
+)
+rate_limit_wait = metrics.histogram(
+    "sendgrid_mcp_rate_limit_wait_seconds",
+    "Time spent waiting for the client-side rate limiter",
+    ("endpoint_class",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+retries = metrics.counter(
+    "sendgrid_mcp_retries_total", "Retried SendGrid API requests by endpoint and reason", ("endpoint", "reason")
+)
+metrics.collected(
+    "sendgrid_mcp_cache_hits_total", "Cache and registry hits", "counter", ("cache",),
+    lambda: (((name,), cache.hits) for name, cache in metrics.caches.items())
+)
+metrics.collected(
+    "sendgrid_mcp_cache_misses_total", "Cache and registry misses", "counter", ("cache",),
+    lambda: (((name,), cache.misses) for name, cache in metrics.caches.items())
+)
+metrics.collected(
+    "sendgrid_mcp_cache_entries", "Entries held by each cache and registry", "gauge", ("cache",),
+    lambda: (((name,), len(cache)) for name, cache in metrics.caches.items())
+)
+
+# IDs in paths (template IDs, batch IDs, job IDs) would make every request its own series
+_ID_SEGMENT = re.compile(r"\d")
+_endpoint_labels: Dict[str, str] = {}
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Normalize an API path to a low-cardinality label, e.g. templates/:id."""
+    label = _endpoint_labels.get(endpoint)
+    if label is None:
+        label = "/".join(
+            ":id" if _ID_SEGMENT.search(segment) else segment
+            for segment in endpoint.strip("/").split("/")
+        )
+        if len(_endpoint_labels) < 1024:
+            _endpoint_labels[endpoint] = label
+    return label
+
+
+def _load_tracer():
+    if not config.otel_tracing:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("OTEL_TRACING is enabled but opentelemetry-api is not installed; tracing is off")
+        return None
+    return trace.get_tracer("sendgrid-mcp-server")
+
+
+_tracer = _load_tracer()
+_no_span = contextlib.nullcontext()
+
+
+def span(name: str, **attributes: Any):
+    """Return a context manager for an OpenTelemetry span, or a no-op."""
+    if _tracer is None:
+        return _no_span
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Count and time every tool call, inside a span named after the tool.
+
+    The tool name comes from the caller, so names the server does not
+    register are recorded under a single ``"unknown"`` label rather than
+    opening a new series per name.
+    """
+
+    def __init__(self) -> None:
+        self._tools: frozenset = frozenset()
+
+    async def _label(self, context) -> str:
+        name = context.message.name
+        if name in self._tools:
+            return name
+        # Tools can be added after startup, so reload the registered names
+        # on a miss; only calls to unregistered names pay for the lookup.
+        ctx = context.fastmcp_context
+        if ctx is not None:
+            self._tools = frozenset(await ctx.fastmcp.get_tools())
+        return name if name in self._tools else "unknown"
+
+    async def on_call_tool(self, context, call_next):
+        name = await self._label(context)
+        status = "error"
+        start = time.perf_counter()
+        try:
+            with span(f"tool {name}", tool=name):
+                result = await call_next(context)
+            status = "ok"
+            return result
+        finally:
+            tool_duration.observe(time.perf_counter() - start, name)
+            tool_calls.inc(name, status)
@@ -0,0 +1,133 @@
+"""Direct builders for v3 /mail/send request bodies.
+
+Produces the same JSON as building sendgrid.helpers.mail objects and
+calling Mail.get(), key order included, without allocating a helper object
+per address. Addresses are parsed and validated in one pass: plain
+addresses skip the RFC 2822 parser, and "Name <email>" strings go through
+email.utils.parseaddr exactly as the helper library does. Recipients are
+de-duplicated case-insensitively, as Personalization.tos does.
+
+The parsed sender is cached per (from_email, from_name), since most sends
+reuse a handful of senders.
+"""
+
+import re
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Dot-atom addresses that parseaddr would return unchanged
+_PLAIN_ADDRESS = re.compile(r"[A-Za-z0-9_+'%-]+(?:\.[A-Za-z0-9_+'%-]+)*@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*")
+
+# Same check the helper library applies to message content
+_API_KEY_PATTERN = re.compile(r"SG\.[0-9a-zA-Z]+\.[0-9a-zA-Z]+")
+
+
+def parse_address(email: Any, name: Optional[str] = None) -> Dict[str, str]:
+    """Return the {"name", "email"} dict for an address, like Email(email, name).get().
+
+    Raises ValueError for values without an email address, which SendGrid
+    would reject.
+    """
+    if not isinstance(email, str) or not email:
+        raise ValueError(f"Invalid email address: {email!r}")
+    if name:
+        return {"name": name, "email": email}
+    if _PLAIN_ADDRESS.fullmatch(email):
+        return {"email": email}
+
+    parsed_name, parsed_email = parseaddr(email)
+    if "@" not in parsed_email:
+        raise ValueError(f"Invalid email address: {email!r}")
+    if parsed_name:
+        return {"name": parsed_name, "email": parsed_email}
+    return {"email": parsed_email}
+
+
+def unique_addresses(addresses: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Drop repeated addresses (case-insensitive), keeping the first."""
+    seen = set()
+    unique = []
+    for address in addresses:
+        key = address["email"].lower()
+        if key not in seen:
+            seen.add(key)
+            unique.append(address)
+    return unique
+
+
+@lru_cache(maxsize=1024)
+def _skeleton(from_email: str, from_name: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    # Cached as a tuple of pairs so callers can't mutate the shared copy
+    return tuple(parse_address(from_email, from_name).items())
+
+
+def _base(from_email: str, from_name: Optional[str], subject: Optional[str]) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {"from": dict(_skeleton(from_email, from_name))}
+    if subject is not None:
+        payload["subject"] = subject
+    return payload
+
+
+def mail_payload(
+    from_email: str,
+    from_name: Optional[str],
+    to_emails: List[str],
+    subject: Optional[str],
+    content: Optional[str] = None,
+    content_type: Optional[str] = "text/html",
+    template_id: Optional[str] = None,
+    dynamic_template_data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Build a body with every recipient in one personalization.
+
+    With a template_id the content is omitted and dynamic_template_data
+    goes on the personalization; otherwise content is sent as content_type.
+    """
+    payload = _base(from_email, from_name, subject)
+
+    personalization: Dict[str, Any] = {}
+    tos = unique_addresses([parse_address(email) for email in to_emails])
+    if tos:
+        personalization["to"] = tos
+    if template_id and dynamic_template_data:
+        personalization["dynamic_template_data"] = dynamic_template_data
+    if personalization:
+        payload["personalizations"] = [personalization]
+
+    if template_id:
+        payload["template_id"] = template_id
+    else:
+        if isinstance(content, str) and _API_KEY_PATTERN.match(content):
+            raise ValueError("Content appears to contain a SendGrid API key")
+        entry = {}
+        if content_type is not None:
+            entry["type"] = content_type
+        if content is not None:
+            entry["value"] = content
+        payload["content"] = [entry]
+    return payload
+
+
+def bulk_payload(
+    from_email: str,
+    from_name: Optional[str],
+    recipients: List[Dict[str, Any]],
+    template_id: str,
+    subject: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build a template body with one personalization per recipient."""
+    payload = _base(from_email, from_name, subject)
+
+    personalizations = []
+    for recipient in recipients:
+        personalization: Dict[str, Any] = {"to": [parse_address(recipient["email"], recipient.get("name"))]}
+        if recipient.get("dynamic_template_data"):
+            personalization["dynamic_template_data"] = recipient["dynamic_template_data"]
+        personalizations.append(personalization)
+    if personalizations:
+        payload["personalizations"] = personalizations
+
+    if template_id is not None:
+        payload["template_id"] = template_id
+    return payload
@@ -0,0 +1,311 @@
+"""Process-wide token-bucket rate limiting for SendGrid API requests.
+
+Buckets are keyed by API key fingerprint and endpoint class, so every
+SendGridClient instance for the same key draws from the same quota while
+different tenants and endpoint families are throttled independently.
+
+With RATE_LIMIT_STORE=sqlite (the default when MCP_WORKERS > 1), bucket
+state is kept in a SQLite file under DATA_DIR so every worker process
+serving the same port draws from one quota per key. A worker never blocks
+its event loop for more than LOCK_TIMEOUT on another worker's write; it
+backs off with asyncio.sleep and retries instead.
+"""
+
+import asyncio
+import sqlite3
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+from config import config
+
+# Longest a shared bucket update blocks the event loop waiting for the SQLite write lock
+LOCK_TIMEOUT = 0.005
+
+# Give up on a shared bucket update after retrying for this long
+LOCK_WAIT = 5.0
+
+
+def endpoint_class(endpoint: str) -> str:
+    """Map an API endpoint path to its rate-limit class."""
+    path = endpoint.lstrip("/")
+    if path.startswith("mail/send"):
+        return "mail"
+    if path.startswith("marketing/"):
+        return "marketing"
+    if path.startswith("templates"):
+        return "templates"
+    return "default"
+
+
+class TokenBucket:
+    """Async token bucket with burst capacity and FIFO waiting."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Server feedback from X-RateLimit-* headers
+        self._blocked_until = 0.0
+        self._server_rate = 0.0
+        self._server_rate_until = 0.0
+        # asyncio.Lock wakes waiters in arrival order, which keeps waiting fair
+        self._lock = asyncio.Lock()
+
+        # Wait-time statistics
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _current_rate(self, now: float) -> float:
+        if now < self._server_rate_until and self._server_rate < self.rate:
+            return self._server_rate
+        return self.rate
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self._current_rate(now))
+        self._updated = now
+
+    async def observe(self, remaining: int, reset_in: float) -> None:
+        """Slow down using the quota SendGrid reports as remaining until reset."""
+        now = time.monotonic()
+        if remaining <= 0:
+            # Quota exhausted: hold everyone until the window resets, then refill from empty
+            self._blocked_until = max(self._blocked_until, now + reset_in)
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+            return
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self._tokens = min(self._tokens, float(remaining))
+        if reset_in > 0:
+            self._server_rate = remaining / reset_in
+            self._server_rate_until = now + reset_in
+
+    async def acquire(self) -> float:
+        """Take one token, waiting if necessary. Returns seconds waited."""
+        self.requests += 1
+        if self.rate <= 0 and time.monotonic() >= self._blocked_until:
+            return 0.0
+
+        start = time.monotonic()
+        async with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+            if self.rate > 0:
+                self._refill(time.monotonic())
+                if self._tokens < 1:
+                    rate = self._current_rate(time.monotonic())
+                    await asyncio.sleep((1 - self._tokens) / rate)
+                    self._refill(time.monotonic())
+                self._tokens -= 1
+
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self.throttled += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Return bucket configuration and wait-time statistics."""
+        return {
+            "rate": self.rate,
+            "burst": self.capacity,
+            "available_tokens": round(self._tokens, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.throttled, 3) if self.throttled else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3)
+        }
+
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    tat REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in SQLite, shared by worker processes.
+
+    Implemented as GCRA: every acquire atomically advances the bucket's
+    theoretical arrival time (TAT) by one emission interval and returns how
+    long the caller has to wait, so each request costs one short write
+    transaction and callers are served in reservation order.
+    """
+
+    def __init__(self, db: sqlite3.Connection, bucket_id: str, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._db = db
+        self._bucket_id = bucket_id
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._tolerance = (self.capacity - 1) * self._interval
+
+        # Wait-time statistics (for this process)
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def _update(self, fn) -> float:
+        """Run fn(tat, blocked_until, now) -> (tat, blocked_until, result) in one write transaction.
+
+        The write lock is waited for in short blocking attempts with async
+        backoff in between, so a busy store does not stall the event loop.
+        """
+        deadline = time.monotonic() + LOCK_WAIT
+        delay = 0.001
+        while True:
+            try:
+                return self._transaction(fn)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() >= deadline:
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _transaction(self, fn) -> float:
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT tat, blocked_until FROM buckets WHERE bucket = ?", (self._bucket_id,)
+            ).fetchone()
+            tat, blocked_until = row if row else (now, 0.0)
+            tat, blocked_until, result = fn(tat, blocked_until, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO buckets (bucket, tat, blocked_until) VALUES (?, ?, ?)",
+                (self._bucket_id, tat, blocked_until)
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return result
+
+    async def observe(self, remaining: int, reset_in: float) -> None:
+        """Slow down using the quota SendGrid reports as remaining until reset."""
+        def apply(tat: float, blocked_until: float, now: float):
+            if remaining <= 0:
+                # Quota exhausted: hold every worker until the window resets, then refill from empty
+                blocked_until = max(blocked_until, now + reset_in)
+                return max(tat, blocked_until + self._tolerance), blocked_until, 0.0
+            if self.rate > 0:
+                # Never allow more immediate requests than SendGrid says remain
+                tat = max(tat, now + self._tolerance - (remaining - 1) * self._interval)
+            return tat, blocked_until, 0.0
+
+        await self._update(apply)
+
+    async def acquire(self) -> float:
+        """Reserve one request slot, waiting if necessary. Returns seconds waited."""
+        self.requests += 1
+
+        def reserve(tat: float, blocked_until: float, now: float):
+            wait = max(0.0, blocked_until - now)
+            if self.rate <= 0:
+                return tat, blocked_until, wait
+            tat = max(tat, now)
+            wait = max(wait, tat - self._tolerance - now)
+            return tat + self._interval, blocked_until, wait
+
+        waited = await self._update(reserve)
+        if waited > 0:
+            await asyncio.sleep(waited)
+        if waited > 0.001:
+            self.throttled += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Return bucket configuration and wait-time statistics."""
+        row = self._db.execute("SELECT tat FROM buckets WHERE bucket = ?", (self._bucket_id,)).fetchone()
+        available = self.capacity
+        if row and self.rate > 0:
+            available = min(self.capacity, max(0.0, (time.time() + self._tolerance - row[0]) / self._interval + 1))
+        return {
+            "rate": self.rate,
+            "burst": self.capacity,
+            "shared": True,
+            "available_tokens": round(available, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.throttled, 3) if self.throttled else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3)
+        }
+
+
+class RateLimiter:
+    """Registry of token buckets keyed by (API key fingerprint, endpoint class)."""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], Union[TokenBucket, SharedTokenBucket]] = {}
+        self._shared_db: Optional[sqlite3.Connection] = None
+
+    def _shared_store(self) -> sqlite3.Connection:
+        if self._shared_db is None:
+            db = sqlite3.connect(config.data_path("ratelimit.sqlite3"), isolation_level=None, timeout=LOCK_TIMEOUT)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute(SHARED_SCHEMA)
+            self._shared_db = db
+        return self._shared_db
+
+    def bucket(self, key_id: str, endpoint: str) -> Union[TokenBucket, SharedTokenBucket]:
+        """Return the bucket for an API key and endpoint, creating it on first use."""
+        bucket_key = (key_id, endpoint_class(endpoint))
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            rate = config.endpoint_rate_limits.get(bucket_key[1]) or config.rate_limit
+            burst = config.rate_limit_burst or rate
+            if config.rate_limit_store == "sqlite":
+                bucket = SharedTokenBucket(self._shared_store(), ":".join(bucket_key), rate, burst)
+            else:
+                bucket = TokenBucket(rate, burst)
+            self._buckets[bucket_key] = bucket
+        return bucket
+
+    async def acquire(self, key_id: str, endpoint: str) -> float:
+        """Wait for a request slot. Returns seconds waited."""
+        return await self.bucket(key_id, endpoint).acquire()
+
+    async def observe(self, key_id: str, endpoint: str, headers: Mapping[str, str]) -> None:
+        """Feed SendGrid's X-RateLimit-Remaining/Reset headers back into the bucket."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            quota = int(remaining)
+            reset_in = max(0.0, float(reset) - time.time())
+        except ValueError:
+            return
+        await self.bucket(key_id, endpoint).observe(quota, reset_in)
+
+    def forget(self, key_id: str) -> None:
+        """Drop every bucket for an API key."""
+        for bucket_key in [bucket_key for bucket_key in self._buckets if bucket_key[0] == key_id]:
+            del self._buckets[bucket_key]
+
+    def stats(self, key_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return per-endpoint-class statistics for one API key."""
+        return {
+            name: bucket.stats()
+            for (bucket_key_id, name), bucket in self._buckets.items()
+            if bucket_key_id == key_id
+        }
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
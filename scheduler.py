@@ -0,0 +1,170 @@
+"""Scheduled sends: send_at parsing, send-time spreading and a local batch index.
+
+Scheduled sends are grouped under a SendGrid batch ID so they can be
+paused or canceled together. Every batch this server schedules is recorded
+in a SQLite index under DATA_DIR, so status queries are answered locally
+without API calls.
+"""
+
+import math
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+from client import MAX_SCHEDULE_AHEAD
+from config import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    key_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT,
+    recipients INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    first_send_at INTEGER,
+    last_send_at INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS batches_key ON batches (key_id, last_send_at);
+"""
+
+# SendGrid drops paused batches this long after their send time
+PAUSED_BATCH_EXPIRY = 72 * 3600
+
+
+def parse_send_at(value: Union[str, int, float]) -> int:
+    """Parse a send time given as a Unix timestamp or an ISO 8601 string (UTC if no offset)."""
+    if isinstance(value, (int, float)):
+        return check_send_at(int(value))
+    text = str(value).strip()
+    if text.isdigit():
+        return check_send_at(int(text))
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid send_at: {value} (use a Unix timestamp or ISO 8601)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return check_send_at(int(parsed.timestamp()))
+
+
+def check_send_at(send_at: int) -> int:
+    """Check that a send time is not in the past and within SendGrid's 72-hour window."""
+    now = time.time()
+    if send_at < now - 60:
+        raise ValueError(f"send_at {_iso(send_at)} is in the past")
+    if send_at > now + MAX_SCHEDULE_AHEAD:
+        raise ValueError(f"send_at {_iso(send_at)} is more than 72 hours ahead")
+    return send_at
+
+
+def spread_send_times(start: int, window_seconds: int, requests: int) -> List[int]:
+    """Spread requests evenly across [start, start + window_seconds).
+
+    Staggering the send_at of large sends smooths delivery instead of
+    releasing every chunk in the same second.
+    """
+    if requests <= 1 or window_seconds <= 0:
+        return [start] * max(requests, 1)
+    step = window_seconds / requests
+    return [start + math.floor(index * step) for index in range(requests)]
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class ScheduleIndex:
+    """SQLite index of scheduled batches, scoped by API key fingerprint."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def record(
+        self,
+        key_id: str,
+        batch_id: str,
+        send_at: int,
+        recipients: int,
+        description: Optional[str] = None
+    ) -> None:
+        """Record one scheduled request in a batch, creating the batch on first use."""
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "INSERT INTO batches (batch_id, key_id, status, description, recipients, requests, "
+                "first_send_at, last_send_at, created_at, updated_at) VALUES (?, ?, 'scheduled', ?, ?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT (batch_id) DO UPDATE SET recipients = recipients + excluded.recipients, "
+                "requests = requests + 1, first_send_at = MIN(first_send_at, excluded.first_send_at), "
+                "last_send_at = MAX(last_send_at, excluded.last_send_at), updated_at = excluded.updated_at",
+                (batch_id, key_id, description, recipients, send_at, send_at, now, now)
+            )
+
+    def set_status(self, key_id: str, batch_id: str, status: str) -> None:
+        """Record a batch status change made through the API."""
+        with self._db:
+            self._db.execute(
+                "UPDATE batches SET status = ?, updated_at = ? WHERE batch_id = ? AND key_id = ?",
+                (status, time.time(), batch_id, key_id)
+            )
+
+    def _describe(self, row: sqlite3.Row) -> Dict[str, Any]:
+        now = time.time()
+        state = row["status"]
+        if state == "scheduled" and row["last_send_at"] is not None and row["last_send_at"] <= now:
+            state = "sent"
+        elif state == "paused" and row["last_send_at"] is not None and row["last_send_at"] + PAUSED_BATCH_EXPIRY <= now:
+            state = "expired"
+        return {
+            "batch_id": row["batch_id"],
+            "state": state,
+            "description": row["description"],
+            "recipients": row["recipients"],
+            "requests": row["requests"],
+            "first_send_at": _iso(row["first_send_at"]),
+            "last_send_at": _iso(row["last_send_at"]),
+            "seconds_until_first_send": max(0, round(row["first_send_at"] - now)) if row["first_send_at"] else None,
+            "updated_at": _iso(row["updated_at"])
+        }
+
+    def get(self, key_id: str, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Return a scheduled batch's state, if it belongs to the API key."""
+        row = self._db.execute(
+            "SELECT * FROM batches WHERE batch_id = ? AND key_id = ?", (batch_id, key_id)
+        ).fetchone()
+        return self._describe(row) if row else None
+
+    def list(self, key_id: str, include_done: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the API key's batches, soonest send first; pending ones only unless include_done."""
+        sql = "SELECT * FROM batches WHERE key_id = ?"
+        params: List[Any] = [key_id]
+        if not include_done:
+            sql += " AND status IN ('scheduled', 'paused') AND last_send_at + ? > ?"
+            params.extend([PAUSED_BATCH_EXPIRY, time.time()])
+        sql += " ORDER BY first_send_at LIMIT ?"
+        params.append(limit)
+        batches = [self._describe(row) for row in self._db.execute(sql, params)]
+        if not include_done:
+            batches = [batch for batch in batches if batch["state"] in ("scheduled", "paused")]
+        return batches
+
+
+# Global schedule index, opened on first use
+_schedule_index: Optional[ScheduleIndex] = None
+
+
+def get_schedule_index() -> ScheduleIndex:
+    """Return the process-wide schedule index."""
+    global _schedule_index
+    if _schedule_index is None:
+        _schedule_index = ScheduleIndex(config.data_path("schedules.sqlite3"))
+    return _schedule_index
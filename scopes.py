@@ -0,0 +1,71 @@
+"""API key scope verification against SendGrid's GET /scopes.
+
+Each key is checked once and the result is cached by key fingerprint:
+the granted scope set for valid keys, and a shorter-lived negative entry
+for keys SendGrid rejects. Later checks are in-memory lookups.
+"""
+
+import logging
+from typing import FrozenSet, Optional
+import httpx
+from cache import SingleFlight, TTLCache
+from client import SendGridClient, client_registry
+from config import config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Granted scopes keyed by API key fingerprint; None marks a rejected key
+scope_cache = TTLCache(config.scope_cache_size, config.scope_cache_ttl)
+_scope_fetches = SingleFlight()
+metrics.register_cache("scopes", scope_cache)
+
+
+async def _fetch_scopes(client: SendGridClient) -> Optional[FrozenSet[str]]:
+    try:
+        response = await client.make_api_request("GET", "/scopes")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (401, 403):
+            scope_cache.set(client.key_id, None, ttl=config.scope_cache_negative_ttl)
+            return None
+        raise
+    scopes = frozenset(response.get("scopes") or [])
+    scope_cache.set(client.key_id, scopes)
+    return scopes
+
+
+async def get_scopes(client: SendGridClient) -> Optional[FrozenSet[str]]:
+    """Return the scopes granted to a client's API key, or None if SendGrid rejects the key."""
+    entry = scope_cache.get(client.key_id)
+    if entry is not None and entry.fresh:
+        return entry.value
+    return await _scope_fetches.do(client.key_id, lambda: _fetch_scopes(client))
+
+
+async def verify_key(api_key: str) -> Optional[FrozenSet[str]]:
+    """Verify an API key with SendGrid. Returns its scopes, or None if it is invalid.
+
+    If SendGrid cannot be reached the key is let through unverified (with
+    no scopes) and not cached, so it is checked again on the next request.
+    """
+    try:
+        return await get_scopes(client_registry.get(api_key))
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Could not verify API key scopes: {str(e)}")
+        return frozenset()
+
+
+async def require_scope(client: SendGridClient, scope: str) -> None:
+    """Raise PermissionError if scope verification is on and the key lacks scope."""
+    if config.auth_verify_mode != "scopes":
+        return
+    try:
+        scopes = await get_scopes(client)
+    except httpx.HTTPError as e:
+        # Fail open: the SendGrid call itself will surface a real permission problem
+        logger.warning(f"Could not verify API key scopes: {str(e)}")
+        return
+    if scopes is None:
+        raise PermissionError("SendGrid rejected the API key")
+    if scope not in scopes:
+        raise PermissionError(f"API key is missing the '{scope}' scope")
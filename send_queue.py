@@ -0,0 +1,311 @@
+"""Durable outbound send queue with background dispatch.
+
+When SEND_QUEUE is enabled, the email tools store the prepared /mail/send
+body in a local SQLite (WAL) queue and return a queue ID immediately. A
+pool of dispatcher workers drains the queue under the shared rate limiter.
+
+Several server processes can share the queue. A worker claims a send by
+writing its queue's owner ID and a lease (SEND_QUEUE_LEASE seconds, renewed
+while the send is in flight) to the row; only sends whose lease has expired
+are reclaimed by other workers, so a restarting process never takes over
+sends another live process is delivering.
+
+Delivery is at-least-once: a send interrupted by a crash is retried once
+its lease expires. Every payload carries its queue ID in custom_args so duplicates
+can be spotted in event data, and callers can pass an idempotency key so
+that re-submitting the same send does not enqueue it twice.
+
+API keys are never written to disk. Queued rows reference the key by
+fingerprint and wait until a client using that key has been seen in this
+process (the default SENDGRID_API_KEY is registered at startup).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import httpx
+from client import SendGridClient, client_registry, key_fingerprint
+from config import config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    id TEXT PRIMARY KEY,
+    key_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    recipients INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message_id TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    -- For 'sending' rows, when the claiming worker's lease expires
+    next_attempt_at REAL NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS sends_ready ON sends (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS send_files (
+    send_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (send_id, path)
+) WITHOUT ROWID;
+"""
+
+# Statuses: pending -> sending -> sent, or back to pending for a retry, or dead
+STATUSES = ("pending", "sending", "sent", "dead")
+
+
+class SendQueue:
+    """SQLite-backed send queue and its dispatcher workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(sends)")}
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE sends ADD COLUMN owner TEXT")
+        self.owner = uuid.uuid4().hex
+        self._api_keys: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._workers: List["asyncio.Task[None]"] = []
+
+    def register_key(self, api_key: str) -> str:
+        """Remember an API key in memory so its queued sends can be dispatched."""
+        key_id = key_fingerprint(api_key)
+        self._api_keys[key_id] = api_key
+        return key_id
+
+    def enqueue(
+        self,
+        client: SendGridClient,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Store a prepared /mail/send body. Returns the queue ID and status."""
+        key_id = self.register_key(client._api_key)
+        if idempotency_key:
+            queue_id = hashlib.sha256(f"{key_id}:{idempotency_key}".encode()).hexdigest()[:32]
+        else:
+            queue_id = uuid.uuid4().hex
+
+        payload = dict(payload)
+        payload["custom_args"] = {**payload.get("custom_args", {}), "queue_id": queue_id}
+        recipients = sum(len(p.get("to", [])) for p in payload.get("personalizations", []))
+        now = time.time()
+
+        inserted = self._db.execute(
+            "INSERT OR IGNORE INTO sends (id, key_id, payload, recipients, status, created_at, updated_at, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+            (queue_id, key_id, json.dumps(payload), recipients, now, now, now)
+        ).rowcount
+        if inserted:
+            # Encoded attachment files the send will stream, kept out of cache pruning
+            self._db.executemany(
+                "INSERT OR IGNORE INTO send_files (send_id, path) VALUES (?, ?)",
+                [
+                    (queue_id, attachment["content_path"])
+                    for attachment in payload.get("attachments") or [] if "content_path" in attachment
+                ]
+            )
+        self._wakeup.set()
+
+        status = self.status(queue_id, key_id)
+        status["duplicate"] = not inserted
+        return status
+
+    def status(self, queue_id: str, key_id: str) -> Optional[Dict[str, Any]]:
+        """Return the state of one queued send, if it belongs to the API key."""
+        row = self._db.execute(
+            "SELECT id, status, attempts, recipients, message_id, last_error, created_at, updated_at "
+            "FROM sends WHERE id = ? AND key_id = ?",
+            (queue_id, key_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "queue_id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "recipients": row["recipients"],
+            "message_id": row["message_id"],
+            "last_error": row["last_error"],
+            "queued_seconds_ago": round(time.time() - row["created_at"], 3),
+            "updated_seconds_ago": round(time.time() - row["updated_at"], 3)
+        }
+
+    def attachment_paths(self) -> List[str]:
+        """Return encoded attachment files referenced by sends not yet sent or dead-lettered."""
+        rows = self._db.execute(
+            "SELECT DISTINCT f.path FROM send_files f JOIN sends s ON s.id = f.send_id "
+            "WHERE s.status IN ('pending', 'sending')"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self, key_id: str) -> Dict[str, Any]:
+        """Return queue depth by status and the age of the oldest pending send."""
+        counts = {status: 0 for status in STATUSES}
+        for row in self._db.execute("SELECT status, COUNT(*) AS n FROM sends WHERE key_id = ? GROUP BY status", (key_id,)):
+            counts[row["status"]] = row["n"]
+        oldest = self._db.execute(
+            "SELECT MIN(created_at) FROM sends WHERE key_id = ? AND status IN ('pending', 'sending')", (key_id,)
+        ).fetchone()[0]
+        return {
+            "depth": counts["pending"] + counts["sending"],
+            "by_status": counts,
+            "oldest_pending_seconds": round(time.time() - oldest, 3) if oldest else None,
+            "dispatchable": key_id in self._api_keys,
+            "workers": len(self._workers)
+        }
+
+    def _claim(self, limit: int) -> List[sqlite3.Row]:
+        """Atomically lease up to limit ready sends for known keys, moving them to 'sending'.
+
+        Ready sends are pending ones due for an attempt and 'sending' ones
+        whose lease has expired (their worker died or was cut off).
+        """
+        if not self._api_keys:
+            return []
+        key_ids = list(self._api_keys)
+        placeholders = ",".join("?" * len(key_ids))
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute(
+                f"SELECT id, key_id, payload, recipients, attempts FROM sends "
+                f"WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? AND key_id IN ({placeholders}) "
+                f"ORDER BY next_attempt_at LIMIT ?",
+                (now, *key_ids, limit)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE sends SET status = 'sending', attempts = attempts + 1, updated_at = ?, "
+                "next_attempt_at = ?, owner = ? WHERE id = ?",
+                [(now, now + config.send_queue_lease, self.owner, row["id"]) for row in rows]
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _renew(self, queue_ids: List[str]) -> None:
+        """Extend the lease on sends this queue is still delivering."""
+        lease_until = time.time() + config.send_queue_lease
+        self._db.executemany(
+            "UPDATE sends SET next_attempt_at = ? WHERE id = ? AND status = 'sending' AND owner = ?",
+            [(lease_until, queue_id, self.owner) for queue_id in queue_ids]
+        )
+
+    async def _hold(self, queue_ids: List[str]) -> None:
+        while True:
+            await asyncio.sleep(config.send_queue_lease / 3)
+            self._renew(queue_ids)
+
+    def _finish(self, queue_id: str, status: str, message_id: Optional[str] = None,
+                error: Optional[str] = None, retry_at: Optional[float] = None) -> None:
+        now = time.time()
+        # Skipped if the lease expired and another worker has reclaimed the send
+        self._db.execute(
+            "UPDATE sends SET status = ?, message_id = ?, last_error = ?, updated_at = ?, next_attempt_at = ?, "
+            "owner = NULL WHERE id = ? AND status = 'sending' AND owner = ?",
+            (status, message_id, error, now, retry_at or now, queue_id, self.owner)
+        )
+
+    async def _dispatch(self, row: sqlite3.Row) -> None:
+        attempts = row["attempts"] + 1
+        try:
+            client = client_registry.get(self._api_keys[row["key_id"]])
+            payload = json.loads(row["payload"])
+            result = await client.send_payload(payload)
+        except Exception as e:
+            # 4xx other than 429 means SendGrid rejected the payload; retrying can't help
+            rejected = (
+                isinstance(e, httpx.HTTPStatusError)
+                and 400 <= e.response.status_code < 500
+                and e.response.status_code != 429
+            )
+            if rejected or attempts >= config.send_queue_max_attempts:
+                logger.error(f"Queued send {row['id']} moved to dead letters: {str(e)}")
+                self._finish(row["id"], "dead", error=str(e))
+            else:
+                delay = min(config.retry_backoff_max, config.retry_backoff_base * 2 ** attempts)
+                logger.warning(f"Queued send {row['id']} failed, retrying in {delay:.1f}s: {str(e)}")
+                self._finish(row["id"], "pending", error=str(e), retry_at=time.time() + delay)
+            return
+
+        self._finish(row["id"], "sent", message_id=result["message_id"])
+        if payload.get("send_at") is not None and payload.get("batch_id"):
+            # Scheduled sends enter the schedule index only once SendGrid has accepted them
+            from scheduler import get_schedule_index
+            get_schedule_index().record(
+                row["key_id"], payload["batch_id"], payload["send_at"], row["recipients"], payload.get("subject")
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            rows = self._claim(config.send_queue_batch_size)
+            if not rows:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            holder = asyncio.create_task(self._hold([row["id"] for row in rows]))
+            try:
+                await asyncio.gather(*(self._dispatch(row) for row in rows))
+            finally:
+                holder.cancel()
+
+    def start(self) -> None:
+        """Start the dispatcher workers.
+
+        Sends cut off by a crash may or may not have reached SendGrid; they are
+        retried (at-least-once) when their lease expires, not at startup.
+        """
+        if self._workers:
+            return
+        if config.sendgrid_api_key:
+            self.register_key(config.sendgrid_api_key)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(config.send_queue_workers)]
+        logger.info(f"Send queue started with {len(self._workers)} worker(s)")
+
+    async def stop(self) -> None:
+        """Stop the dispatcher workers; claimed sends are retried when their lease expires."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Global send queue instance, opened on first use
+_send_queue: Optional[SendQueue] = None
+
+
+def _queue_sizes():
+    if _send_queue is None:
+        return []
+    rows = _send_queue._db.execute("SELECT status, COUNT(*) FROM sends GROUP BY status").fetchall()
+    return [((status,), n) for status, n in rows]
+
+
+metrics.collected("sendgrid_mcp_send_queue_sends", "Queued sends by status", "gauge", ("status",), _queue_sizes)
+
+
+def get_send_queue() -> SendQueue:
+    """Return the process-wide send queue."""
+    global _send_queue
+    if _send_queue is None:
+        _send_queue = SendQueue(config.data_path("queue", "sends.sqlite3"))
+    return _send_queue
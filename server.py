@@ -0,0 +1,119 @@
+"""FastMCP server instance for SendGrid MCP Server.
+
+Builds the server and registers its tools exactly once per process, so the
+HTTP app factory can be imported by uvicorn worker processes without
+registering tools on a second server instance.
+"""
+
+import hmac
+from contextlib import asynccontextmanager
+from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from config import config
+from auth import SendGridTokenVerifier
+from client import close_http_clients
+from metrics import CONTENT_TYPE, ToolMetricsMiddleware, metrics
+from send_queue import get_send_queue
+from suppressions import close_suppression_sets
+from tools import init_tools
+
+# Initialize authentication
+auth_handler = SendGridTokenVerifier()
+
+# Create FastMCP server instance
+mcp = FastMCP(
+    name="SendGrid MCP Server",
+    instructions="""
+    SendGrid MCP Server provides email management capabilities through the SendGrid API.
+    
+    Authentication:
+    - Uses SendGrid API key for authentication
+    - Can be provided via environment variable SENDGRID_API_KEY
+    - Or via Authorization header: 'Bearer YOUR-API-KEY'
+    
+    Available Features:
+    1. Email Management:
+       - Send emails with HTML/text content
+       - Use dynamic templates
+       - Track delivery and engagement
+
+    2. Contact Management:
+       - Add/update contacts
+       - Manage contact lists
+    
+    Example:
+    To send an email, use the send_email tool:
+    - Provide recipient(s), subject, and content
+    - Optionally set custom sender and content type
+    """,
+    auth=auth_handler,
+    on_duplicate_tools="error",
+    on_duplicate_resources="warn",
+    on_duplicate_prompts="replace",
+    include_fastmcp_meta=True
+)
+
+
+mcp.add_middleware(ToolMetricsMiddleware())
+
+# Initialize tools with the server instance
+init_tools(mcp)
+
+
+# Custom routes skip MCP auth, so the metrics endpoint needs its own token
+if config.metrics_path and config.metrics_token:
+    _metrics_authorization = f"Bearer {config.metrics_token}".encode()
+
+    @mcp.custom_route(config.metrics_path, methods=["GET"])
+    async def prometheus_metrics(request: Request) -> PlainTextResponse:
+        """Serve metrics in the Prometheus text format (HTTP transports)."""
+        authorization = request.headers.get("authorization", "").encode()
+        if not hmac.compare_digest(authorization, _metrics_authorization):
+            return PlainTextResponse(
+                "Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"}
+            )
+        return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+# Unsigned webhook posts are only accepted when explicitly allowed
+if config.webhook_path and (config.webhook_public_key or config.webhook_allow_unsigned):
+    from webhooks import handle_event_webhook
+    mcp.custom_route(config.webhook_path, methods=["POST"])(handle_event_webhook)
+
+
+@asynccontextmanager
+async def background_services():
+    """Start the send queue dispatcher and release shared connection pools on shutdown."""
+    if config.send_queue_enabled:
+        get_send_queue().start()
+    try:
+        yield
+    finally:
+        if config.send_queue_enabled:
+            await get_send_queue().stop()
+        await close_suppression_sets()
+        await close_http_clients()
+
+
+def create_app():
+    """Build the ASGI app for the HTTP/SSE transports.
+
+    Used as a uvicorn factory so each worker process builds its own app.
+    With several workers, requests for one session can land on any worker,
+    so streamable HTTP runs stateless.
+    """
+    app = mcp.http_app(
+        path=config.mcp_path,
+        transport=config.mcp_transport,
+        stateless_http=True if config.mcp_workers > 1 else None
+    )
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with mcp_lifespan(app), background_services():
+            yield
+
+    app.router.lifespan_context = lifespan
+    return app
@@ -0,0 +1,294 @@
+"""Email statistics from /stats and /categories/stats with a local day cache.
+
+SendGrid reports statistics in UTC day buckets. Every fetched day is kept
+in SQLite under DATA_DIR/stats.sqlite3, keyed by (API key, dimension, day),
+where the dimension is "global" or "category:<name>". A day is final once it
+was fetched STATS_SETTLE_SECONDS after it ended, and final days are never
+fetched again. A query only asks SendGrid for the span of days it is missing
+or that can still change (after warm-up, just today, at most every
+STATS_TODAY_TTL seconds), in one request per ten categories. Week and month
+rollups, totals and rates are computed locally from the day buckets.
+"""
+
+import json
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from client import SendGridClient
+from config import config
+from metrics import metrics
+
+GLOBAL = "global"
+
+# /categories/stats accepts at most ten categories per request
+MAX_CATEGORIES = 10
+
+AGGREGATIONS = ("day", "week", "month")
+
+# (rate, numerator, denominator) computed for totals and every period
+RATES = (
+    ("delivery_rate", "delivered", "requests"),
+    ("bounce_rate", "bounces", "requests"),
+    ("open_rate", "unique_opens", "delivered"),
+    ("click_rate", "unique_clicks", "delivered"),
+    ("spam_report_rate", "spam_reports", "delivered"),
+    ("unsubscribe_rate", "unsubscribes", "delivered")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS day_stats (
+    key_id TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    day TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (key_id, dimension, day)
+) WITHOUT ROWID;
+"""
+
+DayMetrics = Dict[str, int]
+
+
+def parse_day(value: str) -> date:
+    """Parse a YYYY-MM-DD date."""
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid date: {value} (use YYYY-MM-DD)")
+
+
+def date_range(start_date: Optional[str], end_date: Optional[str], days: int) -> Tuple[date, date]:
+    """Resolve a query's first and last day; defaults to the last days days up to today (UTC)."""
+    today = datetime.now(timezone.utc).date()
+    end = min(parse_day(end_date), today) if end_date else today
+    start = parse_day(start_date) if start_date else end - timedelta(days=max(days, 1) - 1)
+    if start > end:
+        raise ValueError(f"start_date {start} is after end_date {end}")
+    return start, end
+
+
+def _days(start: date, end: date) -> List[str]:
+    return [(start + timedelta(days=n)).isoformat() for n in range((end - start).days + 1)]
+
+
+def _dimension(category: Optional[str]) -> str:
+    return f"category:{category}" if category else GLOBAL
+
+
+class StatsCache:
+    """SQLite cache of per-day stats buckets, scoped by API key fingerprint."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        # Day buckets served from the cache and fetched from SendGrid
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM day_stats").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cached day count and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def load(self, key_id: str, dimensions: List[str], start: date, end: date) -> Dict[Tuple[str, str], Tuple[DayMetrics, float]]:
+        """Return cached (metrics, fetched_at) by (dimension, day) for a range."""
+        placeholders = ",".join("?" * len(dimensions))
+        rows = self._db.execute(
+            f"SELECT dimension, day, metrics, fetched_at FROM day_stats "
+            f"WHERE key_id = ? AND dimension IN ({placeholders}) AND day BETWEEN ? AND ?",
+            (key_id, *dimensions, start.isoformat(), end.isoformat())
+        ).fetchall()
+        return {(dimension, day): (json.loads(data), fetched_at) for dimension, day, data, fetched_at in rows}
+
+    def store(self, key_id: str, buckets: Dict[Tuple[str, str], DayMetrics], fetched_at: float) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO day_stats VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key_id, dimension, day, json.dumps(day_metrics, separators=(",", ":")), fetched_at)
+                    for (dimension, day), day_metrics in buckets.items()
+                ]
+            )
+
+
+def _final_after(day: str) -> float:
+    """Fetch time after which a day's stats no longer change."""
+    day_end = datetime.combine(date.fromisoformat(day) + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return day_end.timestamp() + config.stats_settle_seconds
+
+
+def _needs_fetch(final_after: float, fetched_at: Optional[float], now: float) -> bool:
+    if fetched_at is None:
+        return True
+    if fetched_at >= final_after:
+        return False
+    return now - fetched_at > config.stats_today_ttl
+
+
+async def _fetch(
+    client: SendGridClient,
+    categories: List[str],
+    start: date,
+    end: date
+) -> Dict[Tuple[str, str], DayMetrics]:
+    """Fetch day buckets for a span; global stats when categories is empty."""
+    params: Dict[str, Any] = {"start_date": start.isoformat(), "end_date": end.isoformat(), "aggregated_by": "day"}
+    if categories:
+        params["categories"] = categories
+    response = await client.make_api_request("GET", "/categories/stats" if categories else "/stats", params=params)
+
+    # The fetched span is complete: days or categories missing from the response had no activity
+    dimensions = [_dimension(category) for category in categories] or [GLOBAL]
+    buckets: Dict[Tuple[str, str], DayMetrics] = {
+        (dimension, day): {} for day in _days(start, end) for dimension in dimensions
+    }
+    for bucket in response:
+        for entry in bucket.get("stats") or []:
+            key = (_dimension(entry.get("name")) if categories else GLOBAL, bucket["date"])
+            if key in buckets:
+                buckets[key] = {
+                    name: value for name, value in (entry.get("metrics") or {}).items() if isinstance(value, (int, float))
+                }
+    return buckets
+
+
+async def day_stats(
+    client: SendGridClient,
+    categories: List[str],
+    start: date,
+    end: date
+) -> Dict[str, Dict[str, DayMetrics]]:
+    """Return {dimension: {day: metrics}} for a range, fetching only what the cache lacks."""
+    cache = get_stats_cache()
+    dimensions = [_dimension(category) for category in categories] or [GLOBAL]
+    cached = cache.load(client.key_id, dimensions, start, end)
+    days = _days(start, end)
+    now = time.time()
+
+    # Per dimension, the first and last day that must be (re)fetched
+    final_after = [(day, _final_after(day)) for day in days]
+    spans: Dict[str, Tuple[str, str]] = {}
+    for dimension in dimensions:
+        stale = [
+            day for day, final in final_after
+            if _needs_fetch(final, cached.get((dimension, day), (None, None))[1], now)
+        ]
+        if stale:
+            spans[dimension] = (stale[0], stale[-1])
+
+    fetched: Dict[Tuple[str, str], DayMetrics] = {}
+    if spans and not categories:
+        first, last = spans[GLOBAL]
+        fetched.update(await _fetch(client, [], date.fromisoformat(first), date.fromisoformat(last)))
+    elif spans:
+        stale_categories = [category for category in categories if _dimension(category) in spans]
+        for offset in range(0, len(stale_categories), MAX_CATEGORIES):
+            group = stale_categories[offset:offset + MAX_CATEGORIES]
+            first = min(spans[_dimension(category)][0] for category in group)
+            last = max(spans[_dimension(category)][1] for category in group)
+            fetched.update(await _fetch(client, group, date.fromisoformat(first), date.fromisoformat(last)))
+    if fetched:
+        cache.store(client.key_id, fetched, now)
+
+    cache.misses += len(fetched)
+    cache.hits += len(days) * len(dimensions) - len(fetched)
+    return {
+        dimension: {
+            day: fetched[(dimension, day)] if (dimension, day) in fetched else cached[(dimension, day)][0]
+            for day in days
+        }
+        for dimension in dimensions
+    }
+
+
+def rates(totals: DayMetrics) -> Dict[str, Optional[float]]:
+    """Delivery and engagement rates; open/click/spam/unsubscribe rates are per delivered message."""
+    return {
+        name: round(totals.get(numerator, 0) / totals[denominator], 4) if totals.get(denominator) else None
+        for name, numerator, denominator in RATES
+    }
+
+
+def _period(day: str, aggregated_by: str) -> str:
+    value = date.fromisoformat(day)
+    if aggregated_by == "week":
+        value -= timedelta(days=value.weekday())
+    elif aggregated_by == "month":
+        value = value.replace(day=1)
+    return value.isoformat()
+
+
+def _add(totals: DayMetrics, day_metrics: DayMetrics) -> None:
+    for name, value in day_metrics.items():
+        totals[name] = totals.get(name, 0) + value
+
+
+def rollup(days: Dict[str, DayMetrics], aggregated_by: str) -> Dict[str, Any]:
+    """Aggregate day buckets into periods (weeks start on Monday) plus overall totals and rates."""
+    totals: DayMetrics = {}
+    for day_metrics in days.values():
+        _add(totals, day_metrics)
+    if aggregated_by == "day":
+        periods = days
+    else:
+        periods = {}
+        for day, day_metrics in days.items():
+            _add(periods.setdefault(_period(day, aggregated_by), {}), day_metrics)
+    return {
+        "totals": totals,
+        "rates": rates(totals),
+        "stats": [
+            {"date": period, "metrics": period_metrics, "rates": rates(period_metrics)}
+            for period, period_metrics in periods.items()
+        ]
+    }
+
+
+async def get_stats(
+    client: SendGridClient,
+    categories: List[str],
+    start: date,
+    end: date,
+    aggregated_by: str = "day"
+) -> Dict[str, Any]:
+    """Return global stats, or per-category stats when categories are given."""
+    if aggregated_by not in AGGREGATIONS:
+        raise ValueError(f"aggregated_by must be one of: {', '.join(AGGREGATIONS)}")
+    by_dimension = await day_stats(client, categories, start, end)
+    result: Dict[str, Any] = {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "aggregated_by": aggregated_by
+    }
+    if categories:
+        result["categories"] = {
+            category: rollup(by_dimension[_dimension(category)], aggregated_by) for category in categories
+        }
+    else:
+        result.update(rollup(by_dimension[GLOBAL], aggregated_by))
+    return result
+
+
+# Global stats cache, opened on first use
+_stats_cache: Optional[StatsCache] = None
+
+
+def get_stats_cache() -> StatsCache:
+    """Return the process-wide stats cache."""
+    global _stats_cache
+    if _stats_cache is None:
+        _stats_cache = StatsCache(config.data_path("stats.sqlite3"))
+        metrics.register_cache("stats_days", _stats_cache)
+    return _stats_cache
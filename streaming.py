@@ -0,0 +1,73 @@
+"""Streaming JSON request bodies for /mail/send.
+
+Attachments prepared by the attachments module reference their
+base64-encoded content on disk ("content_path") instead of carrying it as
+a string. StreamingBody serializes the rest of the payload as usual and
+splices each encoded file into the body as it is sent, so attachment
+content is never held in memory.
+"""
+
+import json
+import os
+import re
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Union
+
+CHUNK_SIZE = 256 * 1024
+
+
+def has_streamed_attachments(payload: Dict[str, Any]) -> bool:
+    """Return True if any attachment in a /mail/send body references an encoded file."""
+    return any("content_path" in attachment for attachment in payload.get("attachments") or [])
+
+
+class StreamingBody:
+    """A /mail/send body whose attachment contents are streamed from encoded files.
+
+    Iterating the body again (e.g. for a retry) starts a fresh stream, and
+    the exact length is known up front for the Content-Length header.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        token = uuid.uuid4().hex
+        files: Dict[str, str] = {}
+        attachments = []
+        for index, attachment in enumerate(payload.get("attachments") or []):
+            attachment = dict(attachment)
+            path = attachment.pop("content_path", None)
+            if path is not None:
+                marker = f"attachment-{index}-{token}"
+                files[marker] = path
+                attachment["content"] = marker
+            attachments.append(attachment)
+
+        text = json.dumps({**payload, "attachments": attachments})
+        self._parts: List[Union[bytes, str]] = []
+        if files:
+            pattern = '"(' + "|".join(re.escape(marker) for marker in files) + ')"'
+            for index, piece in enumerate(re.split(pattern, text)):
+                # re.split alternates literal JSON and captured markers
+                self._parts.append(files[piece] if index % 2 else piece.encode("utf-8"))
+        else:
+            self._parts.append(text.encode("utf-8"))
+
+        self.length = sum(
+            len(part) if isinstance(part, bytes) else os.path.getsize(part) + 2
+            for part in self._parts
+        )
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            yield b'"'
+            # Mark the file as in use so no worker prunes it from the attachment cache
+            os.utime(part)
+            with open(part, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield b'"'
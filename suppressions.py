@@ -0,0 +1,366 @@
+"""Recipient pre-filter against SendGrid's suppression lists.
+
+Each API key gets a local copy of its bounce, block, spam report and global
+unsubscribe lists in SQLite under DATA_DIR/suppressions, fronted by an
+in-memory Bloom filter. Checking a recipient is one O(1) Bloom probe; only
+probable hits (suppressed addresses and ~1% false positives) are confirmed
+with an indexed SQLite lookup.
+
+Lists are synced incrementally by created time, with a periodic full sync
+to pick up removals. Syncs run in the background: a send triggers one when
+the copy is older than SUPPRESSION_MAX_AGE and only waits for it (up to
+SUPPRESSION_SYNC_WAIT seconds) when an existing copy is older than
+SUPPRESSION_MAX_STALE. Until the first sync completes, and for keys without
+the suppression.read scope, sends go out unfiltered (SendGrid still drops
+suppressed recipients itself). A failed sync never blocks a send (fail-open).
+
+The SQLite copy is shared by every worker process, but each keeps its own
+Bloom filter. Every write bumps a version number in the meta table, and a
+worker rebuilds its filter before filtering a send if the version differs
+from the one its filter was built from.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import httpx
+from client import SendGridClient
+from config import config
+from payloads import parse_address
+from scopes import get_scopes
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSION_LISTS = ("bounces", "blocks", "spam_reports", "unsubscribes")
+
+# Suppression endpoints return at most 500 entries per page
+PAGE_SIZE = 500
+
+# Incremental syncs look back this far past the newest entry seen
+SYNC_OVERLAP_SECONDS = 300
+
+# Dropped recipients listed individually in a tool result; the rest are counted
+MAX_REPORTED_DROPS = 100
+
+# Parsed addresses need a local part and a dotted domain, without spaces
+_VALID_ADDRESS = re.compile(r"[^@\s]+@[^@\s.]+(?:\.[^@\s.]+)+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressions (
+    email TEXT NOT NULL,
+    list TEXT NOT NULL,
+    created INTEGER,
+    PRIMARY KEY (email, list)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1024)
+        self.size = int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SuppressionSet:
+    """Local copy of one API key's suppression lists."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._bloom_version = self._get_meta("version")
+        self._bloom = self._build_bloom()
+        self._task: Optional["asyncio.Task[Dict[str, Any]]"] = None
+        self.last_error: Optional[str] = None
+
+        # Lookup statistics
+        self.lookups = 0
+        self.probable_hits = 0
+        self.hits = 0
+
+    def _build_bloom(self) -> BloomFilter:
+        count = self._db.execute("SELECT COUNT(*) FROM suppressions").fetchone()[0]
+        bloom = BloomFilter(count * 2)
+        for (email,) in self._db.execute("SELECT email FROM suppressions"):
+            bloom.add(email)
+        return bloom
+
+    def _get_meta(self, key: str) -> Optional[float]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def reload(self) -> None:
+        """Rebuild the Bloom filter if the lists changed since it was built, e.g. by another worker."""
+        version = self._get_meta("version")
+        if version != self._bloom_version:
+            self._bloom_version = version
+            self._bloom = self._build_bloom()
+
+    def lookup(self, email: str) -> Optional[str]:
+        """Return the list a lower-cased address is on, or None."""
+        self.lookups += 1
+        if email not in self._bloom:
+            return None
+        self.probable_hits += 1
+        row = self._db.execute("SELECT list FROM suppressions WHERE email = ? LIMIT 1", (email,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return row[0]
+
+    def age(self) -> Optional[float]:
+        """Seconds since the least recently synced list, or None if any list never synced."""
+        synced = [self._get_meta(f"synced:{name}") for name in SUPPRESSION_LISTS]
+        if None in synced:
+            return None
+        return time.time() - min(synced)
+
+    def apply(self, list_name: str, entries: List[Dict[str, Any]], full: bool, synced_at: float) -> int:
+        """Store fetched entries for one list; a full sync replaces the list."""
+        rows = [
+            (str(entry["email"]).strip().lower(), list_name, entry.get("created"))
+            for entry in entries if entry.get("email")
+        ]
+        newest = max((row[2] for row in rows if row[2]), default=None)
+        with self._db:
+            if full:
+                self._db.execute("DELETE FROM suppressions WHERE list = ?", (list_name,))
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"full:{list_name}", synced_at))
+            self._db.executemany("INSERT OR REPLACE INTO suppressions VALUES (?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"synced:{list_name}", synced_at))
+            if newest is not None:
+                self._db.execute(
+                    "INSERT INTO meta VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                    (f"cursor:{list_name}", newest)
+                )
+            self._db.execute("INSERT INTO meta VALUES ('version', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1")
+            version = self._get_meta("version")
+
+        # Added to in place only if no other worker wrote since the filter was built
+        current = version == (self._bloom_version or 0) + 1
+        self._bloom_version = version
+        if full or not current:
+            self._bloom = self._build_bloom()
+        else:
+            for email, _, _ in rows:
+                self._bloom.add(email)
+            if self._bloom.count > self._bloom.capacity:
+                self._bloom = self._build_bloom()
+        return len(rows)
+
+    async def sync(self, client: SendGridClient, full: bool = False) -> Dict[str, Any]:
+        """Fetch new entries for every list, or all entries when a full sync is due."""
+        synced = {}
+        for list_name in SUPPRESSION_LISTS:
+            started = time.time()
+            last_full = self._get_meta(f"full:{list_name}")
+            cursor = self._get_meta(f"cursor:{list_name}")
+            list_full = full or last_full is None or started - last_full > config.suppression_full_sync_interval
+            start_time = None if list_full or cursor is None else int(cursor) - SYNC_OVERLAP_SECONDS
+
+            entries = []
+            offset = 0
+            while True:
+                params = {"limit": PAGE_SIZE, "offset": offset}
+                if start_time is not None:
+                    params["start_time"] = start_time
+                page = await client.make_api_request("GET", f"/suppression/{list_name}", params=params)
+                entries.extend(page)
+                if len(page) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+
+            synced[list_name] = self.apply(list_name, entries, list_full, started)
+        return synced
+
+    def refresh(self, client: SendGridClient) -> Optional["asyncio.Task[Dict[str, Any]]"]:
+        """Start a background sync unless one is running or one failed recently."""
+        if self._task is not None and not self._task.done():
+            return self._task
+        failed_at = self._get_meta("failed_at")
+        if failed_at and time.time() - failed_at < config.suppression_max_age:
+            return None
+        self._task = asyncio.create_task(self._run_sync(client))
+        return self._task
+
+    async def _run_sync(self, client: SendGridClient) -> Dict[str, Any]:
+        try:
+            synced = await self.sync(client)
+            self.last_error = None
+            with self._db:
+                self._db.execute("DELETE FROM meta WHERE key = 'failed_at'")
+            return synced
+        except Exception as e:
+            self.last_error = str(e)
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('failed_at', ?)", (time.time(),))
+            logger.warning(f"Suppression sync failed, sends are not filtered against new entries: {str(e)}")
+            return {}
+
+    def status(self) -> Dict[str, Any]:
+        """Return per-list counts, sync times and lookup statistics."""
+        self.reload()
+        counts = dict(self._db.execute("SELECT list, COUNT(*) FROM suppressions GROUP BY list").fetchall())
+        age = self.age()
+        return {
+            "lists": {
+                name: {
+                    "count": counts.get(name, 0),
+                    "synced_at": _iso(self._get_meta(f"synced:{name}")),
+                    "last_full_sync": _iso(self._get_meta(f"full:{name}"))
+                }
+                for name in SUPPRESSION_LISTS
+            },
+            "age_seconds": round(age, 1) if age is not None else None,
+            "syncing": self._task is not None and not self._task.done(),
+            "last_error": self.last_error,
+            "bloom_bytes": len(self._bloom._bits),
+            "lookups": self.lookups,
+            "probable_hits": self.probable_hits,
+            "hits": self.hits
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._db.close()
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+# Open suppression sets keyed by API key fingerprint
+_sets: Dict[str, SuppressionSet] = {}
+
+
+def get_suppression_set(key_id: str) -> SuppressionSet:
+    """Return the suppression set for an API key, opening it on first use."""
+    suppressions = _sets.get(key_id)
+    if suppressions is None:
+        suppressions = SuppressionSet(config.data_path("suppressions", f"{key_id}.sqlite3"))
+        _sets[key_id] = suppressions
+    return suppressions
+
+
+async def close_suppression_sets() -> None:
+    """Stop running syncs and close all suppression databases."""
+    for suppressions in _sets.values():
+        await suppressions.close()
+    _sets.clear()
+
+
+async def fresh_suppression_set(client: SendGridClient) -> SuppressionSet:
+    """Return a client's suppression set, refreshing it per the freshness bounds."""
+    suppressions = get_suppression_set(client.key_id)
+    suppressions.reload()
+    age = suppressions.age()
+    if age is not None and age <= config.suppression_max_age:
+        return suppressions
+
+    # The first sync fetches every list in full, so it always runs in the background
+    task = suppressions.refresh(client)
+    if task is not None and age is not None and age > config.suppression_max_stale:
+        try:
+            await asyncio.wait_for(asyncio.shield(task), config.suppression_sync_wait)
+        except asyncio.TimeoutError:
+            logger.warning("Suppression sync is still running; filtering against the local copy as it is")
+        suppressions.reload()
+    return suppressions
+
+
+class RecipientFilter:
+    """Drops invalid, repeated and suppressed recipients, recording why."""
+
+    def __init__(self, suppressions: Optional[SuppressionSet]):
+        self._suppressions = suppressions
+        self._seen = set()
+        self.counts: Dict[str, int] = {}
+        self.dropped: List[Dict[str, str]] = []
+
+    def reason(self, email: str) -> Optional[str]:
+        """Return why a recipient should be dropped, or None to keep it."""
+        try:
+            address = parse_address(email.strip() if isinstance(email, str) else email)["email"]
+        except ValueError:
+            return "invalid"
+        if not _VALID_ADDRESS.fullmatch(address):
+            return "invalid"
+        key = address.lower()
+        if key in self._seen:
+            return "duplicate"
+        self._seen.add(key)
+        if self._suppressions is not None:
+            return self._suppressions.lookup(key)
+        return None
+
+    def accept(self, email: str) -> bool:
+        """Check one recipient, recording it if dropped."""
+        reason = self.reason(email)
+        if reason is None:
+            return True
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        if len(self.dropped) < MAX_REPORTED_DROPS:
+            self.dropped.append({"email": str(email), "reason": reason})
+        return False
+
+    def filter(self, emails: Iterable[str]) -> List[str]:
+        """Return the recipients to send to, in order."""
+        return [email for email in emails if self.accept(email)]
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize dropped recipients for a tool result."""
+        return {
+            "count": sum(self.counts.values()),
+            "by_reason": dict(self.counts),
+            "recipients": self.dropped
+        }
+
+
+async def recipient_filter(client: SendGridClient) -> RecipientFilter:
+    """Build a filter for one send, with suppression checks if SUPPRESSION_FILTER is on."""
+    if not config.suppression_filter:
+        return RecipientFilter(None)
+    try:
+        scopes = await get_scopes(client)
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not verify API key scopes: {str(e)}")
+        scopes = None
+    if scopes and "suppression.read" not in scopes:
+        logger.debug("API key lacks the suppression.read scope; sending without suppression filtering")
+        return RecipientFilter(None)
+    return RecipientFilter(await fresh_suppression_set(client))
@@ -1,22 +1,184 @@
-"""Tools package for SendGrid MCP Server."""
+"""Tools package for SendGrid MCP Server.
 
+Importing the tool modules pulls in everything behind them (SQLite stores,
+the template engine, the SendGrid SDK helpers), and building each tool's
+JSON schema with pydantic costs several milliseconds, which made tool
+registration most of the server's own share of cold start. So the schemas
+of every tool and resource are cached in DATA_DIR/tool_schemas.json, keyed
+by a fingerprint of the tool module sources and the FastMCP version. With a
+current cache, init_tools registers stand-ins built from it without
+importing any tool module, and a module is imported the first time one of
+its tools is called or its resource is read. Otherwise (first start, edited
+tools, or TOOL_SCHEMA_CACHE=false) the modules are imported eagerly and the
+cache is rewritten.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional, Union
+import fastmcp
 from fastmcp import FastMCP
-from typing import Optional
+from fastmcp.resources import Resource
+from fastmcp.tools import Tool
+from config import config
+
+logger = logging.getLogger(__name__)
+
+TOOL_MODULES = (
+    "email_tools",
+    "contact_tools",
+    "diagnostics_tools",
+    "queue_tools",
+    "schedule_tools",
+    "suppression_tools",
+    "delivery_tools",
+    "stats_tools"
+)
+
+Component = Union[Tool, Resource]
+
+
+class ToolCollector:
+    """Builds tools and resources as tool modules are imported, without registering them.
+
+    Takes the server's place as tools.mcp when tools are registered from
+    cached schemas, so importing a tool module on first use does not
+    register its tools a second time.
+    """
+
+    def __init__(self):
+        # Components by tool name or resource URI
+        self.components: Dict[str, Component] = {}
+
+    def tool(self, **kwargs: Any) -> Callable[[Callable[..., Any]], Tool]:
+        def decorator(fn: Callable[..., Any]) -> Tool:
+            tool = Tool.from_function(fn, **kwargs)
+            self.components[tool.name] = tool
+            return tool
+        return decorator
+
+    def resource(self, uri: str, **kwargs: Any) -> Callable[[Callable[..., Any]], Resource]:
+        def decorator(fn: Callable[..., Any]) -> Resource:
+            resource = Resource.from_function(fn, uri=uri, **kwargs)
+            self.components[str(resource.uri)] = resource
+            return resource
+        return decorator
+
+
+# Where tool modules register their tools: the FastMCP server when they are
+# imported eagerly, a ToolCollector when tools are registered from the cache
+mcp: Optional[Union[FastMCP, ToolCollector]] = None
+
+
+def _load(module: str, key: str) -> Component:
+    """Import a tool module on first use and return one of its components."""
+    importlib.import_module(f"{__name__}.{module}")
+    return mcp.components[key]
+
+
+class LazyTool(Tool):
+    """A tool registered from cached schemas; its module is imported on the first call."""
+
+    module: str
+
+    async def run(self, arguments: Dict[str, Any]):
+        return await _load(self.module, self.name).run(arguments)
+
+
+class LazyResource(Resource):
+    """A resource registered from cached schemas; its module is imported on the first read."""
+
+    module: str
+
+    async def read(self) -> Union[str, bytes]:
+        return await _load(self.module, str(self.uri)).read()
+
+
+def _fingerprint() -> str:
+    """Hash of everything the cached schemas are derived from."""
+    digest = hashlib.sha256(f"{fastmcp.__version__} {sys.version_info[:2]}".encode())
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in TOOL_MODULES:
+        with open(os.path.join(package_dir, f"{module}.py"), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _read_cache(path: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached["components"]
+
+
+def _write_cache(path: str, fingerprint: str, components: List[Dict[str, Any]]) -> None:
+    # Written atomically, since worker processes may start at the same time
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w") as f:
+            json.dump({"fingerprint": fingerprint, "components": components}, f)
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning(f"Could not write tool schema cache {path}: {str(e)}")
+
+
+def _describe(module: str, component: Component) -> Dict[str, Any]:
+    return {
+        "module": module,
+        "kind": "tool" if isinstance(component, Tool) else "resource",
+        "schema": component.model_dump(mode="json", exclude={"fn", "serializer"})
+    }
 
-# Global MCP server instance
-mcp: Optional[FastMCP] = None
 
 def init_tools(server_instance: FastMCP):
-    """Initialize tools with the FastMCP server instance."""
+    """Register all tools and resources with the FastMCP server instance."""
     global mcp
-    mcp = server_instance
+    path = None
+    if config.tool_schema_cache:
+        try:
+            path = config.data_path("tool_schemas.json")
+        except OSError as e:
+            logger.warning(f"Tool schema cache disabled: {str(e)}")
+    fingerprint = _fingerprint() if path else None
+    cached = _read_cache(path, fingerprint) if path else None
+
+    if cached is not None:
+        mcp = ToolCollector()
+        for entry in cached:
+            if entry["kind"] == "tool":
+                server_instance.add_tool(LazyTool(module=entry["module"], **entry["schema"]))
+            else:
+                server_instance.add_resource(LazyResource(module=entry["module"], **entry["schema"]))
+        logger.debug(f"Registered {len(cached)} tools and resources from {path}")
+        return
 
     # Import all tool modules to register them with the MCP server
-    from . import email_tools
-    from . import contact_tools
+    mcp = server_instance
+    components = []
+    for module in TOOL_MODULES:
+        for value in vars(importlib.import_module(f"{__name__}.{module}")).values():
+            if isinstance(value, (Tool, Resource)):
+                components.append(_describe(module, value))
+    if path:
+        _write_cache(path, fingerprint, components)
+
 
 __all__ = [
     "email_tools",
     "contact_tools",
+    "diagnostics_tools",
+    "queue_tools",
+    "schedule_tools",
+    "suppression_tools",
+    "delivery_tools",
+    "stats_tools",
     "init_tools"
 ]
@@ -1,11 +1,19 @@
 """Contact management tools for SendGrid MCP Server."""
 
+import asyncio
 import json
 import logging
-from typing import Any, Dict, Optional, Union
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Union
 from fastmcp import Context
 from tools import mcp
+from bulk import iter_source, pack_batches, to_contact, with_field_ids
 from client import SendGridClient
+from config import config
+from contact_index import get_index, sync_index, write_through
+from exports import export_path, read_page, run_export
+from scopes import require_scope
 
 logger = logging.getLogger(__name__)
 
@@ -68,12 +76,15 @@ async def add_contact(
             await ctx.info("Sending contact update request to SendGrid")
 
         client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.write")
         result = await client.make_api_request(
             method="PUT",
             endpoint="/marketing/contacts",
             data=request_data
         )
 
+        write_through(client.key_id, [{**contact_data, "list_ids": lists}])
+
         if ctx:
             await ctx.info("Contact updated successfully")
 
@@ -99,6 +110,7 @@ async def get_contact_lists(ctx: Context = None) -> Dict[str, Any]:
             await ctx.info("Fetching contacts from SendGrid")
 
         client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
         result = await client.make_api_request(
             method="GET",
             endpoint="/marketing/contacts"
@@ -113,4 +125,330 @@ async def get_contact_lists(ctx: Context = None) -> Dict[str, Any]:
         error_msg = f"Failed to retrieve contacts: {str(e)}"
         if ctx:
             await ctx.error(error_msg)
-        raise RuntimeError(error_msg)
\ No newline at end of file
+        raise RuntimeError(error_msg)
+
+
+IMPORT_DONE_STATUSES = ("completed", "failed", "errored")
+
+
+async def _custom_field_ids(client: SendGridClient) -> Dict[str, str]:
+    """Map custom field names to the field IDs PUT /marketing/contacts expects."""
+    try:
+        response = await client.make_api_request("GET", "/marketing/field_definitions")
+    except Exception as e:
+        logger.warning(f"Could not fetch custom field definitions, sending custom fields as named: {str(e)}")
+        return {}
+    return {field["name"]: field["id"] for field in response.get("custom_fields") or []}
+
+
+def _spool(contacts: List[Dict[str, Any]]) -> str:
+    """Write a submitted batch to an NDJSON file, to update the index once its job completes."""
+    path = config.data_path("imports", f"{uuid.uuid4().hex}.ndjson")
+    with open(path, "w", encoding="utf-8") as f:
+        for contact in contacts:
+            f.write(json.dumps(contact) + "\n")
+    return path
+
+
+def _read_spool(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+@mcp.tool(
+    name="bulk_upsert_contacts",
+    description="""Add or update many contacts at once from an inline list or a local CSV/NDJSON file.
+Contacts are packed into large batches (up to 30k contacts / 6MB per request) and the import jobs are tracked until SendGrid finishes them.""",
+    tags=["contacts", "sendgrid", "marketing", "bulk"]
+)
+async def bulk_upsert_contacts(
+    contacts: Optional[List[Dict[str, Any]]] = None,
+    contacts_file: Optional[str] = None,
+    list_ids: Optional[str] = None,
+    wait_for_completion: bool = True,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Upsert contacts in size-bounded batches and poll each import job."""
+    try:
+        lists = [list_id.strip() for list_id in list_ids.split(",")] if list_ids else []
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.write")
+        field_ids = await _custom_field_ids(client)
+        # Batches are sized as sent, with custom fields keyed by ID; the index keys them by name
+        field_names = {field_id: name for name, field_id in field_ids.items()}
+        source = (with_field_ids(to_contact(record), field_ids) for record in iter_source(contacts, contacts_file))
+        
+        batches: List[Dict[str, Any]] = []
+        failures: List[Dict[str, Any]] = []
+        counts = {"submitted": 0, "processed": 0}
+        input_error = None
+        
+        # Only submissions hold a slot, so at most bulk_concurrency batches are in memory
+        slots = asyncio.Semaphore(config.bulk_concurrency)
+        
+        async def report_progress() -> None:
+            if ctx:
+                await ctx.report_progress(counts["processed"], counts["submitted"])
+        
+        async def upsert_batch(index: int, batch: List[Dict[str, Any]], batch_bytes: int) -> None:
+            count = len(batch)
+            spool = None
+            try:
+                request_data: Dict[str, Any] = {"contacts": batch}
+                if lists:
+                    request_data["list_ids"] = lists
+                try:
+                    response = await client.make_api_request(
+                        method="PUT",
+                        endpoint="/marketing/contacts",
+                        data=request_data
+                    )
+                    if wait_for_completion and response.get("job_id"):
+                        spool = await asyncio.to_thread(_spool, batch)
+                finally:
+                    # Drop the batch before polling so memory stays flat while jobs run
+                    del request_data, batch
+                    slots.release()
+                
+                job_id = response.get("job_id")
+                entry = {"batch": index, "contacts": count, "bytes": batch_bytes, "job_id": job_id, "status": "pending"}
+                batches.append(entry)
+                
+                if wait_for_completion and job_id:
+                    job = await client.wait_for_job(
+                        f"/marketing/contacts/imports/{job_id}",
+                        lambda status: status.get("status") in IMPORT_DONE_STATUSES
+                    )
+                    entry["status"] = job.get("status")
+                    entry["results"] = job.get("results")
+                    # Only jobs that imported every contact are written through; the next sync covers the rest
+                    if entry["status"] == "completed" and not (entry["results"] or {}).get("errored_count"):
+                        write_through(client.key_id, (
+                            {**with_field_ids(contact, field_names), "list_ids": lists} for contact in _read_spool(spool)
+                        ))
+                    counts["processed"] += count
+                    await report_progress()
+            except Exception as e:
+                failures.append({"batch": index, "contacts": count, "error": str(e)})
+            finally:
+                if spool:
+                    os.remove(spool)
+        
+        tasks = []
+        try:
+            for index, (batch, batch_bytes) in enumerate(
+                pack_batches(source, config.contact_batch_size, config.contact_batch_bytes)
+            ):
+                await slots.acquire()
+                counts["submitted"] += len(batch)
+                tasks.append(asyncio.create_task(upsert_batch(index, batch, batch_bytes)))
+                await report_progress()
+        except ValueError as e:
+            # Stop reading bad input but still report the batches already submitted
+            input_error = str(e)
+            if ctx:
+                await ctx.error(f"Stopped reading contacts: {input_error}")
+        finally:
+            await asyncio.gather(*tasks)
+        
+        if ctx:
+            await ctx.info(
+                f"Submitted {counts['submitted']} contact(s) in {len(batches)} import job(s), "
+                f"{len(failures)} failed batch(es)"
+            )
+        
+        return {
+            "contacts_submitted": counts["submitted"],
+            "batches": sorted(batches, key=lambda batch: batch["batch"]),
+            "failures": sorted(failures, key=lambda failure: failure["batch"]),
+            "input_error": input_error
+        }
+        
+    except Exception as e:
+        error_msg = f"Failed to bulk upsert contacts: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="export_contacts",
+    description="""Export all contacts (or specific lists/segments) to a local file using SendGrid's export job API.
+Returns an export_id; page through the result with read_contact_export.""",
+    tags=["contacts", "sendgrid", "marketing"]
+)
+async def export_contacts(
+    list_ids: Optional[str] = None,
+    segment_ids: Optional[str] = None,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Run a contact export job and stream its files into a local NDJSON file."""
+    try:
+        lists = [list_id.strip() for list_id in list_ids.split(",")] if list_ids else None
+        segments = [segment_id.strip() for segment_id in segment_ids.split(",")] if segment_ids else None
+        
+        if ctx:
+            await ctx.info("Starting contact export")
+        
+        async def report_progress(count: int) -> None:
+            if ctx:
+                await ctx.report_progress(count, None)
+        
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        export = await run_export(client, lists, segments, on_progress=report_progress)
+        
+        if ctx:
+            await ctx.info(f"Exported {export['contacts']} contact(s)")
+        
+        return {
+            "export_id": export["export_id"],
+            "contacts": export["contacts"],
+            "path": export["path"],
+            "next_cursor": 0 if export["contacts"] else None
+        }
+        
+    except Exception as e:
+        error_msg = f"Failed to export contacts: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="read_contact_export",
+    description="Read a page of contacts from a finished export_contacts result. Pass the returned next_cursor to get the next page.",
+    tags=["contacts", "sendgrid", "marketing"]
+)
+async def read_contact_export(
+    export_id: str,
+    cursor: int = 0,
+    limit: int = 100,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Return one cursor-paginated page of an exported contact file."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        path = export_path(client.key_id, export_id)
+        if not os.path.isfile(path):
+            raise ValueError(f"No finished export {export_id} for this API key")
+        
+        contacts, next_cursor = read_page(path, cursor, max(1, min(limit, 1000)))
+        return {
+            "export_id": export_id,
+            "contacts": contacts,
+            "next_cursor": next_cursor
+        }
+        
+    except Exception as e:
+        error_msg = f"Failed to read contact export {export_id}: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="find_contact",
+    description="Check whether an email address is a contact and which lists it belongs to, using the local contact index (no API call)",
+    tags=["contacts", "sendgrid", "marketing", "index"]
+)
+async def find_contact(email: str, ctx: Context = None) -> Dict[str, Any]:
+    """Look up one contact in the local index."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        index = get_index(client.key_id)
+        contact = index.get(email)
+        return {
+            "email": email,
+            "found": contact is not None,
+            "contact": contact,
+            "index": index.status()
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to look up contact {email}: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="search_contacts",
+    description="""Prefix-search contacts in the local contact index by email, first or last name, or by a custom field, optionally restricted to one list (no API call).
+Run sync_contact_index first if the index has never been synced.""",
+    tags=["contacts", "sendgrid", "marketing", "index"]
+)
+async def search_contacts(
+    prefix: str = "",
+    field: Optional[str] = None,
+    list_id: Optional[str] = None,
+    limit: int = 50,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Search the local contact index."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        index = get_index(client.key_id)
+        contacts = index.search(prefix, field=field, list_id=list_id, limit=max(1, min(limit, 1000)))
+        return {
+            "contacts": contacts,
+            "count": len(contacts),
+            "index": index.status()
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to search contacts: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="get_contact_index_status",
+    description="Show the size and sync lag of the local contact index",
+    tags=["contacts", "sendgrid", "index"]
+)
+async def get_contact_index_status(ctx: Context = None) -> Dict[str, Any]:
+    """Return local contact index statistics."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        return get_index(client.key_id).status()
+
+    except Exception as e:
+        error_msg = f"Failed to get contact index status: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="sync_contact_index",
+    description="Refresh the local contact index from SendGrid. Incremental by default; full=true rebuilds it from a complete contact export.",
+    tags=["contacts", "sendgrid", "index"]
+)
+async def sync_contact_index(full: bool = False, ctx: Context = None) -> Dict[str, Any]:
+    """Incrementally sync or fully rebuild the local contact index."""
+    try:
+        if ctx:
+            await ctx.info("Full contact index rebuild started" if full else "Contact index sync started")
+
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "marketing.read")
+        result = await sync_index(client, full=full)
+
+        if ctx:
+            await ctx.info(f"Contact index {result['mode']} sync: {result['contacts_synced']} contact(s)")
+
+        result["index"] = get_index(client.key_id).status()
+        return result
+
+    except Exception as e:
+        error_msg = f"Failed to sync contact index: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
@@ -0,0 +1,66 @@
+"""Delivery event tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict, Optional
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient, key_fingerprint
+from config import config
+from webhooks import get_event_store, summarize
+
+logger = logging.getLogger(__name__)
+
+
+@mcp.tool(
+    name="get_delivery_status",
+    description="Show what happened to a sent message or a recipient (processed, delivered, bounced, opened, clicked, ...) from Event Webhook events received by this server",
+    tags=["email", "sendgrid", "events"]
+)
+async def get_delivery_status(
+    message_id: Optional[str] = None,
+    email: Optional[str] = None,
+    limit: int = 50,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Return stored webhook events and a per-message summary for a message ID or recipient.
+
+    Args:
+        message_id: message_id returned by send_email/send_template_email (or a full sg_message_id)
+        email: Recipient address
+        limit: Maximum number of events to return
+    """
+    try:
+        if not message_id and not email:
+            raise ValueError("Provide a message_id or an email")
+
+        # The webhook is configured on one SendGrid account: the server's default key.
+        # Without one there is no way to tell whose events these are, so nobody may read them.
+        client = SendGridClient.from_context(ctx)
+        if not config.sendgrid_api_key or client.key_id != key_fingerprint(config.sendgrid_api_key):
+            raise PermissionError("Delivery events are only available to the server's default SendGrid account (SENDGRID_API_KEY)")
+
+        limit = max(1, min(limit, 1000))
+        store = get_event_store()
+        if message_id:
+            events = store.message_events(message_id, limit)
+            if email:
+                events = [event for event in events if str(event.get("email", "")).lower() == email.strip().lower()]
+        else:
+            events = store.recipient_events(email, limit)
+
+        if ctx:
+            await ctx.info(f"Found {len(events)} event(s)")
+
+        return {
+            "message_id": message_id,
+            "email": email,
+            "summary": summarize(events),
+            "events": events,
+            "webhook_enabled": bool(config.webhook_path and (config.webhook_public_key or config.webhook_allow_unsigned))
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to get delivery status: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
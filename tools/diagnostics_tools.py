@@ -0,0 +1,72 @@
+"""Diagnostics tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient, client_registry, request_flights, retry_budget, template_cache
+from handlebars import compiled_templates
+from metrics import metrics
+from rate_limiter import rate_limiter
+from scopes import scope_cache
+from stats import get_stats_cache
+
+logger = logging.getLogger(__name__)
+
+
+@mcp.tool(
+    name="get_rate_limit_stats",
+    description="Show client-side rate limiter state, throttling wait times and retries for your API key",
+    tags=["diagnostics", "sendgrid"]
+)
+async def get_rate_limit_stats(ctx: Context = None) -> Dict[str, Any]:
+    """Return token bucket and retry statistics for the caller's API key."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        return {
+            "key_id": client.key_id,
+            "buckets": rate_limiter.stats(client.key_id),
+            "retries": retry_budget(client.key_id).stats()
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to get rate limit stats: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="get_cache_stats",
+    description="Show hit/miss counters for the server's SendGrid response caches, client registry and coalesced requests",
+    tags=["diagnostics", "sendgrid"]
+)
+async def get_cache_stats(ctx: Context = None) -> Dict[str, Any]:
+    """Return cache and request coalescing statistics."""
+    try:
+        return {
+            "templates": template_cache.stats(),
+            "scopes": scope_cache.stats(),
+            "coalesced_requests": request_flights.stats(),
+            "clients": client_registry.stats(),
+            "stats_days": get_stats_cache().stats(),
+            "compiled_templates": compiled_templates.stats()
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to get cache stats: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.resource(
+    "metrics://prometheus",
+    name="metrics",
+    description="Tool, SendGrid API, rate limiter, retry and cache metrics in the Prometheus text format",
+    mime_type="text/plain",
+    tags={"diagnostics"}
+)
+def prometheus_metrics() -> str:
+    """Return the server's metrics, for STDIO clients without the HTTP /metrics endpoint."""
+    return metrics.render()
@@ -1,18 +1,73 @@
 """Email sending and template tools for SendGrid MCP Server."""
 
+import asyncio
 import logging
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from fastmcp import Context
 from tools import mcp
-from client import SendGridClient
+from attachments import prepare_attachments, release_attachments
+from bulk import chunked, iter_source, to_recipient
+from client import SendGridClient, invalidate_templates
 from config import config
+from handlebars import CompiledVersion, compiled_templates, validate_personalizations
+from scheduler import check_send_at, get_schedule_index, parse_send_at, spread_send_times
+from scopes import require_scope
+from send_queue import get_send_queue
+from suppressions import RecipientFilter, recipient_filter
 
 logger = logging.getLogger(__name__)
 
 
+async def _resolve_schedule(
+    client: SendGridClient,
+    send_at: Optional[str],
+    batch_id: Optional[str]
+) -> Tuple[Optional[int], Optional[str]]:
+    """Parse send_at and allocate a batch ID for it unless one was given."""
+    if send_at is None:
+        return None, batch_id
+    timestamp = parse_send_at(send_at)
+    if not batch_id:
+        await require_scope(client, "mail.batch.create")
+        batch_id = await client.create_batch()
+    return timestamp, batch_id
+
+
+# Rendering every recipient (and reading recipients_file) is CPU- and I/O-bound,
+# so these run in a worker thread to keep the event loop serving other calls
+def _validate_source(
+    compiled: CompiledVersion,
+    recipients: Optional[List[Dict[str, Any]]],
+    recipients_file: Optional[str]
+) -> Dict[str, Any]:
+    return validate_personalizations(
+        compiled, (to_recipient(record) for record in iter_source(recipients, recipients_file))
+    )
+
+
+def _count_source(recipients: Optional[List[Dict[str, Any]]], recipients_file: Optional[str]) -> int:
+    return sum(1 for _ in iter_source(recipients, recipients_file))
+
+
+def _report_dropped(result: Dict[str, Any], screen: RecipientFilter) -> None:
+    """Add recipients removed before sending to a tool result."""
+    if screen.counts:
+        result["dropped"] = screen.report()
+
+
+def _nothing_to_send(screen: RecipientFilter) -> Dict[str, Any]:
+    """Result for a send whose recipients were all dropped."""
+    return {
+        "status_code": None,
+        "message": "No email sent: every recipient was invalid, repeated or suppressed",
+        "dropped": screen.report()
+    }
+
+
 @mcp.tool(
     name="send_email",
-    description="Send an email with text or HTML content to one or more recipients",
+    description="""Send an email with text or HTML content to one or more recipients. Attachments are paths in INPUT_DIR or public http(s) URLs.
+Set send_at (ISO 8601 or Unix timestamp, up to 72 hours ahead) to schedule it; the result's batch_id can pause or cancel it.""",
     tags=["email", "sendgrid"]
 )
 async def send_email(
@@ -22,25 +77,66 @@ async def send_email(
     content_type: str = "text/html",
     from_email: Optional[str] = None,
     from_name: Optional[str] = None,
+    attachments: Optional[List[str]] = None,
+    send_at: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
     ctx: Context = None
 ) -> Dict[str, Any]:
-    """Send email with text/HTML content via SendGrid API."""
+    """Send email with text/HTML content via SendGrid API, or enqueue it when SEND_QUEUE is on."""
+    prepared = None
     try:
         # Parse multiple emails if comma-separated
         email_list = [email.strip() for email in to_emails.split(",")]
         
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "mail.send")
+        screen = await recipient_filter(client)
+        email_list = screen.filter(email_list)
+        if not email_list:
+            return _nothing_to_send(screen)
+        
         if ctx:
             await ctx.info(f"Sending email to {len(email_list)} recipient(s)")
         
-        client = SendGridClient.from_context(ctx)
+        prepared = await prepare_attachments(attachments) if attachments else None
+        send_at_ts, batch_id = await _resolve_schedule(client, send_at, batch_id)
+        if config.send_queue_enabled:
+            payload = client.build_mail(
+                to_emails=email_list,
+                subject=subject,
+                content=content,
+                content_type=content_type,
+                from_email=from_email,
+                from_name=from_name,
+                attachments=prepared,
+                send_at=send_at_ts,
+                batch_id=batch_id
+            )
+            result = get_send_queue().enqueue(client, payload, idempotency_key)
+            _report_dropped(result, screen)
+            if send_at_ts is not None:
+                # Recorded in the schedule index by the queue once SendGrid accepts it
+                result.update({"batch_id": batch_id, "send_at": send_at_ts})
+            if ctx:
+                await ctx.info(f"Email queued as {result['queue_id']}")
+            return result
+
         result = await client.send_email(
             to_emails=email_list,
             subject=subject,
             content=content,
             content_type=content_type,
             from_email=from_email,
-            from_name=from_name
+            from_name=from_name,
+            attachments=prepared,
+            send_at=send_at_ts,
+            batch_id=batch_id
         )
+        if send_at_ts is not None:
+            get_schedule_index().record(client.key_id, batch_id, send_at_ts, len(email_list), subject)
+            result.update({"batch_id": batch_id, "send_at": send_at_ts})
+        _report_dropped(result, screen)
         
         if ctx:
             await ctx.info("Email sent successfully")
@@ -52,6 +148,8 @@ async def send_email(
         if ctx:
             await ctx.error(error_msg)
         raise RuntimeError(error_msg)
+    finally:
+        release_attachments(prepared)
 
 @mcp.tool(
     name="get_template_info",
@@ -80,10 +178,8 @@ async def get_template_info(
             await ctx.info(f"Fetching template information for ID: {template_id}")
         
         client = SendGridClient.from_context(ctx)
-        template_response = await client.make_api_request(
-            "GET",
-            f"templates/{template_id}"
-        )
+        await require_scope(client, "templates.read")
+        template_response = await client.get_template(template_id)
         
         if ctx:
             await ctx.info("Template information retrieved successfully")
@@ -97,10 +193,112 @@ async def get_template_info(
         raise RuntimeError(error_msg)
 
 
+@mcp.tool(
+    name="preview_template",
+    description="""Render a dynamic template locally with dynamic_template_data, without sending anything.
+Returns the rendered subject, HTML and plain text, the variables the template uses, variables it outputs that are missing from the data, and data fields it never reads.""",
+    tags=["email", "sendgrid", "templates"]
+)
+async def preview_template(
+    dynamic_template_data: Optional[Dict[str, Any]] = None,
+    template_id: Optional[str] = None,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Render the template's active version locally and report missing and unused variables."""
+    try:
+        template_id = template_id or config.default_template_id
+        if not template_id:
+            raise ValueError("Template ID is required but none was provided or found in config")
+        
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "templates.read")
+        compiled = compiled_templates.get(await client.get_template(template_id))
+        result = compiled.render(dynamic_template_data or {})
+        
+        if ctx and result["missing"]:
+            await ctx.warning(f"Missing template variables: {', '.join(result['missing'])}")
+        
+        return {
+            "template_id": template_id,
+            "version_id": compiled.version_id,
+            "version_name": compiled.name,
+            "variables": compiled.variables,
+            **result
+        }
+        
+    except Exception as e:
+        error_msg = f"Failed to preview template: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="validate_bulk_template_data",
+    description="""Check every recipient's dynamic_template_data against a dynamic template locally, without sending.
+Takes recipients like send_bulk_template_email (inline list or JSONL/CSV file) and reports how many are missing variables, which ones, and the first problem recipients.""",
+    tags=["email", "sendgrid", "templates", "bulk"]
+)
+async def validate_bulk_template_data(
+    template_id: Optional[str] = None,
+    recipients: Optional[List[Dict[str, Any]]] = None,
+    recipients_file: Optional[str] = None,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Render the template for each recipient in one pass and summarize missing variables."""
+    try:
+        template_id = template_id or config.default_template_id
+        if not template_id:
+            raise ValueError("Template ID is required but none was provided or found in config")
+        
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "templates.read")
+        compiled = compiled_templates.get(await client.get_template(template_id))
+        report = await asyncio.to_thread(_validate_source, compiled, recipients, recipients_file)
+        
+        if ctx:
+            await ctx.info(f"{report['valid']} of {report['recipients']} recipient(s) have every template variable")
+        
+        return {"template_id": template_id, **report}
+        
+    except Exception as e:
+        error_msg = f"Failed to validate template data: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="invalidate_template_cache",
+    description="Drop cached template information so the next get_template_info call refetches it from SendGrid",
+    tags=["email", "sendgrid", "templates"]
+)
+async def invalidate_template_cache(
+    template_id: Optional[str] = None,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Invalidate one cached template, or all cached templates for the caller's API key."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        removed = invalidate_templates(client.key_id, template_id)
+        
+        if ctx:
+            await ctx.info(f"Invalidated {removed} cached template(s)")
+        
+        return {"invalidated": removed, "template_id": template_id}
+        
+    except Exception as e:
+        error_msg = f"Failed to invalidate template cache: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
 @mcp.tool(
     name="send_template_email",
     description="""Send an email using a SendGrid dynamic template with personalized data.
-First use get_template_info to understand the template structure, required fields ({{name}}, etc), then customize dynamic_template_data.""",
+First use get_template_info to understand the template structure, required fields ({{name}}, etc), then customize dynamic_template_data.
+Attachments are paths in INPUT_DIR or public http(s) URLs. Set send_at (ISO 8601 or Unix timestamp, up to 72 hours ahead) to schedule it.""",
     tags=["email", "sendgrid", "templates"]
 )
 async def send_template_email(
@@ -110,9 +308,14 @@ async def send_template_email(
     subject: Optional[str] = None,
     from_email: Optional[str] = None,
     from_name: Optional[str] = None,
+    attachments: Optional[List[str]] = None,
+    send_at: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
     ctx: Context = None
 ) -> Dict[str, Any]:
-    """Send email using SendGrid dynamic template with data substitution."""
+    """Send email using SendGrid dynamic template with data substitution, or enqueue it when SEND_QUEUE is on."""
+    prepared = None
     try:
         # Validate template_id
         template_id = template_id or config.default_template_id
@@ -125,11 +328,41 @@ async def send_template_email(
         # Parse multiple emails if comma-separated
         email_list = [email.strip() for email in to_emails.split(",")]
         
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "mail.send")
+        screen = await recipient_filter(client)
+        email_list = screen.filter(email_list)
+        if not email_list:
+            return _nothing_to_send(screen)
+        
         if ctx:
             await ctx.info(f"Sending template email to {len(email_list)} recipient(s)")
             await ctx.info(f"Using template ID: {template_id}")
         
-        client = SendGridClient.from_context(ctx)
+        prepared = await prepare_attachments(attachments) if attachments else None
+        send_at_ts, batch_id = await _resolve_schedule(client, send_at, batch_id)
+        if config.send_queue_enabled:
+            payload = client.build_mail(
+                to_emails=email_list,
+                subject=subject or "Email from Template",
+                content="",
+                template_id=template_id,
+                dynamic_template_data=dynamic_template_data,
+                from_email=from_email,
+                from_name=from_name,
+                attachments=prepared,
+                send_at=send_at_ts,
+                batch_id=batch_id
+            )
+            result = get_send_queue().enqueue(client, payload, idempotency_key)
+            _report_dropped(result, screen)
+            if send_at_ts is not None:
+                # Recorded in the schedule index by the queue once SendGrid accepts it
+                result.update({"batch_id": batch_id, "send_at": send_at_ts})
+            if ctx:
+                await ctx.info(f"Template email queued as {result['queue_id']}")
+            return result
+
         result = await client.send_email(
             to_emails=email_list,
             subject=subject or "Email from Template",
@@ -137,8 +370,17 @@ async def send_template_email(
             template_id=template_id,
             dynamic_template_data=dynamic_template_data,
             from_email=from_email,
-            from_name=from_name
+            from_name=from_name,
+            attachments=prepared,
+            send_at=send_at_ts,
+            batch_id=batch_id
         )
+        if send_at_ts is not None:
+            get_schedule_index().record(
+                client.key_id, batch_id, send_at_ts, len(email_list), subject or "Email from Template"
+            )
+            result.update({"batch_id": batch_id, "send_at": send_at_ts})
+        _report_dropped(result, screen)
         
         if ctx:
             await ctx.info("Template email sent successfully")
@@ -150,5 +392,162 @@ async def send_template_email(
         if ctx:
             await ctx.error(error_msg)
         raise RuntimeError(error_msg)
+    finally:
+        release_attachments(prepared)
 
 
+@mcp.tool(
+    name="send_bulk_template_email",
+    description="""Send a dynamic template email to many recipients, each with their own dynamic_template_data. Recipients never see each other.
+Provide recipients inline as [{"email": ..., "name": ..., "dynamic_template_data": {...}}] or as a path to a local JSONL or CSV file (CSV columns other than email and name become template data).
+Attachments (paths in INPUT_DIR or public http(s) URLs) are encoded once and sent to every recipient.
+Set send_at to schedule the send, and spread_minutes to stagger chunks across that many minutes to smooth delivery.
+Set validate=true to check every recipient's data against the template first and send nothing if any are missing variables.""",
+    tags=["email", "sendgrid", "templates", "bulk"]
+)
+async def send_bulk_template_email(
+    template_id: Optional[str] = None,
+    recipients: Optional[List[Dict[str, Any]]] = None,
+    recipients_file: Optional[str] = None,
+    subject: Optional[str] = None,
+    from_email: Optional[str] = None,
+    from_name: Optional[str] = None,
+    attachments: Optional[List[str]] = None,
+    send_at: Optional[str] = None,
+    spread_minutes: Optional[int] = None,
+    batch_id: Optional[str] = None,
+    validate: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Send a template email in chunks of up to 1000 personalizations, dispatched concurrently.
+
+    Scheduled sends can be spread across spread_minutes after send_at, one
+    send time per chunk, all under one batch ID.
+    """
+    prepared = None
+    try:
+        template_id = template_id or config.default_template_id
+        if not template_id:
+            error_msg = "Template ID is required but none was provided or found in config"
+            if ctx:
+                await ctx.error(error_msg)
+            raise ValueError(error_msg)
+        
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "mail.send")
+        if validate:
+            await require_scope(client, "templates.read")
+            compiled = compiled_templates.get(await client.get_template(template_id))
+            report = await asyncio.to_thread(_validate_source, compiled, recipients, recipients_file)
+            if report["invalid"]:
+                if ctx:
+                    await ctx.error(
+                        f"Not sending: {report['invalid']} of {report['recipients']} recipient(s) are missing template variables"
+                    )
+                return {"template_id": template_id, "sent_recipients": 0, "validation": report}
+        prepared = await prepare_attachments(attachments) if attachments else None
+        
+        send_at_ts = parse_send_at(send_at) if send_at is not None else None
+        send_times: List[int] = []
+        if send_at_ts is not None and spread_minutes:
+            # Count recipients first so the chunks are spaced evenly across the window
+            total = await asyncio.to_thread(_count_source, recipients, recipients_file)
+            requests = max(1, -(-total // config.bulk_chunk_size))
+            send_times = spread_send_times(send_at_ts, spread_minutes * 60, requests)
+            check_send_at(send_times[-1])
+        if send_at_ts is not None and not batch_id:
+            await require_scope(client, "mail.batch.create")
+            batch_id = await client.create_batch()
+        
+        screen = await recipient_filter(client)
+        source = (
+            recipient
+            for recipient in (to_recipient(record) for record in iter_source(recipients, recipients_file))
+            if screen.accept(recipient["email"])
+        )
+        
+        chunks: List[Dict[str, Any]] = []
+        failures: List[Dict[str, Any]] = []
+        counts = {"queued": 0, "sent": 0}
+        input_error = None
+        
+        # Bounds both concurrent requests and how far reading runs ahead of sending
+        slots = asyncio.Semaphore(config.bulk_concurrency)
+        
+        async def send_chunk(index: int, batch: List[Dict[str, Any]]) -> None:
+            chunk_send_at = send_times[min(index, len(send_times) - 1)] if send_times else send_at_ts
+            try:
+                payload = client.build_bulk_mail(
+                    batch,
+                    template_id=template_id,
+                    subject=subject,
+                    from_email=from_email,
+                    from_name=from_name,
+                    attachments=prepared,
+                    send_at=chunk_send_at,
+                    batch_id=batch_id
+                )
+                result = await client.send_payload(payload)
+                chunks.append({
+                    "chunk": index,
+                    "recipients": len(batch),
+                    "status_code": result["status_code"],
+                    "message_id": result["message_id"],
+                    "send_at": chunk_send_at
+                })
+                if chunk_send_at is not None:
+                    get_schedule_index().record(
+                        client.key_id, batch_id, chunk_send_at, len(batch), subject or f"Template {template_id}"
+                    )
+                counts["sent"] += len(batch)
+                if ctx:
+                    await ctx.report_progress(counts["sent"], None)
+            except Exception as e:
+                failures.append({
+                    "chunk": index,
+                    "recipients": len(batch),
+                    "first_email": batch[0]["email"],
+                    "error": str(e)
+                })
+            finally:
+                slots.release()
+        
+        tasks = []
+        try:
+            for index, batch in enumerate(chunked(source, config.bulk_chunk_size)):
+                await slots.acquire()
+                counts["queued"] += len(batch)
+                tasks.append(asyncio.create_task(send_chunk(index, batch)))
+        except ValueError as e:
+            # Stop reading bad input but still report the chunks already dispatched
+            input_error = str(e)
+            if ctx:
+                await ctx.error(f"Stopped reading recipients: {input_error}")
+        finally:
+            await asyncio.gather(*tasks)
+        
+        if ctx:
+            await ctx.info(
+                f"Bulk send finished: {counts['sent']} of {counts['queued']} recipient(s) "
+                f"sent in {len(chunks)} request(s), {len(failures)} failed chunk(s)"
+            )
+        
+        return {
+            "template_id": template_id,
+            "batch_id": batch_id,
+            "total_recipients": counts["queued"],
+            "sent_recipients": counts["sent"],
+            "chunks": sorted(chunks, key=lambda chunk: chunk["chunk"]),
+            "failures": sorted(failures, key=lambda failure: failure["chunk"]),
+            "dropped": screen.report(),
+            "input_error": input_error,
+            "validation": report if validate else None
+        }
+        
+    except Exception as e:
+        error_msg = f"Failed to send bulk template email: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+    finally:
+        release_attachments(prepared)
@@ -0,0 +1,52 @@
+"""Send queue tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient
+from config import config
+from send_queue import get_send_queue
+
+logger = logging.getLogger(__name__)
+
+
+@mcp.tool(
+    name="get_send_queue_stats",
+    description="Show the depth of the outbound send queue (pending, sending, sent and dead-lettered sends) for your API key",
+    tags=["email", "sendgrid", "queue"]
+)
+async def get_send_queue_stats(ctx: Context = None) -> Dict[str, Any]:
+    """Return send queue counters for the caller's API key."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        stats = get_send_queue().stats(client.key_id)
+        stats["enabled"] = config.send_queue_enabled
+        return stats
+
+    except Exception as e:
+        error_msg = f"Failed to get send queue stats: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="get_queued_send_status",
+    description="Get the delivery status of a queued send by the queue_id returned from send_email or send_template_email",
+    tags=["email", "sendgrid", "queue"]
+)
+async def get_queued_send_status(queue_id: str, ctx: Context = None) -> Dict[str, Any]:
+    """Return the state, attempts and SendGrid message ID of one queued send."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        status = get_send_queue().status(queue_id, client.key_id)
+        if status is None:
+            raise ValueError(f"No queued send found with ID {queue_id}")
+        return status
+
+    except Exception as e:
+        error_msg = f"Failed to get queued send status: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
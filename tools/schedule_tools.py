@@ -0,0 +1,129 @@
+"""Scheduled send tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient
+from scheduler import get_schedule_index
+from scopes import require_scope
+
+logger = logging.getLogger(__name__)
+
+
+async def _change_batch(batch_id: str, status: str, ctx: Context = None) -> Dict[str, Any]:
+    """Pause, cancel or resume a batch through the API and record it in the local index."""
+    client = SendGridClient.from_context(ctx)
+    index = get_schedule_index()
+    batch = index.get(client.key_id, batch_id)
+    if batch is not None and batch["state"] == "canceled" and status != "canceled":
+        # SendGrid drops a canceled batch's sends; it cannot be paused or resumed again
+        raise ValueError(f"Batch {batch_id} was canceled and cannot be {'resumed' if status == 'scheduled' else status}")
+    existing = batch is not None and batch["state"] in ("paused", "canceled")
+
+    if status == "scheduled":
+        await require_scope(client, "user.scheduled_sends.delete")
+        await client.resume_batch(batch_id)
+    else:
+        await require_scope(client, "user.scheduled_sends.create")
+        await client.set_batch_status(batch_id, "pause" if status == "paused" else "cancel", existing=existing)
+    index.set_status(client.key_id, batch_id, status)
+
+    if ctx:
+        await ctx.info(f"Batch {batch_id} is now {status}")
+    return index.get(client.key_id, batch_id) or {"batch_id": batch_id, "state": status}
+
+
+@mcp.tool(
+    name="pause_scheduled_batch",
+    description="Pause a scheduled send batch by batch_id. Paused batches are dropped by SendGrid 72 hours after their send time unless resumed.",
+    tags=["email", "sendgrid", "scheduling"]
+)
+async def pause_scheduled_batch(batch_id: str, ctx: Context = None) -> Dict[str, Any]:
+    """Pause every scheduled send in a batch."""
+    try:
+        return await _change_batch(batch_id, "paused", ctx)
+
+    except Exception as e:
+        error_msg = f"Failed to pause batch: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="cancel_scheduled_batch",
+    description="Cancel a scheduled send batch by batch_id so none of its emails are sent",
+    tags=["email", "sendgrid", "scheduling"]
+)
+async def cancel_scheduled_batch(batch_id: str, ctx: Context = None) -> Dict[str, Any]:
+    """Cancel every scheduled send in a batch."""
+    try:
+        return await _change_batch(batch_id, "canceled", ctx)
+
+    except Exception as e:
+        error_msg = f"Failed to cancel batch: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="resume_scheduled_batch",
+    description="Resume a paused scheduled send batch by batch_id",
+    tags=["email", "sendgrid", "scheduling"]
+)
+async def resume_scheduled_batch(batch_id: str, ctx: Context = None) -> Dict[str, Any]:
+    """Resume a paused batch."""
+    try:
+        return await _change_batch(batch_id, "scheduled", ctx)
+
+    except Exception as e:
+        error_msg = f"Failed to resume batch: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="get_scheduled_batch_status",
+    description="Get the state, recipient count and send window of a scheduled batch from the local schedule index (no API call)",
+    tags=["email", "sendgrid", "scheduling"]
+)
+async def get_scheduled_batch_status(batch_id: str, ctx: Context = None) -> Dict[str, Any]:
+    """Return a scheduled batch's state from the local index."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        batch = get_schedule_index().get(client.key_id, batch_id)
+        if batch is None:
+            raise ValueError(f"No batch {batch_id} was scheduled through this server")
+        return batch
+
+    except Exception as e:
+        error_msg = f"Failed to get batch status: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="list_scheduled_batches",
+    description="List scheduled and paused send batches from the local schedule index, soonest first (no API call)",
+    tags=["email", "sendgrid", "scheduling"]
+)
+async def list_scheduled_batches(
+    include_done: bool = False,
+    limit: int = 50,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """List the caller's pending batches, or all batches with include_done."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        batches = get_schedule_index().list(client.key_id, include_done=include_done, limit=limit)
+        return {"count": len(batches), "batches": batches}
+
+    except Exception as e:
+        error_msg = f"Failed to list batches: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
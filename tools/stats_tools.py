@@ -0,0 +1,89 @@
+"""Email statistics tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient
+from scopes import require_scope
+from stats import date_range, get_stats
+
+logger = logging.getLogger(__name__)
+
+
+@mcp.tool(
+    name="get_email_stats",
+    description="Get account-wide email stats (requests, delivered, opens, clicks, bounces, spam reports, unsubscribes) with delivery, open, click and bounce rates, by day, week or month",
+    tags=["email", "sendgrid", "stats"]
+)
+async def get_email_stats(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: int = 30,
+    aggregated_by: str = "day",
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Return global stats for a date range.
+
+    Args:
+        start_date: First day (YYYY-MM-DD, UTC); defaults to days before end_date
+        end_date: Last day (YYYY-MM-DD, UTC); defaults to today
+        days: Length of the range when start_date is not given
+        aggregated_by: day, week (starting Monday) or month
+    """
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "stats.read")
+        start, end = date_range(start_date, end_date, days)
+        if ctx:
+            await ctx.info(f"Getting email stats from {start} to {end}")
+        return await get_stats(client, [], start, end, aggregated_by)
+
+    except Exception as e:
+        error_msg = f"Failed to get email stats: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="get_category_stats",
+    description="Get email stats and rates per category (for example per campaign or per template, if sends are tagged with one), by day, week or month",
+    tags=["email", "sendgrid", "stats"]
+)
+async def get_category_stats(
+    categories: Union[str, List[str]],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: int = 30,
+    aggregated_by: str = "day",
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """Return stats per category for a date range.
+
+    Args:
+        categories: Category name or list of names (comma-separated string accepted)
+        start_date: First day (YYYY-MM-DD, UTC); defaults to days before end_date
+        end_date: Last day (YYYY-MM-DD, UTC); defaults to today
+        days: Length of the range when start_date is not given
+        aggregated_by: day, week (starting Monday) or month
+    """
+    try:
+        if isinstance(categories, str):
+            categories = categories.split(",")
+        categories = list(dict.fromkeys(category.strip() for category in categories if category.strip()))
+        if not categories:
+            raise ValueError("At least one category is required")
+
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "categories.stats.read")
+        start, end = date_range(start_date, end_date, days)
+        if ctx:
+            await ctx.info(f"Getting stats for {len(categories)} categories from {start} to {end}")
+        return await get_stats(client, categories, start, end, aggregated_by)
+
+    except Exception as e:
+        error_msg = f"Failed to get category stats: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
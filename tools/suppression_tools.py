@@ -0,0 +1,55 @@
+"""Suppression list tools for SendGrid MCP Server."""
+
+import logging
+from typing import Any, Dict
+from fastmcp import Context
+from tools import mcp
+from client import SendGridClient
+from config import config
+from scopes import require_scope
+from suppressions import get_suppression_set
+
+logger = logging.getLogger(__name__)
+
+
+@mcp.tool(
+    name="get_suppression_status",
+    description="Show the local copy of your bounce, block, spam report and unsubscribe lists used to filter recipients before sending",
+    tags=["email", "sendgrid", "suppressions"]
+)
+async def get_suppression_status(ctx: Context = None) -> Dict[str, Any]:
+    """Return per-list counts, sync times and lookup statistics for the caller's API key."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        status = get_suppression_set(client.key_id).status()
+        status["enabled"] = config.suppression_filter
+        return status
+
+    except Exception as e:
+        error_msg = f"Failed to get suppression status: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+@mcp.tool(
+    name="sync_suppressions",
+    description="Sync the local suppression lists from SendGrid now (new entries only, or everything with full=true to pick up removals)",
+    tags=["email", "sendgrid", "suppressions"]
+)
+async def sync_suppressions(full: bool = False, ctx: Context = None) -> Dict[str, Any]:
+    """Fetch suppression list entries and return how many were stored per list."""
+    try:
+        client = SendGridClient.from_context(ctx)
+        await require_scope(client, "suppression.read")
+        if ctx:
+            await ctx.info(f"Running {'full' if full else 'incremental'} suppression sync")
+        suppressions = get_suppression_set(client.key_id)
+        synced = await suppressions.sync(client, full=full)
+        return {"mode": "full" if full else "incremental", "synced": synced, "status": suppressions.status()}
+
+    except Exception as e:
+        error_msg = f"Failed to sync suppressions: {str(e)}"
+        if ctx:
+            await ctx.error(error_msg)
+        raise RuntimeError(error_msg)
@@ -0,0 +1,382 @@
+"""SendGrid Event Webhook receiver and local delivery event store.
+
+In HTTP mode the server accepts Event Webhook POSTs at WEBHOOK_PATH. The
+body (a JSON array of events) is parsed incrementally as it arrives and
+hashed on the fly for the signed-webhook ECDSA check, so a large batch is
+never held as one string. Verified events are written to SQLite (WAL)
+under DATA_DIR/events.sqlite3, indexed by message ID and recipient.
+
+Writes are group-committed: concurrent webhook requests queue their rows
+and share one transaction, and each request is acknowledged only after its
+rows are committed, so SendGrid retries anything that was not stored.
+Retried events are de-duplicated by sg_event_id.
+"""
+
+import asyncio
+import base64
+import binascii
+import codecs
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from config import config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Signature headers, as named by the SDK's EventWebhookHeader
+SIGNATURE_HEADER = "X-Twilio-Email-Event-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Twilio-Email-Event-Webhook-Timestamp"
+
+# Events that move a message through delivery, in the order they can occur
+DELIVERY_EVENTS = ("processed", "deferred", "dropped", "bounce", "blocked", "delivered")
+
+# Engagement events reported as flags on a message summary
+ENGAGEMENT_EVENTS = ("open", "click", "spamreport", "unsubscribe", "group_unsubscribe")
+
+# A single event larger than this is treated as malformed input
+MAX_EVENT_CHARS = 1024 * 1024
+
+# Old events are pruned at most this often
+PRUNE_INTERVAL_SECONDS = 3600
+
+# Longest a group commit blocks the event loop waiting for the SQLite write lock
+LOCK_TIMEOUT = 0.005
+
+# Give up on a group commit after retrying for this long
+LOCK_WAIT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    event_id TEXT UNIQUE,
+    message_id TEXT,
+    email TEXT,
+    event TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_message ON events (message_id, timestamp);
+CREATE INDEX IF NOT EXISTS events_email ON events (email, timestamp);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+"""
+
+webhook_events = metrics.counter(
+    "sendgrid_mcp_webhook_events_total", "Event Webhook events received and committed", ()
+)
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+Row = Tuple[Optional[str], Optional[str], str, str, int, str]
+
+
+def _row(event: Dict[str, Any], raw: str) -> Row:
+    """Turn one event into (event_id, message_id, email, event, timestamp, raw JSON)."""
+    sg_message_id = event.get("sg_message_id") or ""
+    # X-Message-Id from /mail/send is the part of sg_message_id before the first dot
+    message_id = sg_message_id.split(".", 1)[0] or None
+    return (
+        event.get("sg_event_id"),
+        message_id,
+        str(event.get("email") or "").lower(),
+        str(event.get("event") or ""),
+        int(event.get("timestamp") or 0),
+        raw
+    )
+
+
+class EventStreamParser:
+    """Parse a JSON array of event objects from byte chunks as they arrive."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._decode = json.JSONDecoder().raw_decode
+        self._buffer = ""
+        self._state = "start"
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[Row]:
+        """Return rows for every event completed by this chunk. Raises ValueError on bad input."""
+        buffer = self._buffer + self._decoder.decode(chunk, final)
+        pos = 0
+        rows = []
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array of events")
+                self._state = "first"
+                pos += 1
+            elif self._state in ("first", "item"):
+                if char == "]" and self._state == "first":
+                    self._state = "done"
+                    pos += 1
+                    continue
+                try:
+                    event, end = self._decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final or len(buffer) - pos > MAX_EVENT_CHARS:
+                        raise ValueError("Malformed event in webhook body")
+                    break  # Event continues in the next chunk
+                if not isinstance(event, dict):
+                    raise ValueError("Webhook events must be JSON objects")
+                rows.append(_row(event, buffer[pos:end]))
+                pos = end
+                self._state = "separator"
+            elif self._state == "separator":
+                if char == ",":
+                    self._state = "item"
+                elif char == "]":
+                    self._state = "done"
+                else:
+                    raise ValueError("Expected ',' or ']' between events")
+                pos += 1
+            else:
+                raise ValueError("Unexpected data after the event array")
+
+        self._buffer = buffer[pos:]
+        if final and self._state != "done":
+            raise ValueError("Webhook body ended before the event array was closed")
+        return rows
+
+
+class EventStore:
+    """SQLite store of webhook events with group-committed writes."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # Opening waits as long as it needs to; from here on the write lock
+        # is waited for in short attempts with async backoff (see _commit)
+        self._db.execute(f"PRAGMA busy_timeout = {int(LOCK_TIMEOUT * 1000)}")
+        self._pending: List[Row] = []
+        self._waiters: List["asyncio.Future[None]"] = []
+        self._flush_scheduled = False
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self._pruned_at = 0.0
+
+        # Ingest statistics
+        self.received = 0
+        self.stored = 0
+        self.commits = 0
+
+    async def add(self, rows: List[Row]) -> None:
+        """Queue rows for the next group commit and wait until they are committed."""
+        loop = asyncio.get_running_loop()
+        committed = loop.create_future()
+        self._pending.extend(rows)
+        self._waiters.append(committed)
+        if not self._flush_scheduled:
+            # Everything queued before the loop gets back to us shares this commit
+            self._flush_scheduled = True
+            self._flush_task = loop.create_task(self._flush())
+        await committed
+
+    async def _flush(self) -> None:
+        # Rows queued while a commit waits for the write lock join the next one
+        try:
+            while self._pending:
+                rows, waiters = self._pending, self._waiters
+                self._pending, self._waiters = [], []
+                try:
+                    await self._commit(rows)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to store {len(rows)} webhook event(s): {str(e)}")
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                    continue
+
+                self.received += len(rows)
+                self.commits += 1
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        finally:
+            self._flush_scheduled = False
+
+    async def _commit(self, rows: List[Row]) -> None:
+        """Insert rows in one write transaction.
+
+        The write lock is waited for in short blocking attempts with async
+        backoff in between, so another worker's write does not stall the
+        event loop.
+        """
+        deadline = time.monotonic() + LOCK_WAIT
+        delay = 0.001
+        while True:
+            try:
+                return self._transaction(rows)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() >= deadline:
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _transaction(self, rows: List[Row]) -> None:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            changes = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO events (event_id, message_id, email, event, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            stored = self._db.total_changes - changes
+            self._prune()
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self.stored += stored
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._pruned_at < PRUNE_INTERVAL_SECONDS:
+            return
+        self._pruned_at = now
+        cutoff = now - config.webhook_retention_days * 86400
+        self._db.execute("DELETE FROM events WHERE timestamp < ?", (int(cutoff),))
+
+    def message_events(self, message_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the events for a message, oldest first.
+
+        Accepts the X-Message-Id returned by a send or a full sg_message_id.
+        """
+        rows = self._db.execute(
+            "SELECT data FROM events WHERE message_id = ? ORDER BY timestamp, id LIMIT ?",
+            (message_id.split(".", 1)[0], limit)
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def recipient_events(self, email: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the most recent events for a recipient, oldest first."""
+        rows = self._db.execute(
+            "SELECT data FROM events WHERE email = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (email.strip().lower(), limit)
+        ).fetchall()
+        return [json.loads(row["data"]) for row in reversed(rows)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return stored event count and ingest counters."""
+        return {
+            "events": self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+            "received": self.received,
+            "stored": self.stored,
+            "duplicates": self.received - self.stored,
+            "commits": self.commits
+        }
+
+
+def summarize(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse events into one delivery summary per message and recipient."""
+    summaries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for event in events:
+        message_id = (event.get("sg_message_id") or "").split(".", 1)[0]
+        key = (message_id, str(event.get("email") or "").lower())
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = {
+                "message_id": message_id or None,
+                "email": event.get("email"),
+                "status": None,
+                "reason": None,
+                "first_event_at": event.get("timestamp"),
+                "last_event_at": event.get("timestamp"),
+                "engagement": {}
+            }
+        name = event.get("event")
+        summary["last_event_at"] = event.get("timestamp")
+        if name in DELIVERY_EVENTS:
+            summary["status"] = name
+            summary["reason"] = event.get("reason") or event.get("response")
+        elif name in ENGAGEMENT_EVENTS:
+            summary["engagement"][name] = summary["engagement"].get(name, 0) + 1
+    return list(summaries.values())
+
+
+# Global event store, opened on first use
+_event_store: Optional[EventStore] = None
+
+
+def get_event_store() -> EventStore:
+    """Return the process-wide webhook event store."""
+    global _event_store
+    if _event_store is None:
+        _event_store = EventStore(config.data_path("events.sqlite3"))
+    return _event_store
+
+
+_public_key: Optional[ec.EllipticCurvePublicKey] = None
+
+
+def _verification_key() -> Optional[ec.EllipticCurvePublicKey]:
+    global _public_key
+    if _public_key is None and config.webhook_public_key:
+        # The SDK is only needed to parse the key, so it is loaded on first use
+        from sendgrid.helpers.eventwebhook import EventWebhook
+        _public_key = EventWebhook(config.webhook_public_key).public_key
+    return _public_key
+
+
+def _signature_valid(public_key: ec.EllipticCurvePublicKey, signature: str, digest: bytes) -> bool:
+    try:
+        public_key.verify(base64.b64decode(signature), digest, ec.ECDSA(Prehashed(hashes.SHA256())))
+        return True
+    except (InvalidSignature, binascii.Error, ValueError):
+        return False
+
+
+async def handle_event_webhook(request: Request) -> JSONResponse:
+    """Receive one Event Webhook POST: verify, parse and store its events."""
+    public_key = _verification_key()
+    digest = None
+    signature = request.headers.get(SIGNATURE_HEADER)
+    if public_key is not None:
+        timestamp = request.headers.get(TIMESTAMP_HEADER)
+        if not signature or not timestamp:
+            return JSONResponse({"error": "Missing Event Webhook signature headers"}, status_code=401)
+        # SendGrid signs the timestamp followed by the raw body
+        digest = hashlib.sha256(timestamp.encode())
+
+    parser = EventStreamParser()
+    rows: List[Row] = []
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > config.webhook_max_bytes:
+                return JSONResponse({"error": "Webhook body is too large"}, status_code=413)
+            if digest is not None:
+                digest.update(chunk)
+            rows.extend(parser.feed(chunk))
+        rows.extend(parser.feed(b"", final=True))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    if digest is not None and not _signature_valid(public_key, signature, digest.digest()):
+        logger.warning("Rejected Event Webhook POST with an invalid signature")
+        return JSONResponse({"error": "Invalid Event Webhook signature"}, status_code=403)
+
+    try:
+        await get_event_store().add(rows)
+    except sqlite3.Error:
+        # A non-2xx response makes SendGrid retry the batch later
+        return JSONResponse({"error": "Failed to store events"}, status_code=503)
+    webhook_events.inc(amount=len(rows))
+    return JSONResponse({"received": len(rows)})